@@ -2,18 +2,24 @@
 Firebase Authentication Middleware for DOMULEX Backend
 """
 
+import asyncio
+import hashlib
 import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional, Tuple
 from functools import wraps
 
-from fastapi import HTTPException, Security, Depends, status, Header
+from fastapi import HTTPException, Security, status, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
 
 from config import get_settings
+from cache import get_redis_client
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +27,7 @@ settings = get_settings()
 
 # Security scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Initialize Firebase Admin (only if credentials available)
 _firebase_initialized = False
@@ -103,6 +110,99 @@ class FirebaseUser:
         return self.claims.get('premium', False)
 
 
+class _ExpiringCache:
+    """Bounded, thread-safe LRU with a per-entry expiry timestamp (epoch seconds)."""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+    
+    def put(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Decoded ID tokens by token hash, valid until the token's own `exp`
+_token_cache = _ExpiringCache(settings.auth_token_cache_size)
+# activeSessionId per uid ("" = no session stored yet)
+_session_cache = _ExpiringCache(settings.auth_token_cache_size)
+SESSION_KEY_PREFIX = "domulex:session:"
+
+
+async def verify_token(token: str) -> dict:
+    """
+    Verify a Firebase ID token, serving repeated tokens from cache.
+    
+    verify_id_token is signature + expiry validation (no revocation check),
+    so a cached result is valid until the token's `exp`.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    found, decoded = _token_cache.get(key)
+    if found:
+        return decoded
+    
+    # RSA verification + possible certificate fetch - keep it off the event loop
+    decoded = await asyncio.to_thread(auth.verify_id_token, token)
+    expires_at = decoded.get('exp')
+    if expires_at:
+        _token_cache.put(key, decoded, float(expires_at))
+    return decoded
+
+
+def _cache_session(uid: str, session_id: str):
+    """Push the active session id to this instance and (if available) Redis."""
+    _session_cache.put(uid, session_id, time.time() + settings.auth_session_cache_ttl)
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.setex(SESSION_KEY_PREFIX + uid, settings.auth_session_cache_ttl, session_id)
+        except Exception as e:
+            logger.warning(f"Session cache write failed: {e}")
+
+
+def _load_active_session(uid: str) -> Optional[str]:
+    """
+    activeSessionId from Redis or Firestore ("" = none stored).
+    Blocking - run in a worker thread. None if Firestore is unavailable.
+    """
+    client = get_redis_client()
+    if client is not None:
+        try:
+            cached = client.get(SESSION_KEY_PREFIX + uid)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning(f"Session cache read failed: {e}")
+    
+    db = get_firestore_db()
+    if not db:
+        return None
+    user_doc = db.collection('users').document(uid).get()
+    if not user_doc.exists:
+        return ""  # New user, no session yet
+    return user_doc.to_dict().get('activeSessionId') or ""
+
+
 def get_firestore_db():
     """Get Firestore database instance."""
     global _firestore_db
@@ -119,17 +219,15 @@ async def validate_session(uid: str, session_id: str) -> bool:
     if not session_id:
         return True  # No session enforcement for requests without session_id
     
-    db = get_firestore_db()
-    if not db:
-        return True  # Skip validation if Firestore not available
-    
     try:
-        user_doc = db.collection('users').document(uid).get()
-        if not user_doc.exists:
-            return True  # New user, no session yet
-        
-        user_data = user_doc.to_dict()
-        stored_session_id = user_data.get('activeSessionId')
+        found, stored_session_id = _session_cache.get(uid)
+        if not found:
+            stored_session_id = await asyncio.to_thread(_load_active_session, uid)
+            if stored_session_id is None:
+                return True  # Skip validation if Firestore not available
+            _session_cache.put(
+                uid, stored_session_id, time.time() + settings.auth_session_cache_ttl
+            )
         
         # If no stored session, this is the first session
         if not stored_session_id:
@@ -156,11 +254,13 @@ async def register_session(uid: str, session_id: str, device_info: str = None) -
     
     try:
         user_ref = db.collection('users').document(uid)
-        user_ref.update({
+        await asyncio.to_thread(user_ref.update, {
             'activeSessionId': session_id,
             'lastSessionAt': datetime.utcnow().isoformat(),
             'lastDeviceInfo': device_info or 'Unknown',
         })
+        # Other devices' cached sessions become invalid immediately
+        await asyncio.to_thread(_cache_session, uid, session_id)
         logger.info(f"✅ Session registered for user {uid}: {session_id[:8]}...")
         return {"success": True, "session_id": session_id}
     except Exception as e:
@@ -191,8 +291,8 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        # Verify ID token
-        decoded_token = auth.verify_id_token(token)
+        # Verify ID token (cached until exp)
+        decoded_token = await verify_token(token)
         
         uid = decoded_token['uid']
         
@@ -214,6 +314,8 @@ async def get_current_user(
         
         return user
     
+    except HTTPException:
+        raise
     except auth.ExpiredIdTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -238,19 +340,18 @@ async def get_current_user(
 
 
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(lambda: None)
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(optional_security),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
 ) -> Optional[FirebaseUser]:
     """
     Get authenticated user if token provided, otherwise None.
     Useful for optional authentication.
     """
-    if not credentials:
+    if not credentials or not _firebase_initialized:
         return None
     
     try:
-        return await get_current_user(credentials)
-    except HTTPException:
-        return None
+        return await get_current_user(credentials, x_session_id)
     except HTTPException:
         return None
 
@@ -0,0 +1 @@
+"""Retrieval benchmark package (question set, corpus fixture, runner)."""
@@ -0,0 +1,60 @@
+"""
+Retrieval Metrics
+Binary-relevance ranking metrics and latency percentiles.
+"""
+
+import math
+from typing import Iterable, List, Sequence
+
+
+def recall_at_k(ranked: Sequence[str], gold: Iterable[str], k: int) -> float:
+    """Share of gold sources among the top k results."""
+    gold = set(gold)
+    if not gold:
+        return 0.0
+    return len(gold.intersection(ranked[:k])) / len(gold)
+
+
+def reciprocal_rank(ranked: Sequence[str], gold: Iterable[str], k: int) -> float:
+    """1 / rank of the first gold source within the top k (0 if none)."""
+    gold = set(gold)
+    for rank, source in enumerate(ranked[:k], start=1):
+        if source in gold:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked: Sequence[str], gold: Iterable[str], k: int) -> float:
+    """Normalized DCG with binary gains (log2 discount)."""
+    gold = set(gold)
+    if not gold:
+        return 0.0
+    dcg = sum(
+        1.0 / math.log2(rank + 1)
+        for rank, source in enumerate(ranked[:k], start=1)
+        if source in gold
+    )
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(gold), k) + 1))
+    return dcg / ideal
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile with linear interpolation (numpy's default method)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(latencies_ms: List[float]) -> dict:
+    """p50/p95/p99/mean/max in milliseconds."""
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        "max_ms": round(max(latencies_ms), 3) if latencies_ms else 0.0,
+    }
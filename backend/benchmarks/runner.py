@@ -0,0 +1,306 @@
+"""
+Retrieval Benchmark Runner
+Measures retrieval quality and search latency of RAGEngine.retrieve.
+
+Usage (from backend/, GEMINI_API_KEY may be any value for offline runs):
+    python -m benchmarks.runner --output results.json
+    python -m benchmarks.runner --chunk-tokens 512 --concurrency 1,8,32
+    python -m benchmarks.runner --qdrant-url http://localhost:6333
+    python -m benchmarks.runner --reranker lexical
+
+Reports:
+- quality: recall@k, MRR@k, nDCG@k over questions with gold sources,
+  overall and per category / jurisdiction / filter
+- isolation: hits outside the target jurisdiction (must be 0)
+- latency: p50/p95/p99 of sequential searches
+- throughput: searches/s and latency percentiles per concurrency level
+
+Latencies cover filter search + result conversion (+ reranking of
+rerank_candidates hits with --reranker); query vectors are embedded once up
+front so the embedding backend does not dominate.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.corpus import BenchmarkFixture
+from benchmarks.metrics import latency_summary, ndcg_at_k, recall_at_k, reciprocal_rank
+from ingestion.chunker import LegalChunker
+from models.legal import Jurisdiction
+from rag.embedder import get_embedder
+from rag.reranker import get_reranker
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_PATH = Path(__file__).with_name("questions_de.json")
+
+
+def load_questions(path: Optional[Path] = None) -> List[Dict]:
+    """Question set: id, query, jurisdiction, gold source IDs, optional filters."""
+    with open(path or QUESTIONS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _filter_label(question: Dict) -> str:
+    sources = ",".join(question.get("source_filter") or []) or "ALL"
+    levels = ",".join(question.get("gerichtsebene_filter") or [])
+    return f"{sources}:{levels}" if levels else sources
+
+
+def _mean(values: List[float]) -> float:
+    return round(sum(values) / len(values), 4) if values else 0.0
+
+
+class BenchmarkRunner:
+    """
+    Runs the question set against a loaded BenchmarkFixture.
+
+    Args:
+        fixture: Loaded benchmark collection
+        questions: Question set (see load_questions)
+        k: Cutoff for recall/MRR/nDCG
+        rerank: Over-fetch and rerank with the engine's reranker (no token budget)
+    """
+
+    def __init__(
+        self,
+        fixture: BenchmarkFixture,
+        questions: List[Dict],
+        k: int = 10,
+        rerank: bool = False,
+    ):
+        self.fixture = fixture
+        self.questions = questions
+        self.k = k
+        self.rerank = rerank
+        self._vectors: List[List[float]] = []
+
+    async def _search(self, question: Dict, vector: List[float]):
+        engine = self.fixture.engine
+        hits = await engine.retrieve(
+            query=question["query"],
+            target_jurisdiction=Jurisdiction(question["jurisdiction"]),
+            limit=max(self.k, engine.rerank_candidates) if self.rerank else self.k,
+            source_filter=question.get("source_filter"),
+            gerichtsebene_filter=question.get("gerichtsebene_filter"),
+            query_vector=vector,
+        )
+        if self.rerank:
+            hits = await engine.rerank(question["query"], hits, limit=self.k)
+        return hits
+
+    async def _timed_search(self, index: int):
+        question = self.questions[index]
+        start = time.perf_counter()
+        hits = await self._search(question, self._vectors[index])
+        return hits, (time.perf_counter() - start) * 1000
+
+    async def evaluate(self) -> Dict:
+        """Quality metrics and sequential latency (one search per question)."""
+        self._vectors = await self.fixture.engine.embeddings.embed_many(
+            [q["query"] for q in self.questions],
+            task_type="retrieval_query",
+        )
+
+        per_question = []
+        latencies = []
+        leaked_hits = 0
+        groups: Dict[str, Dict[str, List[Dict]]] = {
+            "category": defaultdict(list),
+            "jurisdiction": defaultdict(list),
+            "filter": defaultdict(list),
+        }
+
+        for i, question in enumerate(self.questions):
+            hits, elapsed_ms = await self._timed_search(i)
+            latencies.append(elapsed_ms)
+            leaked_hits += sum(
+                1 for hit in hits if hit.document.jurisdiction.value != question["jurisdiction"]
+            )
+
+            ranked = self.fixture.ranked_sources(hits)
+            gold = question.get("gold") or []
+            result = {
+                "id": question["id"],
+                "hits": len(hits),
+                "ranked": ranked,
+                "latency_ms": round(elapsed_ms, 3),
+            }
+            if gold:
+                result.update(
+                    recall=round(recall_at_k(ranked, gold, self.k), 4),
+                    mrr=round(reciprocal_rank(ranked, gold, self.k), 4),
+                    ndcg=round(ndcg_at_k(ranked, gold, self.k), 4),
+                    missed=[source for source in gold if source not in ranked[:self.k]],
+                )
+                groups["category"][question.get("category", "other")].append(result)
+                groups["jurisdiction"][question["jurisdiction"]].append(result)
+                groups["filter"][_filter_label(question)].append(result)
+            per_question.append(result)
+
+        scored = [r for r in per_question if "recall" in r]
+        return {
+            "quality": {
+                **self._aggregate(scored),
+                "breakdown": {
+                    name: {
+                        label: self._aggregate(results) for label, results in sorted(group.items())
+                    }
+                    for name, group in groups.items()
+                },
+            },
+            "isolation": {
+                "queries": len(self.questions),
+                "foreign_jurisdiction_hits": leaked_hits,
+            },
+            "latency": latency_summary(latencies),
+            "questions": per_question,
+        }
+
+    def _aggregate(self, results: List[Dict]) -> Dict:
+        return {
+            "questions": len(results),
+            f"recall@{self.k}": _mean([r["recall"] for r in results]),
+            f"mrr@{self.k}": _mean([r["mrr"] for r in results]),
+            f"ndcg@{self.k}": _mean([r["ndcg"] for r in results]),
+        }
+
+    async def throughput(self, concurrency: int, requests: int) -> Dict:
+        """
+        `requests` searches (cycling through the question set) issued by
+        `concurrency` concurrent workers.
+        """
+        if not self._vectors:
+            self._vectors = await self.fixture.engine.embeddings.embed_many(
+                [q["query"] for q in self.questions],
+                task_type="retrieval_query",
+            )
+
+        latencies: List[float] = []
+        next_request = iter(range(requests))
+
+        async def worker():
+            for n in next_request:
+                _, elapsed_ms = await self._timed_search(n % len(self.questions))
+                latencies.append(elapsed_ms)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+        return {
+            "concurrency": concurrency,
+            "requests": requests,
+            "elapsed_s": round(elapsed, 3),
+            "searches_per_s": round(requests / elapsed, 2) if elapsed else 0.0,
+            **latency_summary(latencies),
+        }
+
+
+async def run_benchmark(
+    k: int = 10,
+    concurrency_levels: Optional[List[int]] = None,
+    requests: int = 200,
+    embedding_backend: str = "hashing",
+    qdrant_url: Optional[str] = None,
+    chunk_tokens: Optional[int] = None,
+    questions_path: Optional[Path] = None,
+    reranker_backend: str = "none",
+) -> Dict:
+    """Load the fixture, run quality + throughput benchmarks, return the results dict."""
+    embedder = get_embedder(embedding_backend)
+    chunker = None
+    if chunk_tokens:
+        chunker = LegalChunker(max_tokens=chunk_tokens, overlap_tokens=chunk_tokens // 8)
+    fixture = BenchmarkFixture(embedder, qdrant_url=qdrant_url, chunker=chunker)
+    fixture.engine.reranker = get_reranker(reranker_backend)
+    try:
+        load_start = time.perf_counter()
+        points = await fixture.load()
+        load_seconds = time.perf_counter() - load_start
+
+        runner = BenchmarkRunner(
+            fixture, load_questions(questions_path), k=k, rerank=fixture.engine.reranker is not None
+        )
+        results = await runner.evaluate()
+        results["throughput"] = [
+            await runner.throughput(level, requests) for level in (concurrency_levels or [1, 8, 32])
+        ]
+    finally:
+        await fixture.close()
+
+    results["config"] = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "k": k,
+        "embedder": embedder.name,
+        "reranker": fixture.engine.reranker.name if fixture.engine.reranker else None,
+        "qdrant": qdrant_url or ":memory:",
+        "chunk_tokens": chunk_tokens,
+        "documents": len(fixture.documents),
+        "points": points,
+        "load_seconds": round(load_seconds, 3),
+    }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="DOMULEX retrieval benchmark")
+    parser.add_argument("--k", type=int, default=10, help="Cutoff for recall/MRR/nDCG")
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="Comma-separated concurrency levels"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Searches per concurrency level")
+    parser.add_argument(
+        "--embedder", default="hashing", help="Embedding backend: hashing, local, gemini"
+    )
+    parser.add_argument(
+        "--reranker", default="none", help="Rerank stage: none, lexical, cross-encoder"
+    )
+    parser.add_argument("--qdrant-url", default=None, help="Qdrant server (default: in-memory)")
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=None, help="Chunk documents with LegalChunker"
+    )
+    parser.add_argument("--questions", type=Path, default=None, help="Question set JSON")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write results JSON here (default: stdout)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run_benchmark(
+        k=args.k,
+        concurrency_levels=[int(level) for level in args.concurrency.split(",") if level],
+        requests=args.requests,
+        embedding_backend=args.embedder,
+        qdrant_url=args.qdrant_url,
+        chunk_tokens=args.chunk_tokens,
+        questions_path=args.questions,
+        reranker_backend=args.reranker,
+    ))
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+        quality = results["quality"]
+        print(
+            f"recall@{args.k}={quality[f'recall@{args.k}']} "
+            f"mrr@{args.k}={quality[f'mrr@{args.k}']} "
+            f"ndcg@{args.k}={quality[f'ndcg@{args.k}']} "
+            f"p95={results['latency']['p95_ms']}ms -> {args.output}",
+            file=sys.stderr,
+        )
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -110,7 +110,20 @@ def cache_result(prefix: str, ttl: int = 3600):
     return decorator
 
 
-def cache_embedding(embedding: list[float], text: str, ttl: int = 86400):
+def embedding_cache_key(text: str, model: str = "", task_type: str = "") -> str:
+    """Build the Redis key for an embedding of text under model/task_type."""
+    key_data = f"{model}:{task_type}:{text}" if (model or task_type) else text
+    text_hash = hashlib.md5(key_data.encode()).hexdigest()
+    return f"domulex:embedding:{text_hash}"
+
+
+def cache_embedding(
+    embedding: list[float],
+    text: str,
+    ttl: int = 86400,
+    model: str = "",
+    task_type: str = "",
+):
     """
     Cache embedding vector for text.
     Reduces redundant API calls to Gemini.
@@ -119,25 +132,32 @@ def cache_embedding(embedding: list[float], text: str, ttl: int = 86400):
         embedding: Vector embedding
         text: Original text
         ttl: Time to live (default 24 hours)
+        model: Embedding model name (part of the key)
+        task_type: Gemini task type (part of the key)
     """
     client = get_redis_client()
     if client is None:
         return
     
     try:
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        key = f"domulex:embedding:{text_hash}"
+        key = embedding_cache_key(text, model, task_type)
         client.setex(key, ttl, json.dumps(embedding))
     except Exception as e:
         logger.warning(f"Failed to cache embedding: {e}")
 
 
-def get_cached_embedding(text: str) -> Optional[list[float]]:
+def get_cached_embedding(
+    text: str,
+    model: str = "",
+    task_type: str = "",
+) -> Optional[list[float]]:
     """
     Retrieve cached embedding for text.
     
     Args:
         text: Text to look up
+        model: Embedding model name (part of the key)
+        task_type: Gemini task type (part of the key)
         
     Returns:
         Cached embedding vector or None
@@ -147,8 +167,7 @@ def get_cached_embedding(text: str) -> Optional[list[float]]:
         return None
     
     try:
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        key = f"domulex:embedding:{text_hash}"
+        key = embedding_cache_key(text, model, task_type)
         cached = client.get(key)
         
         if cached:
@@ -161,6 +180,50 @@ def get_cached_embedding(text: str) -> Optional[list[float]]:
         return None
 
 
+def get_cached_embeddings(
+    texts: list[str],
+    model: str = "",
+    task_type: str = "",
+) -> list[Optional[list[float]]]:
+    """
+    Retrieve cached embeddings for several texts in one round-trip (MGET).
+    
+    Returns:
+        List aligned with texts; None where nothing is cached
+    """
+    client = get_redis_client()
+    if client is None or not texts:
+        return [None] * len(texts)
+    
+    try:
+        keys = [embedding_cache_key(text, model, task_type) for text in texts]
+        return [json.loads(cached) if cached else None for cached in client.mget(keys)]
+    except Exception as e:
+        logger.warning(f"Failed to get cached embeddings: {e}")
+        return [None] * len(texts)
+
+
+def cache_embeddings(
+    embeddings: list[list[float]],
+    texts: list[str],
+    ttl: int = 86400,
+    model: str = "",
+    task_type: str = "",
+):
+    """Cache several embeddings in one pipelined round-trip."""
+    client = get_redis_client()
+    if client is None or not texts:
+        return
+    
+    try:
+        pipe = client.pipeline(transaction=False)
+        for text, embedding in zip(texts, embeddings):
+            pipe.setex(embedding_cache_key(text, model, task_type), ttl, json.dumps(embedding))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to cache embeddings: {e}")
+
+
 def invalidate_cache_pattern(pattern: str):
     """
     Invalidate all cache keys matching pattern.
@@ -3,7 +3,7 @@ Configuration management for DOMULEX Backend
 """
 
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 from pydantic import field_validator, ConfigDict
 from pydantic_settings import BaseSettings
@@ -26,8 +26,24 @@ class Settings(BaseSettings):
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
     qdrant_collection: str = "legal_documents"
+    # Serving alias (python -m rag.rebuild), overrides qdrant_collection
+    qdrant_collection_alias: str = ""
     qdrant_use_https: bool = False
     qdrant_api_key: str = ""  # API Key for Qdrant Cloud
+    # None: gRPC for host:port only, REST for qdrant_url / https endpoints
+    qdrant_prefer_grpc: Optional[bool] = None
+    qdrant_grpc_port: int = 6334
+    qdrant_pool_size: int = 20  # max concurrent connections of the shared client
+    qdrant_timeout: int = 5  # seconds per request
+    
+    # Vector storage of new/rebuilt collections (rag/schema.py, python -m rag.rebuild)
+    qdrant_quantization: str = "scalar"  # "scalar" (int8), "binary" or "none"
+    qdrant_vectors_on_disk: bool = True  # float32 originals on disk, quantized vectors in RAM
+    qdrant_hnsw_m: int = 16
+    qdrant_hnsw_ef_construct: int = 100
+    qdrant_hnsw_ef: int = 128  # search-time beam width
+    qdrant_rescore: bool = True  # re-rank quantized candidates with the original vectors
+    qdrant_oversampling: float = 2.0  # quantized candidates fetched per requested hit
     
     # CORS - parsed from comma-separated string
     cors_origins: str = "http://localhost:3000,https://domulex-ai.web.app,https://domulex.ai,https://www.domulex.ai"
@@ -36,12 +52,20 @@ class Settings(BaseSettings):
         """Get CORS origins as a list."""
         return [origin.strip() for origin in self.cors_origins.split(',')]
     
+    def serving_collection(self) -> str:
+        """Name searches and ingestion use: the rebuild alias if configured, else the collection."""
+        return self.qdrant_collection_alias or self.qdrant_collection
+    
     # Firebase (optional - for authentication)
     firebase_project_id: str = ""
     firebase_private_key_id: str = ""
     firebase_private_key: str = ""
     firebase_client_email: str = ""
     
+    # Auth fast path
+    auth_token_cache_size: int = 10000  # decoded ID tokens / session ids kept in memory
+    auth_session_cache_ttl: int = 30  # seconds an activeSessionId is trusted without Firestore
+    
     # Redis (optional - for caching)
     redis_host: str = "localhost"
     redis_port: int = 6379
@@ -49,6 +73,100 @@ class Settings(BaseSettings):
     redis_password: str = ""
     enable_cache: bool = False
     cache_ttl: int = 3600
+
+    # Embedding backend: "gemini" (API), "local" (sentence-transformers), "hashing" (offline tests)
+    embedding_backend: str = "gemini"
+    embedding_model: str = "models/text-embedding-004"
+    embedding_dimension: int = 768  # vector size of the Qdrant collection
+    local_embedding_model: str = "intfloat/multilingual-e5-base"
+    local_embedding_device: str = "cpu"
+    local_embedding_batch_size: int = 32
+    
+    # Embeddings (in-process LRU in front of Redis + micro-batching)
+    embedding_cache_size: int = 4096
+    embedding_cache_ttl: int = 86400
+    embedding_batch_window_ms: int = 5
+    embedding_batch_max_size: int = 100
+    
+    # Hybrid retrieval (BM25 over the payloads + dense, fused with RRF)
+    hybrid_retrieval: bool = True
+    hybrid_candidates: int = 50  # candidates per retriever before fusion
+    hybrid_rrf_k: int = 60
+    lexical_index_refresh_seconds: int = 3600  # rebuild to pick up points from ingestion workers
+    citation_resolver: bool = True  # direct § / Aktenzeichen lookup before vector search
+    citation_index_path: str = "/app/cache/citation_index.json"
+    citation_index_refresh_seconds: int = 3600
+    
+    # Reranking: over-fetch -> reranker + recency prior -> top N within a token budget
+    # "cross-encoder" (loaded at startup), "lexical", "none"
+    reranker_backend: str = "cross-encoder"
+    reranker_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # multilingual, CPU-sized
+    reranker_device: str = "cpu"
+    reranker_batch_size: int = 32
+    rerank_candidates: int = 50  # hits fetched for reranking
+    rerank_top_n: int = 4  # documents sent to the generator
+    rerank_top_n_lawyer: int = 8
+    rerank_token_budget: int = 3000  # context tokens for retrieved documents
+    rerank_recency_weight: float = 0.1  # share of the recency prior in the final score
+    rerank_recency_half_life_days: int = 3650
+    
+    # Prompt context (uploads + retrieved sources, ~4 chars per token)
+    context_token_budget: int = 6000
+    context_source_max_tokens: int = 800  # cap per retrieved source
+    context_upload_share: float = 0.6  # budget reserved for uploaded documents
+    context_dedup_threshold: float = 0.8  # MinHash Jaccard above which passages are duplicates
+    
+    # Long uploads: per-upload index, relevant passages instead of the first N tokens
+    upload_index_chunk_tokens: int = 256
+    upload_index_top_k: int = 8  # passages per upload and question at most
+    upload_index_ttl: int = 1800  # seconds an index is kept after its last use
+    upload_index_max_entries: int = 64
+    upload_index_max_chunks: int = 400  # chunks embedded per upload (~100k tokens at 256)
+    
+    # CRM and generated document search: per-lawyer embedding index (services/document_index.py)
+    document_index_max_chars: int = 8000  # characters of a document that are embedded
+    document_index_max_lawyers: int = 256  # per-lawyer indexes kept in process
+    document_search_max_documents: int = 1000  # documents per lawyer loaded for a search
+    document_search_rerank_top_n: int = 5  # best hits reranked by one Gemini call, 0 = off
+    # Cosine below which hits are dropped (text-embedding-004)
+    document_search_min_score: float = 0.5
+    
+    # Answer verification: local citation check, LLM critic only if inconclusive
+    # "local_first", "llm" (always critic), "local" (never critic)
+    verification_mode: str = "local_first"
+    # Critic after the response, verdict via GET /query/verification/{id}
+    verification_async: bool = True
+    verification_ttl: int = 3600  # seconds verdicts stay retrievable
+    
+    # OCR of scanned PDFs (services/ocr_engine.py)
+    ocr_workers: int = 2  # Tesseract processes per API worker, shared by all requests
+    ocr_dpi: int = 300
+    ocr_languages: str = "deu+eng"
+    ocr_max_pages: int = 100  # pages recognized per document
+    ocr_timeout_seconds: float = 120.0  # per document; partial text after that
+    ocr_cache_size: int = 64  # results kept in process (Redis when enable_cache)
+    ocr_cache_ttl: int = 86400
+    
+    # Upload parsing off the event loop (services/parsing_service.py)
+    parse_workers: int = 2  # parser processes per API worker (PDF, Excel, image OCR)
+    parse_timeout_seconds: float = 60.0  # per parse job, OCR excluded
+    parse_inline_max_bytes: int = 262144  # TXT/CSV up to this size parsed on the event loop
+    parse_process_min_bytes: int = 5242880  # any format from this size goes to a process
+    
+    # Parsed uploads by SHA-256 (services/document_store.py; Redis when enable_cache)
+    document_store_path: str = "/app/cache/documents"
+    document_store_max_mb: int = 512  # LRU cap of the disk store
+    document_store_ttl: int = 604800  # seconds in Redis after last use
+    
+    # Answer cache for /query (TTL = cache_ttl)
+    enable_answer_cache: bool = True
+    answer_cache_similarity: float = 0.97  # cosine threshold for near-duplicate hits
+    answer_cache_max_entries: int = 1024
+    
+    # Query quota counter (Redis/in-process, flushed to Firestore in batches)
+    quota_flush_interval: float = 5.0  # seconds between Firestore writes
+    quota_reconcile_interval: int = 300  # seconds between crash-recovery runs
+    quota_cache_ttl: int = 300  # reload used/limit from Firestore after this
     
     # Stripe (for payments)
     stripe_secret_key: str = ""
@@ -62,6 +180,17 @@ class Settings(BaseSettings):
     celery_broker_url: str = "redis://localhost:6379/0"
     celery_result_backend: str = "redis://localhost:6379/1"
     
+    # Ingestion pipeline (dedup → relevance → chunk → embed → upsert)
+    ingestion_relevance_concurrency: int = 4  # parallel relevance checks (LLM for borderline docs)
+    ingestion_embed_concurrency: int = 4  # embedding requests in flight
+    ingestion_embed_batch_size: int = 100  # texts per embedding request
+    ingestion_upsert_batch_size: int = 256  # points per Qdrant upsert
+    ingestion_queue_size: int = 64  # bound of each stage queue
+    chunk_max_tokens: int = 512  # token budget per chunk
+    chunk_overlap_tokens: int = 64  # context repeated in the next chunk of a section
+    dedup_index_path: str = "/app/cache/dedup_index.sqlite3"  # used when Redis is unavailable
+    dedup_max_age_days: int = 90  # re-index documents older than this
+    
     # API Keys
     courtlistener_api_key: str = ""
     
@@ -73,6 +202,7 @@ class Settings(BaseSettings):
     # Feature Flags
     enable_pdf_analysis: bool = True
     enable_conflict_resolution: bool = True
+    clause_analysis_concurrency: int = 5  # parallel clause searches + Gemini comparisons
     enable_auto_ingestion: bool = False
     
     # API Settings
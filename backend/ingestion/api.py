@@ -11,6 +11,7 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 
 from config import get_settings
+from qdrant_pool import get_async_qdrant_client
 from ingestion.processor import DocumentProcessor
 from ingestion.scrapers.german_admin_scraper import GermanAdminScraper
 from ingestion.scrapers.german_laws_scraper import GermanLawsScraper
@@ -283,22 +284,13 @@ async def get_ingestion_stats():
     """
     Get current ingestion statistics
     """
-    from qdrant_client import QdrantClient
-    
     try:
-        # Connect to Qdrant
-        if settings.qdrant_api_key:
-            client = QdrantClient(
-                url=f"https://{settings.qdrant_host}",
-                api_key=settings.qdrant_api_key
-            )
-        else:
-            client = QdrantClient(
-                host=settings.qdrant_host,
-                port=settings.qdrant_port
-            )
+        # Shared pooled async client
+        client = get_async_qdrant_client()
+        if client is None:
+            raise RuntimeError("Qdrant not configured")
         
-        collection_info = client.get_collection(settings.qdrant_collection)
+        collection_info = await client.get_collection(settings.serving_collection())
         total = collection_info.points_count
         
         # Get counts by jurisdiction (would need actual query)
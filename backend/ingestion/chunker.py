@@ -0,0 +1,252 @@
+"""
+Legal Text Chunker
+Structure-aware, token-budgeted chunking for German legal documents.
+
+1. Sections: statute sections (§ 535, Art. 14) and judgment headings
+   (Leitsatz, Tenor, Tatbestand, Gründe, ...) at line start
+2. Units: sentences (abbreviation-aware: Abs., Nr., Rn., vgl., z.B., ...)
+   and line breaks (lists, headings)
+3. Packing: whole sections are merged while they fit the token budget;
+   larger sections are packed unit by unit with a token overlap, and
+   continuation chunks repeat the section heading
+
+Every step is a single regex pass or a single scan over the text, so the
+cost is linear in the document length (no re-splitting, no re-summing).
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+# Line-anchored section starts
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:§{1,2}|Art\.|Artikel)[ \t]*\d+[a-z]?\b[^\n]*"
+    r"|(?:Leitsätze|Leitsatz|Orientierungssatz|Tenor|Tatbestand|Sachverhalt"
+    r"|Entscheidungsgründe|Gründe|Entscheidung)[ \t]*(?::[^\n]*|$)"
+    r")",
+    re.MULTILINE,
+)
+
+# Candidate sentence ends (followed by the next non-space char) and line breaks
+_BOUNDARY_RE = re.compile(r"[.!?…]+[\"'»“”)\]]*[ \t]+(?=(\S))|\n+")
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\S+")
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
+# Abbreviations that end with a period but do not end a sentence (lowercase, without period)
+ABBREVIATIONS = frozenset({
+    "abs", "nr", "nrn", "rn", "rnr", "rz", "art", "artt", "satz", "s", "hs", "halbs",
+    "lit", "buchst", "var", "alt", "ziff", "abschn", "kap", "anm", "bd", "aufl",
+    "vgl", "ggf", "bzw", "usw", "etc", "ca", "evtl", "inkl", "zzgl", "insb", "sog",
+    "gem", "allg", "einschl", "ausschl", "grds", "abl", "ff", "f", "vorb",
+    "az", "urt", "beschl", "bgbl", "bstbl", "bt-drs", "drs", "v", "vom",
+    "dr", "prof", "str", "tz", "mwn", "m.w.n", "nachw", "zit", "st", "rspr",
+})
+
+TokenCounter = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate subword token count without a tokenizer: one token per
+    word/punctuation mark plus one per 8 characters of long words
+    (German compounds split into several subword tokens).
+    """
+    return sum(1 + len(token) // 8 for token in _TOKEN_RE.findall(text))
+
+
+def _is_abbreviation(word: str) -> bool:
+    """word: the text before the period, e.g. 'Abs', 'z.B', '12'."""
+    if not word:
+        return True
+    if "." in word:
+        return not word[-4:].isdigit()  # z.B. / i.V.m. - but not dates like 12.3.2020
+    if len(word) == 1:
+        return True  # S. / a.
+    if word.isdigit():
+        return len(word) <= 2  # enumerations and ordinals ("1.", "12. Senat"), not years
+    return word.lower().lstrip("(") in ABBREVIATIONS
+
+
+def split_units(text: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Sentence/line spans (start, end) of text[start:end].
+    """
+    end = len(text) if end is None else end
+    spans = []
+    unit_start = start
+    for match in _BOUNDARY_RE.finditer(text, start, end):
+        if not match.group().startswith("\n"):
+            next_char = match.group(1)
+            if next_char.islower():
+                continue
+            # Word before the punctuation (scan back to the previous whitespace only)
+            punct = match.start()
+            word_start = max(
+                text.rfind(" ", unit_start, punct),
+                text.rfind("\n", unit_start, punct),
+                text.rfind("\t", unit_start, punct),
+            ) + 1
+            if _is_abbreviation(text[max(word_start, unit_start):punct]):
+                continue
+        if match.end() > unit_start:
+            spans.append((unit_start, match.end()))
+            unit_start = match.end()
+    if unit_start < end:
+        spans.append((unit_start, end))
+    return [(a, b) for a, b in spans if text[a:b].strip()]
+
+
+def split_sections(text: str) -> List[Tuple[int, int, str]]:
+    """
+    Section spans (start, end, heading). The text before the first heading
+    is a section with an empty heading.
+    """
+    starts = [(match.start(), match.group().strip()) for match in _HEADING_RE.finditer(text)]
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, ""))
+    sections = []
+    for i, (start, heading) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        if text[start:end].strip():
+            sections.append((start, end, heading))
+    return sections
+
+
+def _clean(text: str) -> str:
+    return _BLANK_LINES_RE.sub("\n\n", _SPACES_RE.sub(" ", text)).strip()
+
+
+@dataclass
+class _Unit:
+    start: int
+    end: int
+    tokens: int
+
+
+class LegalChunker:
+    """
+    Token-budgeted chunker.
+
+    Args:
+        max_tokens: Budget per chunk (estimate_tokens or token_counter)
+        overlap_tokens: Trailing context repeated in the next chunk of the same section
+        token_counter: Optional exact tokenizer (defaults to estimate_tokens)
+    """
+
+    # Longer "headings" are regular sentences starting with a citation
+    MAX_HEADING_TOKENS = 32
+
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        overlap_tokens: int = 64,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = token_counter or estimate_tokens
+
+    def chunk(self, text: str) -> List[str]:
+        """Split text into chunks of at most max_tokens."""
+        chunks: List[str] = []
+
+        # Consecutive small sections are merged into one chunk
+        pending_start, pending_end, pending_tokens = 0, 0, 0
+
+        def flush_pending():
+            nonlocal pending_tokens
+            if pending_tokens:
+                chunks.append(_clean(text[pending_start:pending_end]))
+                pending_tokens = 0
+
+        for start, end, heading in split_sections(text):
+            units = [
+                _Unit(a, b, self.count_tokens(text[a:b]))
+                for a, b in split_units(text, start, end)
+            ]
+            section_tokens = sum(unit.tokens for unit in units)
+
+            if section_tokens <= self.max_tokens:
+                if pending_tokens and pending_tokens + section_tokens > self.max_tokens:
+                    flush_pending()
+                if not pending_tokens:
+                    pending_start = start
+                pending_end = end
+                pending_tokens += section_tokens
+                continue
+
+            flush_pending()
+            chunks.extend(self._pack_section(text, units, heading))
+
+        flush_pending()
+        return [chunk for chunk in chunks if chunk]
+
+    def _pack_section(self, text: str, units: List[_Unit], heading: str) -> List[str]:
+        """Pack the units of one oversized section with overlap."""
+        heading_tokens = self.count_tokens(heading) if heading else 0
+        if heading_tokens > self.MAX_HEADING_TOKENS:
+            heading, heading_tokens = "", 0
+        budget = self.max_tokens - heading_tokens
+
+        chunks: List[str] = []
+        window: Deque[_Unit] = deque()
+        window_tokens = 0
+
+        def emit(body: str):
+            # The first chunk starts with the heading already
+            if heading and chunks:
+                body = f"{heading}\n{body}"
+            chunks.append(_clean(body))
+
+        for unit in units:
+            if unit.tokens > budget:
+                # Single sentence beyond the budget (tables, run-on text): split by words
+                if window:
+                    emit(text[window[0].start:window[-1].end])
+                window.clear()
+                window_tokens = 0
+                for piece in self._split_words(text[unit.start:unit.end], budget):
+                    emit(piece)
+                continue
+
+            if window and window_tokens + unit.tokens > budget:
+                emit(text[window[0].start:window[-1].end])
+                # Keep trailing units up to overlap_tokens as context
+                overlap: Deque[_Unit] = deque()
+                overlap_tokens = 0
+                for kept in reversed(window):
+                    if overlap_tokens + kept.tokens > self.overlap_tokens:
+                        break
+                    overlap.appendleft(kept)
+                    overlap_tokens += kept.tokens
+                window, window_tokens = overlap, overlap_tokens
+
+            window.append(unit)
+            window_tokens += unit.tokens
+
+        if window:
+            emit(text[window[0].start:window[-1].end])
+        return chunks
+
+    def _split_words(self, text: str, budget: int) -> List[str]:
+        pieces = []
+        piece_start, piece_end, piece_tokens = None, 0, 0
+        for match in _WORD_RE.finditer(text):
+            tokens = self.count_tokens(match.group())
+            if piece_start is not None and piece_tokens + tokens > budget:
+                pieces.append(text[piece_start:piece_end])
+                piece_start, piece_tokens = None, 0
+            if piece_start is None:
+                piece_start = match.start()
+            piece_end = match.end()
+            piece_tokens += tokens
+        if piece_start is not None:
+            pieces.append(text[piece_start:piece_end])
+        return pieces
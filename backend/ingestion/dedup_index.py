@@ -0,0 +1,181 @@
+"""
+Dedup Index for the Ingestion Pipeline
+Records which document hashes were indexed and when, shared by all workers.
+
+- RedisDedupIndex: one small key per document with a TTL of the re-index
+  age, shared across Celery workers and Cloud Run instances
+- SQLiteDedupIndex: single WAL-mode database file for local/single-node runs
+
+Both support bulk lookups, so a whole scraper batch is checked in one
+round-trip (MGET / one SELECT per 500 hashes).
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from cache import get_redis_client
+from config import get_settings
+from models.legal import Jurisdiction
+
+logger = logging.getLogger(__name__)
+
+
+def dedup_key(doc_hash: str, jurisdiction: Jurisdiction) -> str:
+    """Index key of a document: hashes are tracked per jurisdiction."""
+    return f"{jurisdiction.value}:{doc_hash}"
+
+
+def _epoch(indexed_at: Optional[datetime]) -> float:
+    """Epoch seconds of a naive UTC datetime (default: now)."""
+    if indexed_at is None:
+        return time.time()
+    return indexed_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class DedupIndex:
+    """
+    Base class: stores the indexing time per key.
+
+    Subclasses implement indexed_at_many (bulk lookup) and mark_many (bulk insert).
+    """
+
+    def __init__(self, max_age_days: Optional[int] = None):
+        self.max_age = timedelta(
+            days=max_age_days if max_age_days is not None else get_settings().dedup_max_age_days
+        )
+
+    def indexed_at_many(self, keys: List[str]) -> Dict[str, datetime]:
+        """Return the indexing time of every known key."""
+        raise NotImplementedError
+
+    def mark_many(self, keys: Iterable[str], indexed_at: Optional[datetime] = None):
+        """Record keys as indexed (default: now)."""
+        raise NotImplementedError
+
+    def fresh(self, keys: List[str]) -> Set[str]:
+        """
+        Keys indexed less than max_age ago (= duplicates to skip).
+        Older entries are re-indexed so amended laws get refreshed.
+        """
+        if not keys:
+            return set()
+        now = datetime.utcnow()
+        duplicates = set()
+        for key, indexed_at in self.indexed_at_many(list(keys)).items():
+            age = now - indexed_at
+            if age < self.max_age:
+                duplicates.add(key)
+            else:
+                logger.info(f"🔄 Re-indexing altes Dokument: {key[:16]}... (Age: {age.days}d)")
+        if duplicates:
+            logger.info(f"✅ {len(duplicates)}/{len(keys)} Duplicates gefunden")
+        return duplicates
+
+
+class RedisDedupIndex(DedupIndex):
+    """Shared index in Redis: key -> epoch seconds, expiring after max_age."""
+
+    PREFIX = "domulex:dedup:"
+
+    def __init__(self, client, max_age_days: Optional[int] = None):
+        super().__init__(max_age_days)
+        self.client = client
+
+    def indexed_at_many(self, keys: List[str]) -> Dict[str, datetime]:
+        values = self.client.mget([self.PREFIX + key for key in keys])
+        return {
+            key: datetime.utcfromtimestamp(float(value))
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def mark_many(self, keys: Iterable[str], indexed_at: Optional[datetime] = None):
+        timestamp = _epoch(indexed_at)
+        ttl = int(self.max_age.total_seconds())
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.setex(self.PREFIX + key, ttl, timestamp)
+        pipe.execute()
+
+
+class SQLiteDedupIndex(DedupIndex):
+    """Local index in one SQLite file (WAL: concurrent readers, one writer)."""
+
+    # SQLite's default limit on host parameters is 999
+    LOOKUP_BATCH = 500
+
+    def __init__(self, path: str, max_age_days: Optional[int] = None):
+        super().__init__(max_age_days)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS indexed_documents ("
+                " key TEXT PRIMARY KEY,"
+                " indexed_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._conn.commit()
+
+    def indexed_at_many(self, keys: List[str]) -> Dict[str, datetime]:
+        found: Dict[str, datetime] = {}
+        with self._lock:
+            for start in range(0, len(keys), self.LOOKUP_BATCH):
+                batch = keys[start:start + self.LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, indexed_at FROM indexed_documents WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, indexed_at in rows:
+                    found[key] = datetime.utcfromtimestamp(indexed_at)
+        return found
+
+    def mark_many(self, keys: Iterable[str], indexed_at: Optional[datetime] = None):
+        timestamp = _epoch(indexed_at)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO indexed_documents (key, indexed_at) VALUES (?, ?)",
+                [(key, timestamp) for key in keys],
+            )
+            self._conn.commit()
+
+    def prune(self) -> int:
+        """Delete entries older than max_age (they would be re-indexed anyway)."""
+        cutoff = time.time() - self.max_age.total_seconds()
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM indexed_documents WHERE indexed_at < ?", (cutoff,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+
+# Process-wide index (initialized lazily)
+_dedup_index: Optional[DedupIndex] = None
+
+
+def get_dedup_index() -> DedupIndex:
+    """Redis-backed index when Redis is available, otherwise local SQLite."""
+    global _dedup_index
+
+    if _dedup_index is None:
+        client = get_redis_client()
+        if client is not None:
+            _dedup_index = RedisDedupIndex(client)
+            logger.info("✅ Dedup index: Redis")
+        else:
+            settings = get_settings()
+            _dedup_index = SQLiteDedupIndex(settings.dedup_index_path)
+            _dedup_index.prune()
+            logger.info(f"✅ Dedup index: SQLite ({settings.dedup_index_path})")
+
+    return _dedup_index
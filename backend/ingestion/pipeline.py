@@ -0,0 +1,330 @@
+"""
+Streaming Ingestion Pipeline
+Explicit stages connected by bounded queues:
+
+    dedup → relevance → chunk → embed → upsert
+
+Each stage runs its own workers, so a slow LLM relevance check, a Gemini
+embedding request and a Qdrant upsert for different documents overlap
+instead of running one document at a time. Bounded queues keep memory flat
+when the producer (scrapers) is faster than the consumers.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from qdrant_client.models import PointStruct
+
+from models.legal import LegalDocument
+from ingestion.dedup_index import dedup_key
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed through the queues
+_DONE = object()
+
+
+@dataclass
+class _WorkItem:
+    """One document moving through the pipeline."""
+    document: LegalDocument
+    doc_hash: str = ""
+    confidence: float = 0.0
+    chunks: List[str] = field(default_factory=list)
+    points: List[PointStruct] = field(default_factory=list)
+
+
+class IngestionPipeline:
+    """
+    Concurrent ingestion for a batch of documents.
+
+    - dedup: hashes of the whole batch checked against the shared dedup
+      index in one bulk lookup
+    - relevance: keyword check + LLM validation in worker threads,
+      `relevance_concurrency` documents at a time
+    - chunk: chunking in worker threads
+    - embed: chunks of several documents are packed into one embedding
+      request of up to `embed_batch_size` texts, `embed_concurrency`
+      requests in flight
+    - upsert: points of several documents are grouped into one Qdrant
+      upsert of about `upsert_batch_size` points; documents are marked as
+      indexed only after their points were written
+    """
+
+    def __init__(
+        self,
+        processor,
+        relevance_concurrency: Optional[int] = None,
+        embed_concurrency: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.processor = processor
+        self.collection_name = settings.serving_collection()
+        self.relevance_concurrency = (
+            relevance_concurrency or settings.ingestion_relevance_concurrency
+        )
+        self.embed_concurrency = embed_concurrency or settings.ingestion_embed_concurrency
+        self.embed_batch_size = embed_batch_size or settings.ingestion_embed_batch_size
+        self.upsert_batch_size = upsert_batch_size or settings.ingestion_upsert_batch_size
+        self.queue_size = queue_size or settings.ingestion_queue_size
+
+        self.stats: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    async def run(self, documents: List[LegalDocument], force: bool = False) -> Dict[str, int]:
+        """
+        Push all documents through the pipeline.
+
+        Returns:
+            Aggregated stats (found, processed, duplicates, irrelevant, failed, uploaded_chunks)
+        """
+        self.stats = {
+            "found": len(documents),
+            "processed": 0,
+            "duplicates": 0,
+            "irrelevant": 0,
+            "failed": 0,
+            "uploaded_chunks": 0,
+        }
+        if not documents:
+            return self.stats
+
+        relevance_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        chunk_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        embed_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        upsert_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        await asyncio.gather(
+            self._dedup_stage(documents, relevance_q, force),
+            self._stage(relevance_q, chunk_q, self._relevance, self.relevance_concurrency),
+            self._stage(chunk_q, embed_q, self._chunk, 1),
+            self._embed_stage(embed_q, upsert_q),
+            self._upsert_stage(upsert_q),
+        )
+
+        logger.info(
+            f"📦 Ingestion finished: {self.stats['processed']}/{self.stats['found']} processed, "
+            f"{self.stats['uploaded_chunks']} chunks, {self.stats['duplicates']} duplicates, "
+            f"{self.stats['irrelevant']} irrelevant, {self.stats['failed']} failed"
+        )
+        return self.stats
+
+    # ------------------------------------------------------------------
+    # Stage plumbing
+    # ------------------------------------------------------------------
+
+    async def _stage(
+        self,
+        in_q: asyncio.Queue,
+        out_q: asyncio.Queue,
+        handler: Callable[[_WorkItem], Awaitable[Optional[_WorkItem]]],
+        concurrency: int,
+    ):
+        """
+        Run `concurrency` workers applying handler to each item.
+
+        handler returns the item for the next stage or None to drop it.
+        A worker that sees the end marker puts it back for its siblings;
+        once all workers stopped, the marker is forwarded downstream.
+        """
+        async def worker():
+            while True:
+                item = await in_q.get()
+                if item is _DONE:
+                    # Let sibling workers see the marker too
+                    await in_q.put(_DONE)
+                    return
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    self._fail([item], e)
+                    continue
+                if result is not None:
+                    await out_q.put(result)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        await out_q.put(_DONE)
+
+    def _fail(self, items: List[_WorkItem], error: Exception):
+        for item in items:
+            self.stats["failed"] += 1
+            logger.error(f"Fehler bei Dokument {item.document.title[:50]}: {error}")
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    async def _dedup_stage(self, documents: List[LegalDocument], out_q: asyncio.Queue, force: bool):
+        """Hash all documents and drop known ones with one bulk index lookup."""
+        items = [
+            _WorkItem(
+                document=document,
+                doc_hash=self.processor.compute_document_hash(document.content_original),
+            )
+            for document in documents
+        ]
+
+        duplicates = set()
+        if not force:
+            try:
+                duplicates = await asyncio.to_thread(
+                    self.processor.find_duplicates,
+                    [(item.doc_hash, item.document.jurisdiction) for item in items],
+                )
+            except Exception as e:
+                # Index unavailable: re-embedding beats skipping new documents
+                logger.warning(f"Dedup index lookup failed, processing all documents: {e}")
+
+        for item in items:
+            if dedup_key(item.doc_hash, item.document.jurisdiction) in duplicates:
+                self.stats["duplicates"] += 1
+                continue
+            await out_q.put(item)
+        await out_q.put(_DONE)
+
+    async def _relevance(self, item: _WorkItem) -> Optional[_WorkItem]:
+        document = item.document
+        # Blocking LLM call for borderline documents - keep it off the event loop
+        is_relevant, confidence = await asyncio.to_thread(
+            self.processor.classify_relevance,
+            text=document.content_original,
+            jurisdiction=document.jurisdiction,
+            title=document.title,
+        )
+        if not is_relevant:
+            self.stats["irrelevant"] += 1
+            logger.warning(f"⏭️  SKIPPING: {document.title} (confidence: {confidence:.2f})")
+            return None
+        item.confidence = confidence
+        return item
+
+    async def _chunk(self, item: _WorkItem) -> Optional[_WorkItem]:
+        item.chunks = await asyncio.to_thread(
+            self.processor.chunk_text, item.document.content_original
+        )
+        if not item.chunks:
+            self.stats["irrelevant"] += 1
+            return None
+        return item
+
+    # How long an embed worker waits for more documents to fill a request
+    EMBED_LINGER_SECONDS = 0.05
+
+    async def _embed_stage(self, in_q: asyncio.Queue, out_q: asyncio.Queue):
+        """
+        Pack chunks of consecutive documents into embedding requests of up
+        to embed_batch_size texts. A worker waits at most EMBED_LINGER_SECONDS
+        for a request to fill up. A document larger than the batch size is
+        split across requests by generate_embeddings.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def worker():
+            carry: Optional[_WorkItem] = None
+            done = False
+            while not done:
+                item = carry if carry is not None else await in_q.get()
+                carry = None
+                if item is _DONE:
+                    await in_q.put(_DONE)
+                    return
+
+                batch = [item]
+                size = len(item.chunks)
+                deadline = loop.time() + self.EMBED_LINGER_SECONDS
+                while size < self.embed_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        queued = await asyncio.wait_for(in_q.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if queued is _DONE:
+                        await in_q.put(_DONE)
+                        done = True
+                        break
+                    if size + len(queued.chunks) > self.embed_batch_size:
+                        # Doesn't fit - it starts the next request
+                        carry = queued
+                        break
+                    batch.append(queued)
+                    size += len(queued.chunks)
+
+                await self._embed_and_forward(batch, out_q)
+
+        await asyncio.gather(*[worker() for _ in range(self.embed_concurrency)])
+        await out_q.put(_DONE)
+
+    async def _embed_and_forward(self, batch: List[_WorkItem], out_q: asyncio.Queue):
+        texts = [chunk for item in batch for chunk in item.chunks]
+        try:
+            embeddings = await self.processor.generate_embeddings(
+                texts, batch_size=self.embed_batch_size
+            )
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        offset = 0
+        for item in batch:
+            vectors = embeddings[offset:offset + len(item.chunks)]
+            offset += len(item.chunks)
+            item.points = self.processor.build_points(
+                item.document, item.doc_hash, item.chunks, vectors, item.confidence
+            )
+            await out_q.put(item)
+
+    async def _upsert_stage(self, in_q: asyncio.Queue):
+        """Group points of several documents into one Qdrant upsert."""
+        pending: List[_WorkItem] = []
+        pending_points = 0
+
+        while True:
+            item = await in_q.get()
+            if item is _DONE:
+                break
+            pending.append(item)
+            pending_points += len(item.points)
+            if pending_points >= self.upsert_batch_size:
+                await self._flush(pending)
+                pending, pending_points = [], 0
+
+        if pending:
+            await self._flush(pending)
+
+    async def _flush(self, items: List[_WorkItem]):
+        points = [point for item in items for point in item.points]
+        try:
+            await self.processor.qdrant.upsert(
+                collection_name=self.collection_name,
+                points=points,
+            )
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        try:
+            await asyncio.to_thread(
+                self.processor.mark_as_indexed,
+                [(item.doc_hash, item.document.jurisdiction) for item in items],
+            )
+        except Exception as e:
+            # Points are written; worst case the next run re-embeds these documents
+            logger.warning(f"Dedup index update failed: {e}")
+
+        for item in items:
+            self.stats["processed"] += 1
+            self.stats["uploaded_chunks"] += len(item.chunks)
+            logger.info(f"🎉 UPLOADED: {item.document.title} - {len(item.chunks)} chunks")
+
+        logger.info(f"⬆️  Upserted {len(points)} points for {len(items)} documents")
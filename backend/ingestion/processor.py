@@ -4,19 +4,24 @@ Decides: "Is this relevant for Real Estate?"
 Performs: Deduplication, Chunking, Embedding, Metadata Enrichment
 """
 
+import asyncio
 import logging
 import hashlib
-import json
-from typing import List, Dict, Optional, Tuple
+import uuid
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
-from pathlib import Path
 
 import google.generativeai as genai
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import PointStruct
 
 from models.legal import LegalDocument, Jurisdiction
 from config import get_settings
+from qdrant_pool import get_async_qdrant_client, create_async_qdrant_client
+from ingestion.dedup_index import DedupIndex, dedup_key, get_dedup_index
+from ingestion.chunker import LegalChunker
+from rag.embedder import Embedder, get_embedder
+from rag.schema import document_payload
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -31,7 +36,7 @@ class DocumentProcessor:
     1. Relevanz-Klassifizierung
     2. Deduplizierung (Hash-basiert)
     3. Chunking
-    4. Embedding-Generierung
+    4. Embedding-Generierung (Gemini oder lokal, siehe rag/embedder.py)
     5. Qdrant Upload
     """
     
@@ -57,13 +62,22 @@ class DocumentProcessor:
         ],
     }
     
-    # Cache Verzeichnis für Hashes
-    CACHE_DIR = Path("/app/cache/document_hashes")
-    
-    def __init__(self, qdrant_client: QdrantClient):
-        self.qdrant = qdrant_client
-        self.cache_dir = self.CACHE_DIR
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    def __init__(
+        self,
+        qdrant_client: Optional[AsyncQdrantClient] = None,
+        dedup_index: Optional[DedupIndex] = None,
+        embedder: Optional[Embedder] = None,
+    ):
+        # Default: shared pooled client of this process
+        self.qdrant = qdrant_client or get_async_qdrant_client()
+        # Shared dedup index (Redis if available, else local SQLite)
+        self.dedup = dedup_index or get_dedup_index()
+        # Same embedding model as the query side (RAGEngine)
+        self.embedder = embedder or get_embedder()
+        self.chunker = LegalChunker(
+            max_tokens=settings.chunk_max_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+        )
         
     def compute_document_hash(self, content: str) -> str:
         """SHA256 Hash für Deduplizierung"""
@@ -72,35 +86,31 @@ class DocumentProcessor:
     def is_duplicate(self, doc_hash: str, jurisdiction: Jurisdiction) -> bool:
         """
         Prüft ob Dokument bereits existiert.
-        Hash wird in Filesystem gespeichert (schneller als DB-Lookup).
+        Nach 90 Tagen (dedup_max_age_days) wird erneut indiziert.
+        """
+        key = dedup_key(doc_hash, jurisdiction)
+        return key in self.dedup.fresh([key])
+    
+    def find_duplicates(self, entries: List[Tuple[str, Jurisdiction]]) -> Set[str]:
         """
-        hash_file = self.cache_dir / f"{jurisdiction.value}_{doc_hash}.json"
+        Bulk-Variante von is_duplicate für einen ganzen Scraper-Batch
+        (ein Round-Trip zum Index).
         
-        if hash_file.exists():
-            # Prüfe Alter - nach 90 Tagen erneut indizieren
-            data = json.loads(hash_file.read_text())
-            indexed_at = datetime.fromisoformat(data["indexed_at"])
-            age_days = (datetime.utcnow() - indexed_at).days
-            
-            if age_days < 90:
-                logger.info(f"✅ Duplicate gefunden: {doc_hash[:12]}... (Age: {age_days}d)")
-                return True
-            else:
-                logger.info(f"🔄 Re-indexing altes Dokument: {doc_hash[:12]}... (Age: {age_days}d)")
-                return False
+        Args:
+            entries: (doc_hash, jurisdiction) Paare
         
-        return False
+        Returns:
+            Dedup-Keys (dedup_key) der Duplikate
+        """
+        return self.dedup.fresh(
+            [dedup_key(doc_hash, jurisdiction) for doc_hash, jurisdiction in entries]
+        )
     
-    def mark_as_indexed(self, doc_hash: str, jurisdiction: Jurisdiction, metadata: Dict):
-        """Speichere Hash nach erfolgreichem Indexing"""
-        hash_file = self.cache_dir / f"{jurisdiction.value}_{doc_hash}.json"
-        data = {
-            "hash": doc_hash,
-            "indexed_at": datetime.utcnow().isoformat(),
-            "jurisdiction": jurisdiction.value,
-            "metadata": metadata,
-        }
-        hash_file.write_text(json.dumps(data, indent=2))
+    def mark_as_indexed(self, entries: List[Tuple[str, Jurisdiction]]):
+        """Speichere Hashes nach erfolgreichem Indexing"""
+        self.dedup.mark_many(
+            [dedup_key(doc_hash, jurisdiction) for doc_hash, jurisdiction in entries]
+        )
     
     def classify_relevance(
         self, 
@@ -183,48 +193,72 @@ ANTWORTE NUR:
             # Fallback: Bei LLM-Fehler akzeptieren (Conservative Approach)
             return keyword_score > 0.3, keyword_score
     
-    def chunk_text(self, text: str, chunk_size: int = 1500, overlap: int = 200) -> List[str]:
+    def chunk_text(self, text: str) -> List[str]:
         """
-        Intelligentes Chunking:
-        - Respektiert Satzgrenzen
-        - Overlap für Kontext-Erhalt
-        - Max 1500 Zeichen (optimal für Embeddings)
+        Strukturbewusstes Chunking (siehe ingestion/chunker.py):
+        - Segmentiert nach § / Artikel und Urteilsgliederung (Leitsatz, Tenor, Gründe)
+        - Satzgrenzen mit Abkürzungen (Abs., Nr., Rn., vgl., ...)
+        - Token-Budget statt Zeichenzahl, Overlap in Tokens
         """
-        sentences = text.replace("\n", " ").split(". ")
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for sentence in sentences:
-            sentence_length = len(sentence)
-            
-            if current_length + sentence_length > chunk_size and current_chunk:
-                # Chunk fertig
-                chunk_text = ". ".join(current_chunk) + "."
-                chunks.append(chunk_text)
-                
-                # Overlap: Letzte 2 Sätze behalten
-                current_chunk = current_chunk[-2:] if len(current_chunk) > 2 else current_chunk
-                current_length = sum(len(s) for s in current_chunk)
-            
-            current_chunk.append(sentence)
-            current_length += sentence_length
-        
-        # Letzter Chunk
-        if current_chunk:
-            chunks.append(". ".join(current_chunk) + ".")
-        
+        chunks = self.chunker.chunk(text)
         logger.info(f"📄 Chunking: {len(text)} chars → {len(chunks)} chunks")
         return chunks
     
     async def generate_embedding(self, text: str) -> List[float]:
-        """Generiere Embedding mit Gemini"""
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=text,
-            task_type="retrieval_document",
-        )
-        return result["embedding"]
+        """Generiere Embedding mit dem konfigurierten Backend"""
+        embeddings = await self.generate_embeddings([text])
+        return embeddings[0]
+    
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = 100,
+    ) -> List[List[float]]:
+        """
+        Batch-Embeddings (settings.embedding_backend): ein Request bzw. ein
+        Inferenz-Batch pro batch_size Texte, ausgeführt im Worker-Thread
+        (blockiert den Event Loop nicht).
+        """
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            embeddings.extend(
+                await asyncio.to_thread(self.embedder.embed_batch, batch, "retrieval_document")
+            )
+        return embeddings
+    
+    def build_points(
+        self,
+        document: LegalDocument,
+        doc_hash: str,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        confidence: float,
+    ) -> List[PointStruct]:
+        """
+        Qdrant Points für alle Chunks eines Dokuments erstellen.
+        Kanonischer Payload (rag.schema.document_payload) plus
+        Chunk-/Ingestion-Felder.
+        """
+        indexed_at = datetime.utcnow().isoformat()
+        base = document_payload(document)
+        return [
+            PointStruct(
+                # Qdrant IDs must be UUIDs/ints - deterministic per (document, chunk)
+                id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc_hash}_{i}")),
+                vector=embedding,
+                payload={
+                    **base,
+                    "content": chunk,
+                    "chunk_index": i,
+                    "total_chunks": len(chunks),
+                    "relevance_score": confidence,
+                    "indexed_at": indexed_at,
+                    "document_hash": doc_hash,
+                }
+            )
+            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+        ]
     
     async def process_and_upload(
         self,
@@ -253,13 +287,16 @@ ANTWORTE NUR:
         # Step 1: Dedup Check
         doc_hash = self.compute_document_hash(document.content_original)
         
-        if not force and self.is_duplicate(doc_hash, document.jurisdiction):
+        if not force and await asyncio.to_thread(
+            self.is_duplicate, doc_hash, document.jurisdiction
+        ):
             stats["duplicate"] = True
             stats["reason"] = "Duplicate detected via hash"
             return stats
         
         # Step 2: Relevanz Klassifizierung
-        is_relevant, confidence = self.classify_relevance(
+        is_relevant, confidence = await asyncio.to_thread(
+            self.classify_relevance,
             text=document.content_original,
             jurisdiction=document.jurisdiction,
             title=document.title
@@ -276,51 +313,20 @@ ANTWORTE NUR:
         # Step 3: Chunking
         chunks = self.chunk_text(document.content_original)
         
-        # Step 4 & 5: Embedding + Upload
-        points = []
-        for i, chunk in enumerate(chunks):
-            # Embedding generieren
-            embedding = await self.generate_embedding(chunk)
-            
-            # Qdrant Point erstellen
-            point = PointStruct(
-                id=f"{doc_hash}_{i}",
-                vector=embedding,
-                payload={
-                    "jurisdiction": document.jurisdiction.value,
-                    "sub_jurisdiction": document.sub_jurisdiction,
-                    "title": document.title,
-                    "content": chunk,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "source_url": str(document.source_url),
-                    "publication_date": document.publication_date.isoformat(),
-                    "document_type": document.document_type,
-                    "language": document.language,
-                    "keywords": document.keywords,
-                    "relevance_score": confidence,
-                    "indexed_at": datetime.utcnow().isoformat(),
-                    "document_hash": doc_hash,
-                }
-            )
-            points.append(point)
+        # Step 4: Embeddings (batched)
+        embeddings = await self.generate_embeddings(chunks)
+        
+        # Step 5: Qdrant Points
+        points = self.build_points(document, doc_hash, chunks, embeddings, confidence)
         
         # Batch Upload zu Qdrant
-        self.qdrant.upsert(
-            collection_name=settings.qdrant_collection,
+        await self.qdrant.upsert(
+            collection_name=settings.serving_collection(),
             points=points
         )
         
         # Hash speichern
-        self.mark_as_indexed(
-            doc_hash=doc_hash,
-            jurisdiction=document.jurisdiction,
-            metadata={
-                "title": document.title,
-                "chunks": len(chunks),
-                "confidence": confidence,
-            }
-        )
+        await asyncio.to_thread(self.mark_as_indexed, [(doc_hash, document.jurisdiction)])
         
         stats["processed"] = True
         stats["chunks_uploaded"] = len(chunks)
@@ -331,6 +337,32 @@ ANTWORTE NUR:
         return stats
 
 
+async def process_documents(
+    documents: List[LegalDocument],
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    Process a batch of documents inside ONE event loop with one async client.
+    
+    Used by the Celery tasks: they call asyncio.run(process_documents(...))
+    once per task instead of once per document. Documents flow through the
+    staged IngestionPipeline (dedup → relevance → chunk → embed → upsert).
+    
+    Returns:
+        Aggregated stats (found, processed, duplicates, irrelevant, failed, uploaded_chunks)
+    """
+    from ingestion.pipeline import IngestionPipeline
+    
+    # Fresh client bound to this event loop (asyncio.run creates a new loop)
+    client = create_async_qdrant_client()
+    processor = DocumentProcessor(qdrant_client=client)
+    
+    try:
+        return await IngestionPipeline(processor).run(documents, force=force)
+    finally:
+        await client.close()
+
+
 async def generate_update_summary(new_text: str, old_text: str) -> str:
     """
     BREAKING NEWS Generator:
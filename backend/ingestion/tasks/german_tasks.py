@@ -3,35 +3,19 @@ German Celery Tasks
 Scheduled scraping tasks for German legal sources
 """
 
+import asyncio
 import logging
-from celery import Task
-from qdrant_client import QdrantClient
 
 from ingestion.celery_worker import celery_app
 from ingestion.scrapers.german_admin_scraper import GermanAdminScraper
-from ingestion.processor import DocumentProcessor
+from ingestion.processor import process_documents
 from config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
-class QdrantTask(Task):
-    """Base Task mit Qdrant Connection Pooling"""
-    _qdrant = None
-    
-    @property
-    def qdrant(self):
-        if self._qdrant is None:
-            self._qdrant = QdrantClient(
-                host=settings.qdrant_host,
-                port=settings.qdrant_port
-            )
-        return self._qdrant
-
-
 @celery_app.task(
-    base=QdrantTask,
     bind=True,
     max_retries=3,
     default_retry_delay=300  # 5 Minuten
@@ -61,35 +45,8 @@ def scrape_bmf_tax_circulars(self):
                 "documents_processed": 0
             }
         
-        # Processor für Upload
-        processor = DocumentProcessor(qdrant_client=self.qdrant)
-        
-        stats = {
-            "found": len(documents),
-            "processed": 0,
-            "duplicates": 0,
-            "irrelevant": 0,
-            "uploaded_chunks": 0
-        }
-        
-        # Verarbeite jedes Dokument
-        for doc in documents:
-            try:
-                # Process & Upload (async wrapper)
-                import asyncio
-                result = asyncio.run(processor.process_and_upload(doc))
-                
-                if result["processed"]:
-                    stats["processed"] += 1
-                    stats["uploaded_chunks"] += result["chunks_uploaded"]
-                elif result["duplicate"]:
-                    stats["duplicates"] += 1
-                elif result["irrelevant"]:
-                    stats["irrelevant"] += 1
-                
-            except Exception as e:
-                logger.error(f"Fehler bei Dokument {doc.title[:50]}: {e}")
-                continue
+        # Process & Upload - one event loop + one pooled client for the whole batch
+        stats = asyncio.run(process_documents(documents))
         
         logger.info(f"✅ BMF Scraper abgeschlossen: {stats}")
         return stats
@@ -100,7 +57,6 @@ def scrape_bmf_tax_circulars(self):
 
 
 @celery_app.task(
-    base=QdrantTask,
     bind=True,
     max_retries=2
 )
@@ -115,7 +71,6 @@ def scrape_bgh_cases(self):
 
 
 @celery_app.task(
-    base=QdrantTask,
     bind=True
 )
 def scrape_bfh_tax_rulings(self):
@@ -2,6 +2,8 @@
 DOMULEX Backend - FastAPI Application
 """
 
+import asyncio
+import json
 import time
 import logging
 from contextlib import asynccontextmanager
@@ -9,14 +11,14 @@ from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from qdrant_client import QdrantClient
 import google.generativeai as genai
 
 from models import (
     QueryRequest,
     QueryResponse,
+    VerificationStatus,
     IngestionRequest,
     IngestionResponse,
     Jurisdiction,
@@ -25,13 +27,20 @@ from models import (
     ConflictResponse,
     ConflictAnalysis,
 )
-from rag import RAGEngine
+from rag import RAGEngine, QueryResponseCache
 from rag.personas import get_mediator_prompt
 from ingestion import ScraperFactory
 from config import get_settings
-from services.pdf_parser import PDFParser, ContractAnalysis, ClauseAnalysis, RiskLevel
+from qdrant_pool import init_qdrant_pool, close_qdrant_pool
+from services.pdf_parser import PDFParser, ContractAnalysis, RiskLevel
+from services.clause_analysis import ClauseAnalysisPipeline
+from services.ocr_engine import shutdown_ocr_engine
+from services.parsing_service import shutdown_parsing_service
+from services.document_store import get_document_store
 from logger import setup_logging, RequestLogger
-from auth import initialize_firebase, get_current_user, register_session, FirebaseUser
+from auth import (
+    initialize_firebase, get_current_user, get_optional_user, register_session, FirebaseUser
+)
 
 # Setup logging - MUST BE BEFORE OTHER IMPORTS THAT USE LOGGER
 setup_logging()
@@ -123,54 +132,40 @@ async def lifespan(app: FastAPI):
     # Initialize Firebase Auth (optional)
     initialize_firebase()
     
-    # Try to initialize Qdrant client (optional - for RAG)
-    # Quick initialization - Qdrant will be reconnected lazily if needed
-    try:
-        # Configure Qdrant client - prefer URL if set
-        if settings.qdrant_url:
-            # Full URL provided (Qdrant Cloud / Cloud Run)
-            logger.info(f"Connecting to Qdrant at {settings.qdrant_url}")
-            app.state.qdrant_client = QdrantClient(
-                url=settings.qdrant_url,
-                api_key=settings.qdrant_api_key if settings.qdrant_api_key else None,
-                timeout=5,  # Short timeout for startup
-            )
-        elif settings.qdrant_use_https:
-            # Qdrant Cloud with API Key (legacy)
-            app.state.qdrant_client = QdrantClient(
-                url=f"https://{settings.qdrant_host}",
-                api_key=settings.qdrant_api_key if settings.qdrant_api_key else None,
-                timeout=5,
-            )
-        else:
-            app.state.qdrant_client = QdrantClient(
-                host=settings.qdrant_host,
-                port=settings.qdrant_port,
-                timeout=5,
-            )
-        # Don't test connection at startup - let it fail gracefully later
-        logger.info("✅ Qdrant client configured (connection will be tested on first request)")
-        
+    # Initialize shared async Qdrant client (optional - for RAG)
+    # No connection test at startup - let it fail gracefully later
+    app.state.qdrant_client = await init_qdrant_pool()
+    
+    if app.state.qdrant_client is not None:
         # Initialize RAG engine with Qdrant
         app.state.rag_engine = RAGEngine(
             qdrant_client=app.state.qdrant_client,
             gemini_api_key=settings.gemini_api_key,
-            collection_name=settings.qdrant_collection,
+            collection_name=settings.serving_collection(),
+            vector_size=settings.embedding_dimension,
         )
         logger.info("✅ RAG engine initialized with Qdrant")
-        
-    except Exception as e:
-        logger.warning(f"⚠️ Qdrant configuration failed: {e}")
+    else:
         logger.info("📝 Running in Gemini-only mode (no RAG)")
-        app.state.qdrant_client = None
         # Initialize RAG engine without Qdrant (Gemini-only mode)
         app.state.rag_engine = RAGEngine(
             qdrant_client=None,
             gemini_api_key=settings.gemini_api_key,
-            collection_name=settings.qdrant_collection,
+            collection_name=settings.serving_collection(),
+            vector_size=settings.embedding_dimension,
         )
         logger.info("✅ RAG engine initialized (Gemini-only mode)")
     
+    # Load the reranker model now, not on the first query (fails startup if broken)
+    if app.state.rag_engine.reranker is not None:
+        await asyncio.to_thread(app.state.rag_engine.reranker.load)
+        logger.info(f"✅ Reranker ready: {app.state.rag_engine.reranker.name}")
+    
+    # Answer cache in front of /query (exact + near-duplicate hits)
+    app.state.answer_cache = (
+        QueryResponseCache(app.state.rag_engine) if settings.enable_answer_cache else None
+    )
+    
     logger.info("✅ DOMULEX Backend ready!")
     
     # Initialize document generator
@@ -183,10 +178,17 @@ async def lifespan(app: FastAPI):
         app.state.crm_service = CRMService(gemini_api_key=settings.gemini_api_key)
         logger.info("✅ CRM service initialized")
     
+    # Background flusher for buffered query counts
+    get_quota_counter().start()
+    
     yield
     
     # Shutdown
     logger.info("👋 Shutting down DOMULEX Backend...")
+    await get_quota_counter().stop()
+    await close_qdrant_pool()
+    shutdown_parsing_service()
+    shutdown_ocr_engine()
 
 
 # FastAPI app
@@ -228,6 +230,12 @@ def get_rag_engine() -> RAGEngine:
     return app.state.rag_engine
 
 
+# Dependency to get answer cache (None if disabled)
+def get_answer_cache() -> Optional[QueryResponseCache]:
+    """Dependency injection for the /query answer cache."""
+    return getattr(app.state, "answer_cache", None)
+
+
 # Dependency to get document generator
 def get_doc_generator() -> DocumentGenerator:
     """Dependency injection for document generator."""
@@ -244,8 +252,8 @@ def get_crm_service() -> CRMService:
     return app.state.crm_service
 
 
-# Import user service for query counting
-from services.user_service import get_user_service
+# Buffered quota counter for query counting
+from services.quota import get_quota_counter
 
 async def count_ai_query(user: FirebaseUser = Depends(get_current_user)):
     """
@@ -253,8 +261,7 @@ async def count_ai_query(user: FirebaseUser = Depends(get_current_user)):
     Use this dependency on ALL endpoints that use AI/Gemini.
     """
     if user and hasattr(user, 'uid') and user.uid:
-        user_service = get_user_service()
-        user_service.increment_query_count(user.uid)
+        await get_quota_counter().increment(user.uid)
         logger.debug(f"Counted AI query for user {user.uid}")
     return user
 
@@ -294,7 +301,7 @@ async def health_check_detailed():
     try:
         # Check Qdrant connection
         if app.state.qdrant_client:
-            collections = app.state.qdrant_client.get_collections()
+            collections = await app.state.qdrant_client.get_collections()
             qdrant_status = "ok"
         else:
             qdrant_status = "not configured"
@@ -350,8 +357,9 @@ async def register_user_session(
 @app.post("/upload/document")
 async def upload_document(
     file: UploadFile = File(...),
-    user_id: str = Form(...),
-    session_id: Optional[str] = Form(None)
+    user_id: Optional[str] = Form(None),  # ignored, the owner is the authenticated user
+    session_id: Optional[str] = Form(None),
+    user: Optional[FirebaseUser] = Depends(get_optional_user),
 ):
     """
     Upload and parse documents (PDF, DOCX, TXT, JPG, PNG).
@@ -371,11 +379,13 @@ async def upload_document(
     - Extracted text preview
     - Cloud Storage URL for later use
     - Metadata (page count, word count, etc.)
+    
+    Without a Firebase ID token the upload is parsed and cached, but no owner
+    is registered - its document ID can't be referenced in later queries.
     """
     from models.upload import DocumentUploadResponse, UploadedDocument, UploadedDocumentType
-    from services.document_parser import document_parser
-    import uuid
     
+    user_id = user.uid if user else None
     try:
         logger.info(f"📎 Document upload from user {user_id}: {file.filename}")
         
@@ -384,8 +394,10 @@ async def upload_document(
         # Read file bytes
         file_bytes = await file.read()
         
-        # Parse document
-        parse_result = await document_parser.parse_document(file_bytes, file.filename)
+        # Parse document (or reuse the stored parse of the same file)
+        stored = await get_document_store().get_or_parse(file_bytes, file.filename, user_id)
+        user_id = user_id or "anonymous"
+        parse_result = stored.parse
         
         if parse_result.error:
             logger.error(f"Document parsing failed: {parse_result.error}")
@@ -396,17 +408,18 @@ async def upload_document(
         
         # TODO: Upload to Cloud Storage (implement later)
         # For now, we'll just return the parsed text
-        storage_url = f"temp://documents/{user_id}/{uuid.uuid4()}/{file.filename}"
+        storage_url = f"temp://documents/{user_id}/{stored.document_hash}/{file.filename}"
         
-        # Create document metadata
+        # Create document metadata (content hash = ID for later queries)
         uploaded_doc = UploadedDocument(
-            id=str(uuid.uuid4()),
+            id=stored.document_hash,
             user_id=user_id,
             filename=file.filename,
             doc_type=UploadedDocumentType(parse_result.doc_type.value),
             storage_url=storage_url,
             char_count=parse_result.char_count,
             word_count=parse_result.word_count,
+            page_count=parse_result.page_count,
             ocr_applied=parse_result.ocr_applied,
             session_id=session_id
         )
@@ -631,7 +644,6 @@ async def export_document(request: dict):
         File download (DOCX oder PDF)
     """
     from services.document_export import document_exporter
-    from fastapi.responses import StreamingResponse
     
     try:
         content = request.get("content")
@@ -682,8 +694,9 @@ async def export_document(request: dict):
 # =========================================================================
 
 class DocumentAnalyzeRequest(BaseModel):
-    content: str
+    content: Optional[str] = None  # or documentId of an upload
     fileName: str
+    documentId: Optional[str] = None
 
 class DocumentAnalyzeResponse(BaseModel):
     suggestedClient: Optional[str] = None
@@ -702,9 +715,22 @@ async def analyze_document(request: DocumentAnalyzeRequest, user: dict = Depends
     - Aktenzeichen/Sachverhalt
     - Zusammenfassung
     - Schlüsselwörter
+    
+    Statt `content` kann die `documentId` eines Uploads gesendet werden.
     """
     settings = get_settings()
     
+    content = request.content
+    if content is None and request.documentId:
+        stored = await get_document_store().resolve(request.documentId, getattr(user, "uid", None))
+        if stored is None:
+            raise HTTPException(
+                status_code=404, detail="Dokument nicht gefunden. Bitte erneut hochladen."
+            )
+        content = stored.text
+    if content is None:
+        raise HTTPException(status_code=422, detail="content oder documentId erforderlich")
+    
     try:
         genai.configure(api_key=settings.GEMINI_API_KEY)
         model = genai.GenerativeModel('gemini-1.5-flash')
@@ -712,7 +738,7 @@ async def analyze_document(request: DocumentAnalyzeRequest, user: dict = Depends
         prompt = f"""Analysiere dieses juristische Dokument und extrahiere folgende Informationen:
 
 DOKUMENT (Dateiname: {request.fileName}):
-{request.content[:8000]}
+{content[:8000]}
 
 Antworte NUR mit einem JSON-Objekt in diesem Format:
 {{
@@ -766,10 +792,58 @@ Gib NUR das JSON zurück, keine weiteren Erklärungen."""
         )
 
 
+async def enforce_query_limit(user_id: str):
+    """Raise 429 if the user has exhausted their monthly query quota."""
+    # Check query limit before processing (cached counter, no Firestore read per request)
+    can_query, queries_used, queries_limit = await get_quota_counter().check(user_id)
+    
+    if not can_query:
+        logger.warning(f"User {user_id} exceeded query limit: {queries_used}/{queries_limit}")
+        raise HTTPException(
+            status_code=429,
+            detail=(
+                f"Monatliches Anfrage-Limit erreicht ({queries_used}/{queries_limit}). "
+                "Bitte upgraden Sie Ihren Plan."
+            )
+        )
+    
+    logger.info(f"Query from user {user_id}: {queries_used + 1}/{queries_limit}")
+
+
+async def uploaded_docs_for_engine(
+    request: QueryRequest,
+    user: Optional[FirebaseUser] = None,
+) -> Optional[List[dict]]:
+    """
+    Prepare uploaded documents of a QueryRequest for the RAG engine.
+    References without text are resolved from the document store for the
+    authenticated user (404 if the upload expired, belongs to another user
+    or the request is unauthenticated; request.user_id is not trusted).
+    """
+    if not request.uploaded_documents:
+        return None
+    uploaded_docs = []
+    for doc in request.uploaded_documents:
+        text = doc.text
+        if text is None:
+            stored = await get_document_store().resolve(doc.document_id, getattr(user, "uid", None))
+            if stored is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Dokument {doc.document_id} nicht gefunden. Bitte erneut hochladen.",
+                )
+            text = stored.text
+        uploaded_docs.append({"document_id": doc.document_id, "text": text})
+    logger.info(f"📎 Query includes {len(uploaded_docs)} uploaded documents")
+    return uploaded_docs
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query_legal_documents(
     request: QueryRequest,
     rag_engine: RAGEngine = Depends(get_rag_engine),
+    answer_cache: Optional[QueryResponseCache] = Depends(get_answer_cache),
+    user: Optional[FirebaseUser] = Depends(get_optional_user),
 ):
     """
     Query legal documents with RAG.
@@ -802,29 +876,17 @@ async def query_legal_documents(
     try:
         # Check if user has provided ID for quota tracking
         if request.user_id:
-            from services.user_service import get_user_service
-            user_service = get_user_service()
-            
-            # Check query limit before processing
-            can_query, queries_used, queries_limit = user_service.check_query_limit(request.user_id)
-            
-            if not can_query:
-                logger.warning(f"User {request.user_id} exceeded query limit: {queries_used}/{queries_limit}")
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Monatliches Anfrage-Limit erreicht ({queries_used}/{queries_limit}). Bitte upgraden Sie Ihren Plan."
-                )
-            
-            logger.info(f"Query from user {request.user_id}: {queries_used + 1}/{queries_limit}")
+            await enforce_query_limit(request.user_id)
         
         # Prepare uploaded documents for RAG engine
-        uploaded_docs = None
-        if request.uploaded_documents:
-            uploaded_docs = [
-                {"document_id": doc.document_id, "text": doc.text}
-                for doc in request.uploaded_documents
-            ]
-            logger.info(f"📎 Query includes {len(uploaded_docs)} uploaded documents")
+        uploaded_docs = await uploaded_docs_for_engine(request, user)
+        
+        # Serve identical / near-identical questions from the answer cache
+        response = await answer_cache.get(request) if answer_cache else None
+        if response is not None:
+            if request.user_id:
+                await get_quota_counter().increment(request.user_id)
+            return response
         
         response = await rag_engine.query(
             user_query=request.query,
@@ -838,13 +900,17 @@ async def query_legal_documents(
             uploaded_documents=uploaded_docs,  # 📎 Hochgeladene Dokumente
         )
         
-        # Query count is now handled by count_ai_query dependency
-        # (user_id is passed via request for anonymous queries only)
-        if request.user_id and not hasattr(request, '_counted'):
-            get_user_service().increment_query_count(request.user_id)
+        if answer_cache:
+            await answer_cache.set(request, response)
+        
+        # Count once per answered query (buffered, flushed to Firestore in batches)
+        if request.user_id:
+            await get_quota_counter().increment(request.user_id)
         
         return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -852,6 +918,110 @@ async def query_legal_documents(
         )
 
 
+@app.get("/query/verification/{verification_id}", response_model=VerificationStatus)
+async def get_query_verification(
+    verification_id: str,
+    rag_engine: RAGEngine = Depends(get_rag_engine),
+):
+    """
+    Verdict of an answer verified after the response was sent
+    (VERIFICATION_ASYNC=true - the default -, QueryResponse.verification == "PENDING").
+    
+    `status` is `pending` until the local citation check or the LLM critic
+    has finished; verdicts expire after VERIFICATION_TTL seconds (404).
+    """
+    stored = await rag_engine.verifications.get(verification_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Verification not found or expired")
+    return VerificationStatus(
+        verification_id=verification_id,
+        status=stored["status"],
+        verdict=stored["verdict"],
+        method=stored["method"],
+        hallucination_detected="HALLUCINATION DETECTED" in stored["verdict"].upper(),
+    )
+
+
+def sse_event(event: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_legal_documents_stream(
+    request: QueryRequest,
+    rag_engine: RAGEngine = Depends(get_rag_engine),
+    answer_cache: Optional[QueryResponseCache] = Depends(get_answer_cache),
+    user: Optional[FirebaseUser] = Depends(get_optional_user),
+):
+    """
+    Streaming variant of /query (Server-Sent Events).
+    
+    **Events (in order):**
+    - `sources`: retrieved documents, sent right after the vector search
+    - `token`: answer text deltas as Gemini generates them
+    - `verification`: verdict of the local citation check, or PENDING with a `verification_id`
+      while the LLM critic runs (VERIFICATION_ASYNC, default; only for grounded answers)
+    - `done`: complete QueryResponse (same shape as /query)
+    - `error`: retrieval or generation failed; the stream ends after it
+    
+    Quota is checked before the stream starts and counted once it completes.
+    """
+    if request.user_id:
+        await enforce_query_limit(request.user_id)
+    
+    uploaded_docs = await uploaded_docs_for_engine(request, user)
+    
+    async def event_stream():
+        # Cached answers are replayed as one token
+        cached = await answer_cache.get(request) if answer_cache else None
+        if cached is not None:
+            yield sse_event({
+                "type": "sources",
+                "sources": [doc.model_dump(mode="json") for doc in cached.sources],
+                "jurisdiction_warning": cached.jurisdiction_warning,
+            })
+            yield sse_event({"type": "token", "text": cached.answer})
+            yield sse_event({"type": "done", "response": cached.model_dump(mode="json")})
+            if request.user_id:
+                await get_quota_counter().increment(request.user_id)
+            return
+        
+        try:
+            async for event in rag_engine.query_stream(
+                user_query=request.query,
+                target_jurisdiction=request.target_jurisdiction,
+                user_role=request.user_role,
+                user_language=request.user_language,
+                sub_jurisdiction=request.sub_jurisdiction,
+                source_filter=request.source_filter,
+                gerichtsebene_filter=request.gerichtsebene_filter,
+                use_public_sources=request.use_public_sources,
+                uploaded_documents=uploaded_docs,
+            ):
+                if event["type"] == "done":
+                    response = event["response"]
+                    if answer_cache:
+                        await answer_cache.set(request, response)
+                    if request.user_id:
+                        await get_quota_counter().increment(request.user_id)
+                    event = {"type": "done", "response": response.model_dump(mode="json")}
+                yield sse_event(event)
+        except Exception as e:
+            # Retrieval / prompt preparation failed before the engine's own error event
+            logger.error(f"Streaming query failed: {e}")
+            yield sse_event({"type": "error", "detail": f"Error processing query: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: don't buffer SSE
+        },
+    )
+
+
 # === SUPPORT CHAT ENDPOINT ===
 
 class SupportRequest(BaseModel):
@@ -1036,6 +1206,11 @@ async def run_ingestion(
         # Index into Qdrant
         indexed_count = await rag_engine.index_documents(documents)
         
+        # New documents may change answers - drop cached ones
+        answer_cache = get_answer_cache()
+        if answer_cache and indexed_count:
+            await answer_cache.invalidate()
+        
         duration = time.time() - start_time
         
         return IngestionResponse(
@@ -1093,13 +1268,13 @@ async def list_jurisdictions():
 async def get_statistics():
     """Get system statistics."""
     try:
-        collection_info = app.state.qdrant_client.get_collection(
-            settings.qdrant_collection
+        collection_info = await app.state.qdrant_client.get_collection(
+            settings.serving_collection()
         )
         
         return {
             "total_documents": collection_info.points_count,
-            "collection_name": settings.qdrant_collection,
+            "collection_name": settings.serving_collection(),
             "vector_size": collection_info.config.params.vectors.size,
         }
     
@@ -1149,6 +1324,27 @@ async def extract_text_with_gemini(file_bytes: bytes, filename: str) -> str:
         return ""
 
 
+async def extract_upload_text(
+    file_bytes: bytes,
+    filename: str,
+    min_chars: int = 1,
+    user_id: Optional[str] = None,
+) -> str:
+    """
+    Text of an uploaded file via the document store (parsed off the event
+    loop once per distinct file). Falls back to Gemini Vision for Outlook
+    .msg files and when the parsers extract less than min_chars (e.g.
+    photos Tesseract cannot read).
+    """
+    if not filename.lower().endswith('.msg'):
+        result = (await get_document_store().get_or_parse(file_bytes, filename, user_id)).parse
+        if result.error:
+            logger.warning(f"Parsing {filename} failed, trying Gemini: {result.error}")
+        elif len(result.text.strip()) >= min_chars:
+            return result.text
+    return await extract_text_with_gemini(file_bytes, filename)
+
+
 @app.post("/analyze_contract", response_model=ContractAnalysis)
 async def analyze_contract(
     file: UploadFile = File(..., description="PDF contract file"),
@@ -1232,59 +1428,10 @@ async def analyze_contract(
                 detail=f"Datei zu groß (max. {25 if is_lawyer else 10}MB)"
             )
         
-        # Step A: Extract text based on file type
-        contract_text = ""
-        
-        if file_extension == '.pdf':
-            contract_text = PDFParser.extract_text_from_pdf(file_bytes)
-        elif file_extension in ['.doc', '.docx']:
-            # Word documents
-            try:
-                import docx
-                import io
-                doc_file = docx.Document(io.BytesIO(file_bytes))
-                contract_text = '\n'.join([para.text for para in doc_file.paragraphs])
-            except ImportError:
-                # Fallback: Use Gemini Vision for document
-                contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
-        elif file_extension in ['.xls', '.xlsx']:
-            # Excel files
-            try:
-                import pandas as pd
-                import io
-                df = pd.read_excel(io.BytesIO(file_bytes))
-                contract_text = df.to_string()
-            except ImportError:
-                contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
-        elif file_extension in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff']:
-            # Images - use OCR via Gemini Vision
-            contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
-        elif file_extension in ['.txt', '.csv', '.html', '.htm', '.rtf']:
-            # Text files
-            try:
-                contract_text = file_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                contract_text = file_bytes.decode('latin-1', errors='ignore')
-        elif file_extension in ['.eml', '.msg']:
-            # Email files - extract body
-            try:
-                import email
-                if file_extension == '.eml':
-                    msg = email.message_from_bytes(file_bytes)
-                    if msg.is_multipart():
-                        for part in msg.walk():
-                            if part.get_content_type() == 'text/plain':
-                                contract_text += part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                    else:
-                        contract_text = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
-                else:
-                    # .msg files need extract-msg library
-                    contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
-            except Exception:
-                contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
-        else:
-            # Fallback to Gemini
-            contract_text = await extract_text_with_gemini(file_bytes, filename_lower)
+        # Step A: Extract text (parsing service, Gemini Vision as fallback)
+        contract_text = await extract_upload_text(
+            file_bytes, filename_lower, min_chars=50, user_id=getattr(user, "uid", None)
+        )
         
         if not contract_text or len(contract_text.strip()) < 50:
             raise HTTPException(
@@ -1297,7 +1444,9 @@ async def analyze_contract(
         gemini_model = genai.GenerativeModel('gemini-2.0-flash')
         
         # Step B: Identify key clauses
-        identified_clauses = PDFParser.identify_key_clauses(contract_text, gemini_model)
+        identified_clauses = await asyncio.to_thread(
+            PDFParser.identify_key_clauses, contract_text, gemini_model
+        )
         
         if not identified_clauses:
             raise HTTPException(
@@ -1305,85 +1454,30 @@ async def analyze_contract(
                 detail="Could not identify any key clauses in the contract"
             )
         
-        # Step C & D: Analyze each clause
-        clause_analyses = []
-        red_count = 0
-        yellow_count = 0
-        green_count = 0
+        # 🔑 Quellenfilter basierend auf User-Tier
+        # Basis/Professional: Nur verlässliche Quellen (Gesetze + Höchstgerichte)
+        # Lawyer: Alle Quellen
+        if user_tier.lower() == 'lawyer':
+            source_filter = None  # Alle Quellen
+            gerichtsebene_filter = None
+        else:
+            source_filter = ['GESETZ', 'URTEIL', 'VERWALTUNG']  # Nur Gesetze, Urteile, Verwaltung
+            gerichtsebene_filter = ['EuGH', 'BGH', 'BFH']  # Nur Höchstgerichte - verlässlich
         
-        for clause_data in identified_clauses:
-            clause_type = clause_data.get("type", "Unknown")
-            clause_text = clause_data.get("text", "")
-            
-            # Search Qdrant for relevant law
-            search_query = f"{clause_type} law {jurisdiction_enum.value} real estate lease"
-            
-            # 🔑 Quellenfilter basierend auf User-Tier
-            # Basis/Professional: Nur verlässliche Quellen (Gesetze + Höchstgerichte)
-            # Lawyer: Alle Quellen
-            if user_tier.lower() == 'lawyer':
-                source_filter = None  # Alle Quellen
-                gerichtsebene_filter = None
-            else:
-                source_filter = ['GESETZ', 'URTEIL', 'VERWALTUNG']  # Nur Gesetze, Urteile, Verwaltung
-                gerichtsebene_filter = ['EuGH', 'BGH', 'BFH']  # Nur Höchstgerichte - verlässlich
-            
-            search_results = await rag_engine.query(
-                user_query=search_query,
-                target_jurisdiction=jurisdiction_enum,
-                user_role=user_role_enum,
-                user_language="en",
-                sub_jurisdiction=None,
-                source_filter=source_filter,
-                gerichtsebene_filter=gerichtsebene_filter,
-            )
-            
-            # Extract legal context from search results
-            legal_context = ""
-            source_title = None
-            source_url = None
-            
-            if search_results.sources:
-                top_source = search_results.sources[0]
-                legal_context = top_source.content_original
-                source_title = top_source.title
-                source_url = str(top_source.source_url)
-            else:
-                legal_context = "Keine spezifische Rechtsgrundlage in der Datenbank gefunden. Die Analyse basiert auf allgemeinem deutschem Immobilienrecht."
-            
-            # Compare clause with law
-            comparison_result = PDFParser.compare_clause_with_law(
-                clause_type=clause_type,
-                clause_text=clause_text,
-                legal_context=legal_context,
-                user_role=user_role_enum,
-                jurisdiction=jurisdiction_enum,
-                gemini_model=gemini_model,
-            )
-            
-            # Create clause analysis
-            risk_level = RiskLevel(comparison_result.get("risk_level", "YELLOW"))
-            
-            clause_analysis = ClauseAnalysis(
-                clause_type=clause_type,
-                clause_text=clause_text,
-                risk_level=risk_level,
-                legal_standard=legal_context[:300] + "..." if len(legal_context) > 300 else legal_context,
-                comparison=comparison_result.get("comparison", "No comparison available"),
-                recommendation=comparison_result.get("recommendation"),
-                source_title=source_title,
-                source_url=source_url,
-            )
-            
-            clause_analyses.append(clause_analysis)
-            
-            # Count flags
-            if risk_level == RiskLevel.RED:
-                red_count += 1
-            elif risk_level == RiskLevel.YELLOW:
-                yellow_count += 1
-            else:
-                green_count += 1
+        # Step C & D: Analyze all clauses (batched embeddings, parallel search + comparison)
+        pipeline = ClauseAnalysisPipeline(rag_engine=rag_engine, gemini_model=gemini_model)
+        clause_analyses = await pipeline.analyze(
+            clauses=identified_clauses,
+            jurisdiction=jurisdiction_enum,
+            user_role=user_role_enum,
+            source_filter=source_filter,
+            gerichtsebene_filter=gerichtsebene_filter,
+        )
+        
+        # Count flags
+        red_count = sum(1 for c in clause_analyses if c.risk_level == RiskLevel.RED)
+        yellow_count = sum(1 for c in clause_analyses if c.risk_level == RiskLevel.YELLOW)
+        green_count = len(clause_analyses) - red_count - yellow_count
         
         # Determine overall risk
         if red_count > 0:
@@ -1528,7 +1622,6 @@ class ExportReportRequest(BaseModel):
     client_reference: Optional[str] = None
     user_role: str = "TENANT"
 
-from fastapi.responses import StreamingResponse
 import io
 
 @app.post("/export_contract_report")
@@ -1733,17 +1826,17 @@ async def resolve_conflict(
         """
         
         # Search for relevant legal precedents
-        search_results = await rag_engine.query(
-            user_query=combined_query,
+        # (retrieval only - the mediator prompt generates the answer)
+        search_results = await rag_engine.retrieve(
+            query=combined_query,
             target_jurisdiction=request.jurisdiction,
-            user_role=UserRole.MEDIATOR,
-            user_language=request.user_language,
             sub_jurisdiction=request.sub_jurisdiction,
+            limit=5,
         )
         
         # Prepare legal context from sources
         legal_context = ""
-        all_sources = search_results.sources
+        all_sources = [hit.document for hit in search_results]
         
         if all_sources:
             legal_context = "\n\n---\n\n".join([
@@ -3548,7 +3641,8 @@ async def search_documents(
     """
     Search documents with AI (LAWYER TIER ONLY)
     
-    Uses AI to semantically search through documents and rank by relevance.
+    Ranks the lawyer's documents by embedding similarity (per-lawyer index,
+    updated incrementally); Gemini reranks only the best few hits.
     """
     if user_tier.lower() != 'lawyer':
         raise HTTPException(status_code=403, detail="Dokumentenmanagement ist nur im Lawyer Pro Tarif verfügbar")
@@ -3776,70 +3870,9 @@ async def extract_document_text(
         content = await file.read()
         filename = file.filename.lower() if file.filename else "unknown"
         
-        extracted_text = ""
-        
-        if filename.endswith('.pdf'):
-            # Use existing PDF parser (static method)
-            try:
-                extracted_text = PDFParser.extract_text_from_pdf(content)
-            except Exception as pdf_error:
-                logger.warning(f"PDF parsing failed, trying Gemini: {pdf_error}")
-                # Fallback to Gemini for PDF processing
-                genai.configure(api_key=settings.gemini_api_key)
-                model = genai.GenerativeModel('gemini-2.0-flash')
-                
-                import base64
-                b64_content = base64.b64encode(content).decode('utf-8')
-                
-                response = model.generate_content([
-                    "Extrahiere den vollständigen Text aus diesem PDF-Dokument. Gib nur den extrahierten Text zurück, keine Erklärungen:",
-                    {"mime_type": "application/pdf", "data": b64_content}
-                ])
-                extracted_text = response.text.strip()
-                
-        elif filename.endswith('.docx'):
-            # Extract text from Word document
-            try:
-                import io
-                from docx import Document as DocxDocument
-                doc = DocxDocument(io.BytesIO(content))
-                extracted_text = "\n".join([para.text for para in doc.paragraphs])
-            except ImportError:
-                raise HTTPException(status_code=500, detail="python-docx nicht installiert")
-                
-        elif filename.endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-            # Use Gemini Vision for OCR
-            genai.configure(api_key=settings.gemini_api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            import base64
-            b64_content = base64.b64encode(content).decode('utf-8')
-            
-            # Determine mime type
-            mime_type = "image/png"
-            if filename.endswith('.jpg') or filename.endswith('.jpeg'):
-                mime_type = "image/jpeg"
-            elif filename.endswith('.gif'):
-                mime_type = "image/gif"
-            elif filename.endswith('.webp'):
-                mime_type = "image/webp"
-            
-            response = model.generate_content([
-                "Extrahiere den vollständigen Text aus diesem Bild. Gib nur den extrahierten Text zurück, keine Erklärungen:",
-                {"mime_type": mime_type, "data": b64_content}
-            ])
-            extracted_text = response.text.strip()
-            
-        elif filename.endswith('.txt'):
-            # Plain text file
-            extracted_text = content.decode('utf-8', errors='ignore')
-            
-        else:
-            # Try to decode as text
-            try:
-                extracted_text = content.decode('utf-8', errors='ignore')
-            except:
-                raise HTTPException(status_code=400, detail="Dateiformat nicht unterstützt")
+        extracted_text = await extract_upload_text(
+            content, filename, user_id=getattr(user, "uid", None)
+        )
         
         if not extracted_text:
             raise HTTPException(status_code=400, detail="Kein Text konnte extrahiert werden")
@@ -3895,15 +3928,20 @@ async def search_generated_documents(request: GeneratedDocumentSearchRequest):
 @app.post("/documents/search/rank")
 async def rank_documents_by_relevance(
     query: str = Form(...),
-    documents: str = Form(...)  # JSON string of documents
+    documents: str = Form(...),  # JSON string of documents
+    user: Optional[FirebaseUser] = Depends(get_optional_user),
 ):
     """
-    Rank documents by relevance to search query using AI.
+    Rank documents by relevance to search query.
+    
+    This endpoint receives a list of documents, ranks them by embedding
+    similarity to the search query (services/document_index.py) and lets
+    Gemini rerank only the best few in one call.
     
-    This endpoint receives a list of documents and uses Gemini AI
-    to rank them by semantic relevance to the search query.
+    Signed-in users keep their document vectors between searches (index
+    namespace = Firebase uid); anonymous requests use a throwaway index.
     
-    Returns ranked results with AI-generated summaries.
+    Returns ranked results with summaries.
     """
     try:
         import json
@@ -3918,7 +3956,8 @@ async def rank_documents_by_relevance(
         results = await search_service.search_documents(
             documents=docs_list,
             query=query,
-            max_results=20
+            max_results=20,
+            user_id=getattr(user, "uid", None)
         )
         
         logger.info(f"Ranked {len(results)} documents for query: '{query}'")
@@ -4,9 +4,12 @@ from .legal import (
     Jurisdiction,
     UserRole,
     LegalDocument,
+    RetrievalQuery,
+    ScoredDocument,
     UploadedDocumentRef,
     QueryRequest,
     QueryResponse,
+    VerificationStatus,
     IngestionRequest,
     IngestionResponse,
     ConflictRequest,
@@ -18,9 +21,12 @@ __all__ = [
     "Jurisdiction",
     "UserRole",
     "LegalDocument",
+    "RetrievalQuery",
+    "ScoredDocument",
     "UploadedDocumentRef",
     "QueryRequest",
     "QueryResponse",
+    "VerificationStatus",
     "IngestionRequest",
     "IngestionResponse",
     "ConflictRequest",
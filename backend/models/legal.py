@@ -66,6 +66,14 @@ class LegalDocument(BaseModel):
     keywords: list[str] = Field(default_factory=list)
     embedding_vector: Optional[list[float]] = Field(None, description="Qdrant vector")
     
+    # Chunk metadata of ingested points (None for unchunked documents)
+    document_hash: Optional[str] = Field(
+        None, description="Hash of the source document all its chunks share"
+    )
+    chunk_index: Optional[int] = Field(
+        None, description="Position of the chunk within the source document"
+    )
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -86,10 +94,34 @@ class LegalDocument(BaseModel):
         }
 
 
+class RetrievalQuery(BaseModel):
+    """One retrieval request for RAGEngine.retrieve_many (no answer generation)."""
+    query: str = Field(..., description="Search text")
+    target_jurisdiction: Jurisdiction = Field(
+        ..., description="MUST match - no cross-contamination"
+    )
+    sub_jurisdiction: Optional[str] = Field(None, description="Optional state/region filter")
+    limit: int = Field(default=5, ge=1, le=100)
+    source_filter: Optional[list[str]] = Field(None, description="Filter by doc_type")
+    gerichtsebene_filter: Optional[list[str]] = Field(None, description="Filter by gerichtsebene")
+
+
+class ScoredDocument(BaseModel):
+    """Retrieved document chunk with its similarity score."""
+    document: LegalDocument
+    score: float = Field(
+        ...,
+        description=(
+            "Vector similarity (cosine), RRF score for hybrid results, 1.0 for exact citation "
+            "matches, blended rerank score after reranking"
+        ),
+    )
+
+
 class UploadedDocumentRef(BaseModel):
     """Reference to an uploaded document for query context."""
-    document_id: str = Field(..., description="Document ID from upload")
-    text: str = Field(..., description="Extracted text from document")
+    document_id: str = Field(..., description="Document ID from upload (SHA-256 of the file)")
+    text: Optional[str] = Field(None, description="Extracted text; omit to use the stored upload")
 
 
 class QueryRequest(BaseModel):
@@ -115,9 +147,30 @@ class QueryResponse(BaseModel):
         None, 
         description="Warning if query spans multiple jurisdictions"
     )
+    verification: Optional[str] = Field(
+        None,
+        description=(
+            "VERIFIED, HALLUCINATION DETECTED: ..., UNVERIFIED, or PENDING "
+            "(verdict follows via verification_id)"
+        )
+    )
+    verification_id: Optional[str] = Field(
+        None, description="Poll GET /query/verification/{id} for the verdict"
+    )
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class VerificationStatus(BaseModel):
+    """Verdict of an asynchronously verified answer."""
+    verification_id: str
+    status: str = Field(..., description="pending or done")
+    verdict: str = Field(
+        ..., description="VERIFIED, HALLUCINATION DETECTED: ..., UNVERIFIED or PENDING"
+    )
+    method: str = Field(..., description="local (citation check), llm (critic) or none")
+    hallucination_detected: bool = False
+
+
 class IngestionRequest(BaseModel):
     """Request to trigger data ingestion."""
     jurisdiction: Jurisdiction
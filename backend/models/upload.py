@@ -19,13 +19,16 @@ class UploadedDocumentType(str, Enum):
 
 class UploadedDocument(BaseModel):
     """Metadata for an uploaded user document"""
-    id: str = Field(..., description="Unique document ID")
+    id: str = Field(
+        ..., description="Document ID (SHA-256 of the file, usable instead of the text)"
+    )
     user_id: str = Field(..., description="Firebase UID of uploader")
     filename: str = Field(..., description="Original filename")
     doc_type: UploadedDocumentType
     storage_url: str = Field(..., description="Cloud Storage URL")
     char_count: int
     word_count: int
+    page_count: Optional[int] = None
     ocr_applied: bool = False
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
     session_id: Optional[str] = Field(None, description="Chat session ID")
@@ -0,0 +1,103 @@
+"""
+Shared Async Qdrant Client for DOMULEX
+One pooled AsyncQdrantClient per process, managed by the FastAPI lifespan.
+Vector searches never block the event loop. gRPC is used for plain
+host:port deployments (docker-compose exposes 6334); URL and https endpoints
+(Qdrant Cloud, Cloud Run) use REST unless QDRANT_PREFER_GRPC=true, since
+they usually serve only the REST port.
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Process-wide client (initialized in lifespan or lazily)
+_async_client: Optional[AsyncQdrantClient] = None
+
+
+def prefer_grpc() -> bool:
+    """
+    Transport of the shared client: explicit setting, else gRPC only without
+    qdrant_url / https.
+    """
+    if settings.qdrant_prefer_grpc is not None:
+        return settings.qdrant_prefer_grpc
+    return not (settings.qdrant_url or settings.qdrant_use_https)
+
+
+def create_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    Create a new AsyncQdrantClient from settings.
+
+    Connection precedence matches the previous sync setup:
+    qdrant_url → https://qdrant_host (qdrant_use_https) → host:port.
+    """
+    connection = dict(
+        api_key=settings.qdrant_api_key or None,
+        timeout=settings.qdrant_timeout,
+        prefer_grpc=prefer_grpc(),
+        grpc_port=settings.qdrant_grpc_port,
+        # REST transport pool (used when gRPC is off or unsupported)
+        limits=httpx.Limits(
+            max_connections=settings.qdrant_pool_size,
+            max_keepalive_connections=settings.qdrant_pool_size,
+        ),
+        # gRPC channel keepalive so idle Cloud Run instances don't reconnect per request
+        grpc_options={
+            "grpc.keepalive_time_ms": 30000,
+            "grpc.keepalive_permit_without_calls": 1,
+        },
+    )
+
+    if settings.qdrant_url:
+        # Full URL provided (Qdrant Cloud / Cloud Run)
+        return AsyncQdrantClient(url=settings.qdrant_url, **connection)
+    if settings.qdrant_use_https:
+        # Qdrant Cloud with API Key (legacy)
+        return AsyncQdrantClient(url=f"https://{settings.qdrant_host}", **connection)
+    return AsyncQdrantClient(host=settings.qdrant_host, port=settings.qdrant_port, **connection)
+
+
+def get_async_qdrant_client() -> Optional[AsyncQdrantClient]:
+    """Get the shared client, creating it on first use. None if not configurable."""
+    global _async_client
+
+    if _async_client is None:
+        try:
+            _async_client = create_async_qdrant_client()
+        except Exception as e:
+            logger.warning(f"⚠️ Qdrant client configuration failed: {e}")
+            _async_client = None
+
+    return _async_client
+
+
+async def init_qdrant_pool() -> Optional[AsyncQdrantClient]:
+    """Initialize the shared client (called from lifespan startup)."""
+    client = get_async_qdrant_client()
+    if client is not None:
+        transport = "gRPC" if prefer_grpc() else "REST"
+        logger.info(
+            f"✅ Qdrant async client configured ({transport}, pool={settings.qdrant_pool_size}, "
+            f"timeout={settings.qdrant_timeout}s)"
+        )
+    return client
+
+
+async def close_qdrant_pool():
+    """Close the shared client (called from lifespan shutdown)."""
+    global _async_client
+
+    if _async_client is not None:
+        try:
+            await _async_client.close()
+        except Exception as e:
+            logger.warning(f"Error closing Qdrant client: {e}")
+        _async_client = None
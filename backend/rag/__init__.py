@@ -1,6 +1,7 @@
 """RAG package initialization."""
 
 from .engine import RAGEngine
+from .response_cache import QueryResponseCache
 from .prompts import (
     get_system_instruction,
     get_jurisdiction_warning,
@@ -10,6 +11,7 @@ from .prompts import (
 
 __all__ = [
     "RAGEngine",
+    "QueryResponseCache",
     "get_system_instruction",
     "get_jurisdiction_warning",
     "detect_jurisdiction_from_query",
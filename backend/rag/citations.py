@@ -0,0 +1,385 @@
+"""
+Citation Resolver for DOMULEX
+Direct lookup of norms (§ 573c BGB) and decisions (BGH VIII ZR 242/13)
+without embeddings or ANN search.
+
+Keys are normalized like the lexical tokens (rag/lexical.py):
+- '§573c:bgb' from law_abbr/law + paragraph, section or the title prefix
+- 'az:viii zr 242/13' from aktenzeichen/case_number (court kept per point)
+
+The index is two parallel sorted arrays (key -> point slot) searched with
+bisect, persisted as one JSON file and rebuilt from the collection
+periodically (scroll with a payload selector, no vectors). Only points with
+a citation key are held - about 350 bytes each in every API worker process
+(well under 100 MB per worker for a million cited points).
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from rag.lexical import STOPWORDS, find_citations, matches_filter, payload_meta, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Payload fields needed to derive keys and apply filters
+PAYLOAD_FIELDS = [
+    "law_abbr", "paragraph", "law", "section", "title", "aktenzeichen", "case_number",
+    "gericht", "court", "gerichtsebene", "jurisdiction", "sub_jurisdiction", "doc_type",
+]
+
+COURT_LEVELS = (
+    "BVerfG", "BGH", "BFH", "BAG", "BSG", "BVerwG", "EuGH", "OLG", "KG", "LG", "AG", "VG", "FG",
+)
+_COURT_RE = re.compile(r"\b(" + "|".join(COURT_LEVELS) + r")\b")
+
+# Words that do not turn a citation lookup into a topical question
+_FILLER = frozenset({
+    "regelt", "sagt", "besagt", "steht", "bedeutet", "inhalt", "wortlaut", "text", "norm",
+    "paragraph", "urteil", "beschluss", "entscheidung", "aktenzeichen", "gericht", "vom",
+    "bgb", "bgh", "olg", "lg", "ag", "bfh", "eugh", "bverfg", "abs", "satz", "nr", "ff",
+})
+
+FORMAT_VERSION = 1
+
+
+def _court_level(value: Optional[str]) -> Optional[str]:
+    match = _COURT_RE.search(value or "")
+    return match.group(1) if match else None
+
+
+def payload_keys(payload: Dict) -> List[str]:
+    """Normalized citation keys of one point."""
+    keys: List[str] = []
+
+    paragraph = str(payload.get("paragraph") or "").strip()
+    law = payload.get("law_abbr") or payload.get("law")
+    if paragraph and law:
+        if not paragraph.startswith(("§", "Art")):
+            paragraph = f"§ {paragraph}"
+        keys.extend(token for _, _, token in find_citations(f"{paragraph} {law}") if ":" in token)
+
+    for field in ("aktenzeichen", "case_number", "section"):
+        if payload.get(field):
+            citations = find_citations(str(payload[field]))
+            keys.extend(token for _, _, token in citations if ":" in token)
+
+    # Titles cite the document itself before the separator ("BGB § 535 - Inhalt ...")
+    title = str(payload.get("title") or "").split(" - ")[0]
+    keys.extend(token for _, _, token in find_citations(title) if ":" in token)
+
+    return list(dict.fromkeys(keys))
+
+
+class CitationIndex:
+    """Sorted key -> point arrays with per-point filter metadata."""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.slots: List[int] = []
+        self.point_ids: List[str] = []
+        self.meta: List[Tuple] = []
+        self.courts: List[Optional[str]] = []
+        self._by_point: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.point_ids)
+
+    def _register(self, point_id: str, payload: Dict) -> Tuple[int, List[str]]:
+        """
+        Store a point's metadata in its slot (appended for new points);
+        returns (slot, keys) - no keys if the point has none.
+        """
+        keys = payload_keys(payload)
+        slot = self._by_point.get(point_id, -1)
+        if not keys and slot < 0:
+            return -1, []
+        meta = payload_meta(payload)
+        court = (
+            payload.get("gerichtsebene")
+            or _court_level(payload.get("gericht") or payload.get("court") or payload.get("title"))
+        )
+        if slot < 0:
+            slot = len(self.point_ids)
+            self._by_point[point_id] = slot
+            self.point_ids.append(point_id)
+            self.meta.append(meta)
+            self.courts.append(court)
+        else:
+            self.meta[slot] = meta
+            self.courts[slot] = court
+        return slot, keys
+
+    def _unlink(self, slot: int):
+        """Remove every key of a slot (linear scan - only on re-upserts)."""
+        positions = [i for i, other in enumerate(self.slots) if other == slot]
+        for position in reversed(positions):
+            del self.keys[position]
+            del self.slots[position]
+
+    def add(self, point_id: str, payload: Dict):
+        """Add a point; a re-upserted point replaces its keys and metadata."""
+        if point_id in self._by_point:
+            self._unlink(self._by_point[point_id])
+        slot, keys = self._register(point_id, payload)
+        for key in keys:
+            position = bisect.bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.slots.insert(position, slot)
+
+    @classmethod
+    def from_entries(cls, entries: List[Tuple[str, Dict]]) -> "CitationIndex":
+        """Bulk build: one sort instead of repeated inserts."""
+        index = cls()
+        pairs = []
+        for point_id, payload in entries:
+            slot, keys = index._register(point_id, payload)
+            pairs.extend((key, slot) for key in keys)
+        pairs.sort()
+        index.keys = [key for key, _ in pairs]
+        index.slots = [slot for _, slot in pairs]
+        return index
+
+    def lookup(
+        self,
+        key: str,
+        jurisdiction: str,
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        court: Optional[str] = None,
+    ) -> List[str]:
+        """Point IDs stored under key that pass the filters (index order)."""
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_right(self.keys, key, lo=start)
+        point_ids = []
+        for slot in self.slots[start:end]:
+            if court and self.courts[slot] and self.courts[slot] != court:
+                continue
+            if matches_filter(
+                self.meta[slot], jurisdiction, sub_jurisdiction, source_filter, gerichtsebene_filter
+            ):
+                point_ids.append(self.point_ids[slot])
+        return point_ids
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": FORMAT_VERSION,
+            "points": [
+                [point_id, *meta, court]
+                for point_id, meta, court in zip(self.point_ids, self.meta, self.courts)
+            ],
+            "keys": self.keys,
+            "slots": self.slots,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CitationIndex":
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported citation index version: {data.get('version')}")
+        index = cls()
+        for row in data["points"]:
+            index._by_point[row[0]] = len(index.point_ids)
+            index.point_ids.append(row[0])
+            index.meta.append(tuple(row[1:5]))
+            index.courts.append(row[5])
+        index.keys = data["keys"]
+        index.slots = data["slots"]
+        return index
+
+
+def query_citations(query: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Resolvable citations of a query: (key, court level) for every
+    law-qualified norm and every Aktenzeichen ('BGH VIII ZR 242/13' -> court 'BGH').
+    """
+    citations = []
+    for start, _, token in find_citations(query):
+        if ":" not in token:
+            continue
+        court = _court_level(query[max(0, start - 24):start]) if token.startswith("az:") else None
+        citations.append((token, court))
+    return list(dict.fromkeys(citations))
+
+
+def is_citation_only(query: str) -> bool:
+    """True if the query asks for the cited norm/decision itself ("Was regelt § 573c BGB?")."""
+    spans = find_citations(query)
+    if not spans:
+        return False
+    rest, last = [], 0
+    for start, end, _ in spans:
+        if start >= last:
+            rest.append(query[last:start])
+            last = end
+        else:
+            last = max(last, end)
+    rest.append(query[last:])
+    words = [
+        word for word in tokenize(" ".join(rest))
+        if word not in _FILLER and word not in STOPWORDS and not word.isdigit()
+    ]
+    return not words
+
+
+class CitationResolver:
+    """
+    Citation index of one collection, persisted to `path`.
+
+    Loaded from disk when the file is younger than `refresh_seconds`,
+    otherwise rebuilt in the background (queries skip the resolver until
+    the index is available). Points this process upserts during a build are
+    merged into the new index before it is swapped in; the rebuilt arrays
+    hold every point exactly once.
+    """
+
+    SCROLL_PAGE = 2000
+
+    def __init__(self, qdrant, collection_name: str, path: str, refresh_seconds: int = 3600):
+        self.qdrant = qdrant
+        self.collection_name = collection_name
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.index: Optional[CitationIndex] = None
+        self._built_at = 0.0
+        self._build_task: Optional[asyncio.Task] = None
+        self._written: Optional[Dict[str, Dict]] = None  # points upserted during a build
+
+    def _load(self) -> bool:
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+            if age > self.refresh_seconds:
+                return False
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("collection") != self.collection_name:
+                return False
+            self.index = CitationIndex.from_dict(data)
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"Citation index not loaded from {self.path}: {e}")
+            return False
+        self._built_at = time.monotonic() - age
+        logger.info(f"✅ Citation index loaded: {len(self.index)} points")
+        return True
+
+    def _save(self, index: CitationIndex):
+        """Write atomically; every worker process writes its own temp file, the last rename wins."""
+        data = index.to_dict()
+        data["collection"] = self.collection_name
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=path.parent,
+            prefix=f"{path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            tmp_path = f.name
+            try:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            except Exception:
+                f.close()
+                os.unlink(tmp_path)
+                raise
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def ensure_fresh(self):
+        """Load from disk or start a background rebuild when missing/stale."""
+        if self._build_task is not None and not self._build_task.done():
+            return
+        if self.index is not None and time.monotonic() - self._built_at <= self.refresh_seconds:
+            return
+        if self.index is None and self._load():
+            return
+        self._build_task = asyncio.create_task(self.build())
+
+    async def build(self):
+        """Scroll the collection (key fields only) into a new index, swap it in and persist it."""
+        started = time.monotonic()
+        entries: Dict[str, Dict] = {}
+        self._written = {}
+        try:
+            offset = None
+            while True:
+                records, offset = await self.qdrant.scroll(
+                    collection_name=self.collection_name,
+                    limit=self.SCROLL_PAGE,
+                    offset=offset,
+                    with_payload=PAYLOAD_FIELDS,
+                    with_vectors=False,
+                )
+                entries.update((str(record.id), record.payload or {}) for record in records)
+                if offset is None:
+                    break
+            # Pages scrolled before an upsert miss it or hold the old version
+            written, self._written = self._written, {}
+            entries.update(written)
+            index = await asyncio.to_thread(CitationIndex.from_entries, list(entries.items()))
+        except Exception as e:
+            logger.warning(f"Citation index build failed: {e}")
+            self._built_at = time.monotonic()  # retry after refresh_seconds
+            return
+        finally:
+            late, self._written = self._written or {}, None
+        for point_id, payload in late.items():
+            index.add(point_id, payload)
+        self.index = index
+        self._built_at = time.monotonic()
+        logger.info(
+            f"✅ Citation index: {len(index)} points, {len(index.keys)} keys "
+            f"in {self._built_at - started:.1f}s"
+        )
+        try:
+            await asyncio.to_thread(self._save, index)
+        except OSError as e:
+            logger.warning(f"Citation index not persisted to {self.path}: {e}")
+
+    def add_points(self, points):
+        """Register freshly upserted PointStructs (in the current index and a running build)."""
+        if self._written is not None:
+            self._written.update((str(point.id), point.payload or {}) for point in points)
+        if self.index is not None:
+            for point in points:
+                self.index.add(str(point.id), point.payload or {})
+
+    def resolve(
+        self,
+        query: str,
+        jurisdiction: str,
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+    ) -> Optional[List[str]]:
+        """
+        Point IDs of the documents cited by the query, in citation order.
+
+        Returns None if the query cites nothing resolvable or the index is
+        not available yet.
+        """
+        citations = query_citations(query)
+        if not citations:
+            return None
+        self.ensure_fresh()
+        if self.index is None:
+            return None
+        point_ids: List[str] = []
+        for key, court in citations:
+            for point_id in self.index.lookup(
+                key, jurisdiction, sub_jurisdiction, source_filter, gerichtsebene_filter, court
+            ):
+                if point_id not in point_ids:
+                    point_ids.append(point_id)
+        return point_ids
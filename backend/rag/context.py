@@ -0,0 +1,225 @@
+"""
+Context Assembly for DOMULEX
+Builds the prompt context from uploaded and retrieved documents within a
+token budget.
+
+1. Uploaded documents first (up to upload_share of the budget)
+2. Retrieved chunks grouped by source (document_hash, else title + URL);
+   adjacent chunks are merged and the chunker overlap is cut out
+3. Near-duplicate passages (MinHash over word shingles) are dropped
+4. Sources are packed in rank order, each capped at source_max_tokens
+
+Tokens are estimated as ~4 characters per token (German legal text with
+Gemini tokenization averages slightly above that).
+"""
+
+import math
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.legal import LegalDocument
+
+CHARS_PER_TOKEN = 4
+SEPARATOR = "\n\n---\n\n"
+
+# Overlap search window between consecutive chunks (chunker overlap is ~64 tokens)
+_MAX_OVERLAP_CHARS = 1200
+_MIN_OVERLAP_CHARS = 20
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to ~max_tokens at a sentence or word boundary, marked with '...'."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < max_chars // 2:
+        boundary = cut.rfind(" ")
+    return cut[:boundary if boundary > 0 else max_chars].rstrip() + " ..."
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """Join consecutive chunks, dropping the text `second` repeats from the end of `first`."""
+    tail = first[-_MAX_OVERLAP_CHARS:]
+    probe = second[:_MIN_OVERLAP_CHARS]
+    start = tail.find(probe)
+    while start != -1:
+        # Earliest match = longest overlap
+        if second.startswith(tail[start:]):
+            return first + second[len(tail) - start:]
+        start = tail.find(probe, start + 1)
+    return f"{first}\n{second}"
+
+
+class MinHasher:
+    """MinHash signatures of word shingles for near-duplicate detection."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (a * x + b) mod p for all permutations at once; a, x < 2^32 so no overflow
+        return ((np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME).min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets."""
+        return float(np.mean(first == second))
+
+
+@dataclass
+class AssembledContext:
+    """Prompt context plus the documents it was built from."""
+
+    text: str = ""
+    uploads: str = ""  # upload block alone (prompts without retrieved documents)
+    sources: List[LegalDocument] = field(default_factory=list)
+    tokens: int = 0
+    dropped_duplicates: int = 0
+    dropped_sources: int = 0
+
+
+@dataclass
+class _Source:
+    key: str
+    document: LegalDocument  # best-ranked chunk (listed as source)
+    chunks: Dict[int, str] = field(default_factory=dict)
+
+
+class ContextAssembler:
+    """
+    Packs uploaded and retrieved documents into a token budget.
+
+    Args:
+        token_budget: Total context tokens (uploads + retrieved documents)
+        source_max_tokens: Cap per retrieved source
+        upload_share: Budget share reserved for uploads; unused upload
+            budget goes to retrieved documents
+        dedup_threshold: Estimated Jaccard similarity above which a
+            passage counts as duplicate of an earlier one
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        source_max_tokens: int = 800,
+        upload_share: float = 0.6,
+        dedup_threshold: float = 0.8,
+        hasher: Optional[MinHasher] = None,
+    ):
+        self.token_budget = token_budget
+        self.source_max_tokens = source_max_tokens
+        self.upload_share = upload_share
+        self.dedup_threshold = dedup_threshold
+        self.hasher = hasher or MinHasher()
+
+    @staticmethod
+    def source_key(doc: LegalDocument) -> str:
+        return doc.document_hash or f"{doc.title}|{doc.source_url or ''}"
+
+    def _group(self, docs: List[LegalDocument]) -> List[_Source]:
+        """Chunks per source in rank order of each source's best chunk."""
+        sources: Dict[str, _Source] = {}
+        for rank, doc in enumerate(docs):
+            key = self.source_key(doc)
+            source = sources.setdefault(key, _Source(key=key, document=doc))
+            chunk_index = doc.chunk_index if doc.chunk_index is not None else -1 - rank
+            source.chunks.setdefault(chunk_index, doc.content_original)
+        return list(sources.values())
+
+    @staticmethod
+    def _passages(source: _Source) -> List[str]:
+        """Runs of adjacent chunks merged into one passage each, in document order."""
+        passages: List[str] = []
+        previous = None
+        for index in sorted(source.chunks):
+            text = source.chunks[index]
+            if previous is not None and index == previous + 1 and index >= 0:
+                passages[-1] = merge_overlapping(passages[-1], text)
+            else:
+                passages.append(text)
+            previous = index
+        return passages
+
+    def upload_budget(self, uploads: int) -> int:
+        """Tokens available to each of `uploads` uploaded documents."""
+        return max(int(self.token_budget * self.upload_share) // max(uploads, 1), 1)
+
+    def _pack_uploads(self, uploaded_documents: Optional[List[dict]]) -> Tuple[List[str], int]:
+        texts = [doc.get("text", "") for doc in uploaded_documents or [] if doc.get("text")]
+        if not texts:
+            return [], 0
+        per_upload = self.upload_budget(len(texts))
+        blocks = [
+            f"📎 HOCHGELADENES DOKUMENT:\n{truncate_to_tokens(text, per_upload)}" for text in texts
+        ]
+        return blocks, sum(estimate_tokens(block) for block in blocks)
+
+    def assemble(
+        self,
+        docs: List[LegalDocument],
+        uploaded_documents: Optional[List[dict]] = None,
+    ) -> AssembledContext:
+        """Context text for the prompt; `docs` in rank order (best first)."""
+        result = AssembledContext()
+        upload_blocks, used = self._pack_uploads(uploaded_documents)
+        if upload_blocks:
+            result.uploads = SEPARATOR.join(upload_blocks) + SEPARATOR
+
+        signatures: List[np.ndarray] = []
+        blocks = list(upload_blocks)
+        for source in self._group(docs):
+            kept = []
+            for passage in self._passages(source):
+                signature = self.hasher.signature(passage)
+                similarities = (self.hasher.similarity(signature, seen) for seen in signatures)
+                if any(similarity >= self.dedup_threshold for similarity in similarities):
+                    result.dropped_duplicates += 1
+                    continue
+                signatures.append(signature)
+                kept.append(passage)
+            if not kept:
+                continue
+
+            doc = source.document
+            header = (
+                f"**Source:** {doc.title}\n**Date:** {doc.publication_date}\n"
+                f"**URL:** {doc.source_url}\n\n"
+            )
+            available = (
+                min(self.source_max_tokens, self.token_budget - used) - estimate_tokens(header)
+            )
+            if available < 50:
+                result.dropped_sources += 1
+                continue
+            block = header + truncate_to_tokens("\n[...]\n".join(kept), available)
+            blocks.append(block)
+            result.sources.append(doc)
+            used += estimate_tokens(block)
+
+        result.text = SEPARATOR.join(blocks)
+        result.tokens = used
+        return result
@@ -0,0 +1,206 @@
+"""
+Embedding Backends for DOMULEX
+Pluggable Embedder interface used by the RAG engine and the ingestion pipeline.
+
+- GeminiEmbedder: Gemini embedding API (default, production collection)
+- LocalEmbedder: sentence-transformers model on CPU/GPU, batch inference,
+  no network or quota needed (bulk re-embedding, offline runs)
+- HashingEmbedder: deterministic feature hashing, no model download
+  (tests and benchmarks)
+
+All backends return vectors of `dimension` (768 for the existing collection).
+Backends are selected with settings.embedding_backend.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import google.generativeai as genai
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def fit_dimension(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Bring vectors to the collection dimension.
+
+    Larger vectors are truncated and re-normalized (Matryoshka-style models
+    keep most of their quality), smaller ones are zero-padded (cosine
+    similarity is unchanged by padding).
+    """
+    current = vectors.shape[1]
+    if current > dimension:
+        vectors = vectors[:, :dimension]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+    elif current < dimension:
+        vectors = np.pad(vectors, ((0, 0), (0, dimension - current)))
+    return vectors
+
+
+class Embedder:
+    """
+    Interface of an embedding backend.
+
+    embed_batch is blocking - callers run it in a worker thread.
+    `name` identifies model and output space and is part of cache keys, so
+    vectors of different backends never mix.
+    """
+
+    name: str = ""
+    dimension: int = 768
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Embed texts. task_type: 'retrieval_query' or 'retrieval_document'."""
+        raise NotImplementedError
+
+
+class GeminiEmbedder(Embedder):
+    """Gemini embedding API (batchEmbedContents for lists)."""
+
+    NATIVE_DIMENSION = 768
+
+    def __init__(self, model: str = "models/text-embedding-004", dimension: int = 768):
+        self.model = model
+        self.dimension = dimension
+        self.name = model if dimension == self.NATIVE_DIMENSION else f"{model}@{dimension}"
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        kwargs = {}
+        if self.dimension != self.NATIVE_DIMENSION:
+            kwargs["output_dimensionality"] = self.dimension
+        result = genai.embed_content(
+            model=self.model,
+            content=texts,
+            task_type=task_type,
+            **kwargs,
+        )
+        return result["embedding"]
+
+
+class LocalEmbedder(Embedder):
+    """
+    sentence-transformers model running in-process.
+
+    Requires the optional `sentence-transformers` package. The model is
+    loaded on first use. E5-style models get their "query: " / "passage: "
+    prefixes automatically.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "intfloat/multilingual-e5-base",
+        dimension: int = 768,
+        device: str = "cpu",
+        batch_size: int = 32,
+    ):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.device = device
+        self.batch_size = batch_size
+        self.name = f"local:{model_name}@{dimension}"
+
+        is_e5 = "e5" in model_name.lower()
+        self.query_prefix = "query: " if is_e5 else ""
+        self.document_prefix = "passage: " if is_e5 else ""
+
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as e:
+                        raise RuntimeError(
+                            "EMBEDDING_BACKEND=local requires the sentence-transformers package"
+                        ) from e
+                    logger.info(
+                        f"📦 Loading local embedding model {self.model_name} ({self.device})"
+                    )
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        prefix = self.document_prefix if task_type == "retrieval_document" else self.query_prefix
+        vectors = self._load().encode(
+            [prefix + text for text in texts],
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return fit_dimension(np.asarray(vectors, dtype=np.float32), self.dimension).tolist()
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic bag-of-words embedding via feature hashing (unigrams +
+    bigrams, signed buckets, L2-normalized). Captures lexical overlap only -
+    meant for tests and offline benchmarks, not for production retrieval.
+    """
+
+    _TOKEN_RE = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+        self.name = f"hashing@{dimension}"
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if value >> 63 else -1.0
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = self._TOKEN_RE.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                index, sign = self._bucket(feature)
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1.0, norms)).tolist()
+
+
+# Process-wide embedders by backend name (local models are expensive to load)
+_embedders: Dict[str, Embedder] = {}
+
+
+def get_embedder(backend: Optional[str] = None) -> Embedder:
+    """
+    Get the embedder for a backend ('gemini', 'local', 'hashing').
+    Defaults to settings.embedding_backend.
+    """
+    settings = get_settings()
+    backend = (backend or settings.embedding_backend).lower()
+
+    if backend not in _embedders:
+        if backend == "gemini":
+            embedder: Embedder = GeminiEmbedder(
+                model=settings.embedding_model,
+                dimension=settings.embedding_dimension,
+            )
+        elif backend == "local":
+            embedder = LocalEmbedder(
+                model_name=settings.local_embedding_model,
+                dimension=settings.embedding_dimension,
+                device=settings.local_embedding_device,
+                batch_size=settings.local_embedding_batch_size,
+            )
+        elif backend == "hashing":
+            embedder = HashingEmbedder(dimension=settings.embedding_dimension)
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        logger.info(f"✅ Embedding backend: {embedder.name}")
+        _embedders[backend] = embedder
+
+    return _embedders[backend]
@@ -0,0 +1,252 @@
+"""
+Embedding Service for DOMULEX
+Two-tier cache (in-process LRU → Redis), micro-batching and off-loop execution
+in front of the configured embedding backend (rag/embedder.py).
+"""
+
+import asyncio
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import get_cached_embeddings, cache_embeddings
+from config import get_settings
+from rag.embedder import Embedder, get_embedder
+
+logger = logging.getLogger(__name__)
+
+# Signature of the blocking batch call: (texts, task_type) -> vectors
+EmbedBatchFn = Callable[[List[str], str], List[List[float]]]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for embedding and cache lookup (NFC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingLRU:
+    """Thread-safe in-process LRU for embedding vectors."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._data: "OrderedDict[Tuple[str, str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is not None:
+                self._data.move_to_end(key)
+            return vector
+
+    def put(self, key: Tuple[str, str, str], vector: List[float]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = vector
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher for concurrent embedding requests.
+
+    Requests arriving within `window_ms` of each other (same task_type) are
+    sent to the model as one batch call, executed in a worker thread so the
+    event loop never blocks on the HTTP round-trip.
+    """
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        window_ms: int = 5,
+        max_batch_size: int = 100,
+    ):
+        self._embed_batch = embed_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        # Size-triggered flushes: referenced until done so they aren't garbage-collected
+        self._flushes: set = set()
+
+    async def submit(self, text: str, task_type: str) -> List[float]:
+        """Queue one text and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(task_type, [])
+        queue.append((text, future))
+
+        if len(queue) >= self.max_batch_size:
+            self._cancel_timer(task_type)
+            flush = loop.create_task(self._flush(task_type))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        elif task_type not in self._timers:
+            self._timers[task_type] = loop.create_task(self._flush_later(task_type))
+
+        return await future
+
+    def _cancel_timer(self, task_type: str):
+        timer = self._timers.pop(task_type, None)
+        if timer is not None and not timer.done():
+            timer.cancel()
+
+    async def _flush_later(self, task_type: str):
+        await asyncio.sleep(self.window)
+        self._timers.pop(task_type, None)
+        await self._flush(task_type)
+
+    async def _flush(self, task_type: str):
+        batch = self._pending.pop(task_type, [])
+        if not batch:
+            return
+
+        # Identical texts in one window share a single slot in the request
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = []
+            for start in range(0, len(unique_texts), self.max_batch_size):
+                chunk = unique_texts[start:start + self.max_batch_size]
+                vectors.extend(await asyncio.to_thread(self._embed_batch, chunk, task_type))
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class EmbeddingService:
+    """
+    Embedding layer shared by the RAG engine.
+
+    Lookup order:
+    1. In-process LRU (keyed by normalized text, model, task_type)
+    2. Redis (same key, via cache.py)
+    3. Embedder (settings.embedding_backend) - batched across concurrent
+       callers, executed off the event loop
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        embed_batch: Optional[EmbedBatchFn] = None,
+        embedder: Optional[Embedder] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[int] = None,
+        batch_window_ms: Optional[int] = None,
+        batch_max_size: Optional[int] = None,
+    ):
+        settings = get_settings()
+        if embed_batch is None:
+            embedder = embedder or get_embedder()
+            embed_batch = embedder.embed_batch
+        self.embedder = embedder
+        self._embed_batch = embed_batch
+        # Cache namespace: vectors of different models/backends never mix
+        self.model = model or (embedder.name if embedder is not None else "custom")
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.embedding_cache_ttl
+        self._lru = EmbeddingLRU(
+            cache_size if cache_size is not None else settings.embedding_cache_size
+        )
+        self.batch_max_size = (
+            batch_max_size if batch_max_size is not None else settings.embedding_batch_max_size
+        )
+        self._batcher = EmbeddingBatcher(
+            embed_batch,
+            window_ms=(
+                batch_window_ms if batch_window_ms is not None
+                else settings.embedding_batch_window_ms
+            ),
+            max_batch_size=self.batch_max_size,
+        )
+
+    async def embed(self, text: str, task_type: str = "retrieval_query") -> List[float]:
+        """Embed a single text."""
+        vectors = await self.embed_many([text], task_type=task_type)
+        return vectors[0]
+
+    async def embed_many(
+        self,
+        texts: List[str],
+        task_type: str = "retrieval_query",
+    ) -> List[List[float]]:
+        """
+        Embed several texts, serving as many as possible from cache.
+
+        Returns:
+            Vectors in the same order as texts
+        """
+        normalized = [normalize_text(text) for text in texts]
+        results: List[Optional[List[float]]] = [
+            self._lru.get((text, self.model, task_type)) for text in normalized
+        ]
+
+        # Tier 2: Redis, one MGET for all LRU misses
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            cached = await asyncio.to_thread(
+                get_cached_embeddings,
+                [normalized[i] for i in missing],
+                self.model,
+                task_type,
+            )
+            for i, vector in zip(missing, cached):
+                if vector is not None:
+                    results[i] = vector
+                    self._lru.put((normalized[i], self.model, task_type), vector)
+
+        # Tier 3: model, through the micro-batcher
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            vectors = await asyncio.gather(*[
+                self._batcher.submit(normalized[i], task_type) for i in missing
+            ])
+            fresh_texts = []
+            for i, vector in zip(missing, vectors):
+                results[i] = vector
+                self._lru.put((normalized[i], self.model, task_type), vector)
+                fresh_texts.append(normalized[i])
+            await asyncio.to_thread(
+                cache_embeddings,
+                list(vectors),
+                fresh_texts,
+                self.cache_ttl,
+                self.model,
+                task_type,
+            )
+
+        return results
+
+    async def embed_uncached(
+        self,
+        texts: List[str],
+        task_type: str = "retrieval_document",
+    ) -> List[List[float]]:
+        """
+        Embed bulk texts one batch after another, bypassing LRU, Redis and the
+        micro-batcher.
+
+        For one-off documents (uploads): their vectors would only evict query
+        vectors from the caches, and at most one worker thread is busy at a
+        time, so a large document can't starve other to_thread callers.
+
+        Returns:
+            Vectors in the same order as texts
+        """
+        normalized = [normalize_text(text) for text in texts]
+        vectors: List[List[float]] = []
+        for start in range(0, len(normalized), self.batch_max_size):
+            batch = normalized[start:start + self.batch_max_size]
+            vectors.extend(await asyncio.to_thread(self._embed_batch, batch, task_type))
+        return vectors
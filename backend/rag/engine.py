@@ -5,21 +5,45 @@ Retrieval-Augmented Generation with strict jurisdiction filtering.
 
 import asyncio
 import logging
-from typing import List, Optional
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple
 
 import google.generativeai as genai
-from qdrant_client import QdrantClient
+import numpy as np
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.models import (
-    Distance,
-    VectorParams,
     PointStruct,
     Filter,
     FieldCondition,
     MatchValue,
     MatchAny,
+    SearchRequest,
 )
 
-from models.legal import LegalDocument, Jurisdiction, UserRole, QueryResponse
+from config import get_settings
+from models.legal import (
+    LegalDocument,
+    Jurisdiction,
+    UserRole,
+    QueryResponse,
+    RetrievalQuery,
+    ScoredDocument,
+)
+from rag.embeddings import EmbeddingService
+from rag.citations import CitationResolver, is_citation_only
+from rag.context import ContextAssembler
+from rag.lexical import LexicalIndex, LexicalResult, reciprocal_rank_fusion
+from rag.reranker import PASSAGE_CHARS, Reranker, get_reranker, recency_prior, select_within_budget
+from rag.upload_index import UploadRetriever
+from rag.rebuild import resolve_alias
+from rag.verification import PENDING, UNVERIFIED, Verification, VerificationStore, check_references
+from rag.schema import (
+    create_collection,
+    document_payload,
+    ensure_payload_indexes,
+    search_params,
+    to_legal_document,
+)
 from rag.prompts import (
     get_system_instruction,
     detect_jurisdiction_from_query,
@@ -35,9 +59,12 @@ class RAGEngine:
     Retrieval-Augmented Generation engine with jurisdiction-aware filtering.
     
     Architecture:
-    1. Embed user query with Gemini
-    2. Search Qdrant with STRICT jurisdiction filter (if available)
-    3. Synthesize answer with Cultural Bridge prompts
+    1. Resolve cited norms/decisions directly (citation index)
+    2. Embed user query with Gemini
+    3. Search Qdrant with STRICT jurisdiction filter (if available)
+    4. Fuse with BM25 over the payloads (RRF), exact citations first
+    5. Rerank candidates (cross-encoder + recency prior) within a token budget
+    6. Synthesize answer with Cultural Bridge prompts
     
     Graceful Degradation:
     - If Qdrant is not available, runs in Gemini-only mode
@@ -46,55 +73,133 @@ class RAGEngine:
     
     def __init__(
         self,
-        qdrant_client: Optional[QdrantClient],
+        qdrant_client: Optional[AsyncQdrantClient],
         gemini_api_key: str,
         collection_name: str = "legal_documents",
         vector_size: int = 768,  # Gemini embedding dimension
+        embedding_service: Optional[EmbeddingService] = None,
+        hybrid: Optional[bool] = None,
     ):
+        settings = get_settings()
         self.qdrant = qdrant_client
         self.collection_name = collection_name
+        # A rebuild alias is created by rag/rebuild.py only - never create a collection under it
+        self.create_missing_collection = collection_name != settings.qdrant_collection_alias
         self.vector_size = vector_size
         self.qdrant_available = qdrant_client is not None
         
         # Initialize Gemini
         genai.configure(api_key=gemini_api_key)
-        # Use same embedding model as seed_qdrant_cloud.py (768 dimensions)
-        self.embedding_model = "models/text-embedding-004"
+        # Cached, micro-batched, off-loop embeddings (backend: settings.embedding_backend)
+        self.embeddings = embedding_service or EmbeddingService()
+        self.embedding_model = self.embeddings.model
         # Strict mode: temperature=0.0 eliminates randomness for legal accuracy
         self.generation_model = genai.GenerativeModel(
             "gemini-2.5-flash",
             generation_config={"temperature": 0.0}
         )
         
+        # Hybrid retrieval: BM25 index over the same payloads (built in the background)
+        self.hybrid_candidates = settings.hybrid_candidates
+        self.hybrid_rrf_k = settings.hybrid_rrf_k
+        use_hybrid = settings.hybrid_retrieval if hybrid is None else hybrid
+        self.lexical: Optional[LexicalIndex] = None
+        if use_hybrid and self.qdrant_available:
+            self.lexical = LexicalIndex(
+                qdrant_client,
+                collection_name,
+                refresh_seconds=settings.lexical_index_refresh_seconds,
+            )
+        
+        # Citation resolver: § / Aktenzeichen -> points, persisted on disk
+        self.citations: Optional[CitationResolver] = None
+        if settings.citation_resolver and self.qdrant_available:
+            self.citations = CitationResolver(
+                qdrant_client,
+                collection_name,
+                path=settings.citation_index_path,
+                refresh_seconds=settings.citation_index_refresh_seconds,
+            )
+        
+        # Second stage: cross-encoder over the over-fetched candidates
+        self.reranker: Optional[Reranker] = get_reranker()
+        self.rerank_candidates = settings.rerank_candidates
+        self.rerank_top_n = settings.rerank_top_n
+        self.rerank_top_n_lawyer = settings.rerank_top_n_lawyer
+        self.rerank_token_budget = settings.rerank_token_budget
+        self.rerank_recency_weight = settings.rerank_recency_weight
+        self.rerank_recency_half_life_days = settings.rerank_recency_half_life_days
+        
+        # Prompt context: chunk merge, near-duplicate removal, token budget
+        self.context_assembler = ContextAssembler(
+            token_budget=settings.context_token_budget,
+            source_max_tokens=settings.context_source_max_tokens,
+            upload_share=settings.context_upload_share,
+            dedup_threshold=settings.context_dedup_threshold,
+        )
+        
+        # Long uploads: chunked + embedded once, relevant passages per question
+        self.upload_retriever = UploadRetriever(
+            self.embeddings,
+            chunk_tokens=settings.upload_index_chunk_tokens,
+            top_k=settings.upload_index_top_k,
+            ttl=settings.upload_index_ttl,
+            max_entries=settings.upload_index_max_entries,
+            max_chunks=settings.upload_index_max_chunks,
+        )
+        
+        # Answer verification: local citation check first, LLM critic if inconclusive
+        self.verification_mode = settings.verification_mode
+        self.verification_async = settings.verification_async
+        self.verifications = VerificationStore(ttl=settings.verification_ttl)
+        self._verification_tasks: set = set()
+        
+        # HNSW beam width + rescoring of quantized candidates
+        self.search_params = search_params(settings)
+        
         # Collection will be ensured lazily on first use
         self._collection_ensured = False
     
-    def _ensure_collection(self):
-        """Create Qdrant collection if it doesn't exist. Called lazily."""
+    async def _ensure_collection(self):
+        """
+        Create Qdrant collection and its payload indexes if missing. Called lazily.
+        
+        Only a collection Qdrant reports as missing is created - not on
+        timeouts, and never under the serving alias of a rebuild (an empty
+        collection there would shadow the alias).
+        """
         if self._collection_ensured or not self.qdrant_available:
             return
         try:
-            self.qdrant.get_collection(self.collection_name)
-            self._collection_ensured = True
-        except Exception:
-            # Create collection with cosine similarity
-            self.qdrant.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance=Distance.COSINE,
-                ),
+            exists = (
+                await self.qdrant.collection_exists(self.collection_name)
+                or await resolve_alias(self.qdrant, self.collection_name) is not None
             )
-            self._collection_ensured = True
+        except Exception as e:
+            logger.warning(f"Qdrant collection check failed, retrying on next use: {e}")
+            return
+        if not exists:
+            if not self.create_missing_collection:
+                logger.error(
+                    f"Serving alias {self.collection_name} does not exist - "
+                    f"run python -m rag.rebuild {self.collection_name} --source <collection>"
+                )
+                return
+            # Quantized cosine vectors, originals on disk (settings.qdrant_*)
+            await create_collection(self.qdrant, self.collection_name, self.vector_size)
+        try:
+            # Filtered search without indexes degrades to full scans
+            await ensure_payload_indexes(self.qdrant, self.collection_name)
+        except Exception as e:
+            logger.warning(f"Payload indexes not provisioned on {self.collection_name}: {e}")
+        self._collection_ensured = True
     
     async def embed_text(self, text: str) -> List[float]:
-        """Generate embedding using Gemini."""
-        result = genai.embed_content(
-            model=self.embedding_model,
-            content=text,
+        """Generate embedding using Gemini (cached and batched)."""
+        return await self.embeddings.embed(
+            text,
             task_type="retrieval_query",  # Optimized for search
         )
-        return result["embedding"]
     
     async def index_documents(self, documents: List[LegalDocument]) -> int:
         """
@@ -108,79 +213,47 @@ class RAGEngine:
         """
         points = []
         
+        # Generate embeddings for all documents that lack one in a single batch
+        missing = [doc for doc in documents if not doc.embedding_vector]
+        if missing:
+            # Combine title + content for better semantic search
+            texts_to_embed = [
+                f"{doc.title}\n\n{doc.content_original[:2000]}"  # Limit to 2k chars
+                for doc in missing
+            ]
+            vectors = await self.embeddings.embed_many(texts_to_embed, task_type="retrieval_query")
+            for doc, vector in zip(missing, vectors):
+                doc.embedding_vector = vector
+        
         for doc in documents:
-            # Generate embedding if not already present
-            if not doc.embedding_vector:
-                # Combine title + content for better semantic search
-                text_to_embed = f"{doc.title}\n\n{doc.content_original[:2000]}"  # Limit to 2k chars
-                doc.embedding_vector = await self.embed_text(text_to_embed)
-            
             # Create Qdrant point
             point = PointStruct(
                 id=str(doc.id),
                 vector=doc.embedding_vector,
-                payload={
-                    "jurisdiction": doc.jurisdiction.value,
-                    "sub_jurisdiction": doc.sub_jurisdiction,
-                    "title": doc.title,
-                    "content": doc.content_original,
-                    "source_url": str(doc.source_url),
-                    "publication_date": doc.publication_date.isoformat(),
-                    "document_type": doc.document_type,
-                    "language": doc.language,
-                    "keywords": doc.keywords,
-                },
+                payload=document_payload(doc),
             )
             points.append(point)
         
         # Batch upload
-        self.qdrant.upsert(
+        await self.qdrant.upsert(
             collection_name=self.collection_name,
             points=points,
         )
+        if self.lexical is not None:
+            self.lexical.add_points(points)
+        if self.citations is not None:
+            self.citations.add_points(points)
         
         return len(points)
     
-    async def search(
-        self,
-        query: str,
+    @staticmethod
+    def _build_filter(
         target_jurisdiction: Jurisdiction,
         sub_jurisdiction: Optional[str] = None,
-        limit: int = 5,
         source_filter: Optional[List[str]] = None,
         gerichtsebene_filter: Optional[List[str]] = None,
-    ) -> List[LegalDocument]:
-        """
-        Search for relevant legal documents with STRICT jurisdiction filtering.
-        
-        This is the CRITICAL function that prevents legal hallucinations:
-        - A US query will NEVER retrieve German BGB
-        - A Spanish query will NEVER retrieve US Code
-        
-        Args:
-            query: User's question
-            target_jurisdiction: MUST match - no cross-contamination
-            sub_jurisdiction: Optional state/region filter
-            limit: Max number of results
-            source_filter: Optional list of doc_types to include (e.g., ["GESETZ", "URTEIL", "LITERATUR"])
-                          If None, all types are included
-            gerichtsebene_filter: Optional list of court levels (e.g., ["BGH", "OLG", "LG", "AG"])
-                                 Only applies when URTEIL is in source_filter
-            
-        Returns:
-            List of relevant LegalDocument objects (empty if Qdrant unavailable)
-        """
-        # If Qdrant not available, return empty list
-        if not self.qdrant_available:
-            return []
-        
-        # Ensure collection exists (lazy initialization)
-        self._ensure_collection()
-        
-        # Embed the query
-        query_vector = await self.embed_text(query)
-        
-        # Build filter - JURISDICTION IS MANDATORY for legal accuracy
+    ) -> Filter:
+        """Build the Qdrant filter - JURISDICTION IS MANDATORY for legal accuracy."""
         filter_conditions = [
             FieldCondition(
                 key="jurisdiction",
@@ -215,85 +288,407 @@ class RAGEngine:
                 )
             )
         
-        # Search Qdrant - catch errors and return empty list for Gemini fallback
+        return Filter(must=filter_conditions)
+    
+    @staticmethod
+    def _to_scored_document(result, score: Optional[float] = None) -> ScoredDocument:
+        """Convert a Qdrant ScoredPoint (or Record + score) to a ScoredDocument."""
+        return ScoredDocument(
+            document=to_legal_document(result.id, result.payload),
+            score=result.score if score is None else score,
+        )
+    
+    async def retrieve(
+        self,
+        query: str,
+        target_jurisdiction: Jurisdiction,
+        sub_jurisdiction: Optional[str] = None,
+        limit: int = 5,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        query_vector: Optional[List[float]] = None,
+    ) -> List[ScoredDocument]:
+        """
+        Retrieval only: scored chunks, no answer generation.
+        
+        Same strict jurisdiction filtering as search(). Use this when a caller
+        only needs documents (contract analysis, mediation, template fields).
+        With hybrid retrieval, dense and BM25 candidates are fused (RRF) and
+        documents citing the exact § / Aktenzeichen of the query come first.
+        
+        Args:
+            query: Search text
+            target_jurisdiction: MUST match - no cross-contamination
+            sub_jurisdiction: Optional state/region filter
+            limit: Max number of results
+            source_filter: Optional list of doc_types to include
+            gerichtsebene_filter: Optional list of court levels (only with URTEIL)
+            query_vector: Precomputed query embedding (skips embedding the query)
+            
+        Returns:
+            ScoredDocument list, best match first (empty if Qdrant unavailable)
+        """
+        # If Qdrant not available, return empty list
+        if not self.qdrant_available:
+            return []
+        
+        # Ensure collection exists (lazy initialization)
+        await self._ensure_collection()
+        
+        # Cited norms/decisions (§ 573c BGB, VIII ZR 242/13) by direct lookup;
+        # pure citation queries are answered without embedding or ANN search
+        cited = await self._resolve_citations(
+            query, target_jurisdiction, sub_jurisdiction, source_filter, gerichtsebene_filter, limit
+        )
+        if cited and (len(cited) >= limit or is_citation_only(query)):
+            return cited
+        
+        # BM25 runs in a worker thread while the query is embedded and searched
+        lexical_task = self._start_lexical_search(
+            query, target_jurisdiction, sub_jurisdiction, source_filter, gerichtsebene_filter, limit
+        )
+        try:
+            # Embed the query (unless the caller batched embeddings already)
+            if query_vector is None:
+                query_vector = await self.embed_text(query)
+            
+            # Search Qdrant - catch errors and return empty list for Gemini fallback
+            try:
+                search_results = await self.qdrant.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    query_filter=self._build_filter(
+                        target_jurisdiction,
+                        sub_jurisdiction,
+                        source_filter,
+                        gerichtsebene_filter,
+                    ),
+                    limit=self._candidate_limit(limit, lexical_task),
+                    search_params=self.search_params,
+                )
+            except Exception as e:
+                logger.warning(f"Qdrant search failed, using Gemini-only mode: {e}")
+                return []
+            
+            if lexical_task is None:
+                results = [self._to_scored_document(result) for result in search_results]
+            else:
+                results = await self._fuse(search_results, await lexical_task, limit)
+        finally:
+            # Embedding or search failed: don't leave BM25 running unobserved
+            self._cancel_pending(lexical_task)
+        return self._cited_first(cited, results, limit)
+    
+    @staticmethod
+    def _cancel_pending(*tasks: Optional[asyncio.Task]):
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+    
+    @staticmethod
+    def _cited_first(
+        cited: List[ScoredDocument],
+        results: List[ScoredDocument],
+        limit: int,
+    ) -> List[ScoredDocument]:
+        """Directly cited documents first, then the remaining hits (deduplicated)."""
+        if cited:
+            cited_ids = {str(hit.document.id) for hit in cited}
+            results = cited + [hit for hit in results if str(hit.document.id) not in cited_ids]
+        return results[:limit]
+    
+    async def _resolve_citations(
+        self,
+        query: str,
+        target_jurisdiction: Jurisdiction,
+        sub_jurisdiction: Optional[str],
+        source_filter: Optional[List[str]],
+        gerichtsebene_filter: Optional[List[str]],
+        limit: int,
+    ) -> List[ScoredDocument]:
+        """Documents the query cites, from the citation index (score 1.0)."""
+        if self.citations is None:
+            return []
+        point_ids = self.citations.resolve(
+            query,
+            target_jurisdiction.value,
+            sub_jurisdiction,
+            source_filter,
+            gerichtsebene_filter,
+        )
+        if not point_ids:
+            return []
         try:
-            search_results = self.qdrant.search(
+            records = await self.qdrant.retrieve(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
-                query_filter=Filter(must=filter_conditions),
-                limit=limit,
+                ids=point_ids[:limit],
+                with_payload=True,
+                with_vectors=False,
             )
         except Exception as e:
-            logger.warning(f"Qdrant search failed, using Gemini-only mode: {e}")
+            logger.warning(f"Qdrant retrieve of cited documents failed: {e}")
             return []
+        by_id = {str(record.id): record for record in records}
+        return [
+            self._to_scored_document(by_id[point_id], score=1.0)
+            for point_id in point_ids[:limit]
+            if point_id in by_id
+        ]
+    
+    def _start_lexical_search(
+        self,
+        query: str,
+        target_jurisdiction: Jurisdiction,
+        sub_jurisdiction: Optional[str],
+        source_filter: Optional[List[str]],
+        gerichtsebene_filter: Optional[List[str]],
+        limit: int,
+    ) -> Optional[asyncio.Task]:
+        """BM25 search as a task (None when hybrid retrieval is off)."""
+        if self.lexical is None:
+            return None
+        return asyncio.create_task(self.lexical.search(
+            query,
+            target_jurisdiction.value,
+            sub_jurisdiction,
+            source_filter,
+            gerichtsebene_filter,
+            limit=max(limit, self.hybrid_candidates),
+        ))
+    
+    def _candidate_limit(self, limit: int, lexical_task: Optional[asyncio.Task]) -> int:
+        """Dense candidates to fetch: more when they get fused with BM25."""
+        return max(limit, self.hybrid_candidates) if lexical_task is not None else limit
+    
+    async def _fuse(
+        self,
+        dense: list,
+        lexical: Optional[LexicalResult],
+        limit: int,
+    ) -> List[ScoredDocument]:
+        """
+        Combine dense Qdrant hits (ScoredPoints) and BM25 results.
         
-        # Convert to LegalDocument objects
-        # Payload schema: doc_id, content, jurisdiction, language, source, source_url, topics, law, section, last_updated
-        documents = []
-        for result in search_results:
-            payload = result.payload
-            # Handle publication_date - check multiple possible date fields
-            pub_date_raw = payload.get("last_updated") or payload.get("datum") or payload.get("date") or "2025-01-01"
-            if isinstance(pub_date_raw, str) and "T" in pub_date_raw:
-                pub_date = pub_date_raw.split("T")[0]  # Extract date part only
-            else:
-                pub_date = pub_date_raw if pub_date_raw else "2025-01-01"
+        Exact citation matches come first (score 1.0), the rest is ordered by
+        reciprocal-rank fusion (score = RRF score). Lexical-only hits are
+        fetched from Qdrant in one call; only the final `limit` hits are
+        converted to documents.
+        """
+        if lexical is None:
+            return [self._to_scored_document(result) for result in dense[:limit]]
+        
+        by_id = {str(result.id): result for result in dense}
+        fused = reciprocal_rank_fusion(
+            [list(by_id), [point_id for point_id, _ in lexical.ranked]],
+            k=self.hybrid_rrf_k,
+        )
+        scores = {point_id: 1.0 for point_id in lexical.exact}
+        for point_id, score in fused:
+            scores.setdefault(point_id, score)
+        order = list(scores)[:limit]
+        
+        missing = [point_id for point_id in order if point_id not in by_id]
+        if missing:
+            try:
+                records = await self.qdrant.retrieve(
+                    collection_name=self.collection_name,
+                    ids=missing,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+                by_id.update((str(record.id), record) for record in records)
+            except Exception as e:
+                logger.warning(f"Qdrant retrieve of lexical hits failed: {e}")
+        
+        return [
+            self._to_scored_document(by_id[point_id], score=scores[point_id])
+            for point_id in order
+            if point_id in by_id
+        ]
+    
+    async def retrieve_many(self, queries: List[RetrievalQuery]) -> List[List[ScoredDocument]]:
+        """
+        Retrieve for N queries at once.
+        
+        Cited § / Aktenzeichen are resolved per query as in retrieve();
+        queries answered by the citation index alone skip the vector search.
+        The remaining query texts are embedded in one batch request, then a
+        single Qdrant search_batch call runs every query with its own filter.
+        
+        Returns:
+            One ScoredDocument list per query, in input order
+        """
+        if not queries or not self.qdrant_available:
+            return [[] for _ in queries]
+        
+        await self._ensure_collection()
+        
+        cited_lists = await asyncio.gather(*(
+            self._resolve_citations(
+                q.query,
+                q.target_jurisdiction,
+                q.sub_jurisdiction,
+                q.source_filter,
+                q.gerichtsebene_filter,
+                q.limit,
+            )
+            for q in queries
+        ))
+        results: List[List[ScoredDocument]] = list(cited_lists)
+        open_queries = [
+            i for i, (q, cited) in enumerate(zip(queries, cited_lists))
+            if not (cited and (len(cited) >= q.limit or is_citation_only(q.query)))
+        ]
+        if not open_queries:
+            return results
+        
+        pending = [queries[i] for i in open_queries]
+        lexical_tasks = [
+            self._start_lexical_search(
+                q.query,
+                q.target_jurisdiction,
+                q.sub_jurisdiction,
+                q.source_filter,
+                q.gerichtsebene_filter,
+                q.limit,
+            )
+            for q in pending
+        ]
+        try:
+            vectors = await self.embeddings.embed_many(
+                [q.query for q in pending],
+                task_type="retrieval_query",
+            )
             
-            # Use title field first, then fallback to other fields
-            title = payload.get("title") or payload.get("source") or payload.get("doc_id") or "Unbekannt"
+            requests = [
+                SearchRequest(
+                    vector=vector,
+                    filter=self._build_filter(
+                        q.target_jurisdiction,
+                        q.sub_jurisdiction,
+                        q.source_filter,
+                        q.gerichtsebene_filter,
+                    ),
+                    limit=self._candidate_limit(q.limit, task),
+                    with_payload=True,
+                    params=self.search_params,
+                )
+                for q, vector, task in zip(pending, vectors, lexical_tasks)
+            ]
             
-            doc = LegalDocument(
-                id=result.id,
-                jurisdiction=Jurisdiction(payload.get("jurisdiction", "DE")),
-                sub_jurisdiction=payload.get("sub_jurisdiction"),
-                title=title,
-                content_original=payload.get("content", ""),
-                source_url=payload.get("source_url", ""),
-                publication_date=pub_date,
-                document_type=payload.get("law") or payload.get("type") or payload.get("doc_type") or "Gesetz",
-                language=payload.get("language", "de"),
-                keywords=payload.get("topics") or payload.get("keywords") or [],
-                embedding_vector=None,  # Don't return vectors in response
-            )
-            documents.append(doc)
+            try:
+                batch_results = await self.qdrant.search_batch(
+                    collection_name=self.collection_name,
+                    requests=requests,
+                )
+            except Exception as e:
+                logger.warning(f"Qdrant batch search failed: {e}")
+                return [[] for _ in queries]
+            
+            if self.lexical is None:
+                found = [
+                    [self._to_scored_document(result) for result in dense]
+                    for dense in batch_results
+                ]
+            else:
+                lexical_results = await asyncio.gather(*lexical_tasks)
+                found = list(await asyncio.gather(*[
+                    self._fuse(dense, lexical, q.limit)
+                    for q, dense, lexical in zip(pending, batch_results, lexical_results)
+                ]))
+        finally:
+            self._cancel_pending(*lexical_tasks)
         
-        return documents
-        gerichtsebene_filter: Optional[List[str]] = None,
+        for i, hits in zip(open_queries, found):
+            results[i] = self._cited_first(cited_lists[i], hits, queries[i].limit)
+        return results
     
-    async def query(
+    async def search(
         self,
-        user_query: str,
+        query: str,
         target_jurisdiction: Jurisdiction,
-        user_role: UserRole,
-        user_language: str = "de",
         sub_jurisdiction: Optional[str] = None,
+        limit: int = 5,
         source_filter: Optional[List[str]] = None,
         gerichtsebene_filter: Optional[List[str]] = None,
-        use_public_sources: Optional[bool] = False,
-        uploaded_documents: Optional[List[dict]] = None,
-    ) -> QueryResponse:
+        query_vector: Optional[List[float]] = None,
+    ) -> List[LegalDocument]:
         """
-        Main RAG query function with Cultural Bridge.
+        Search for relevant legal documents with STRICT jurisdiction filtering.
         
-        Workflow:
-        1. Detect if query contains foreign jurisdiction terms → warn
-        2. Search Qdrant with strict filtering
-        3. Generate answer using Gemini with culturally-aware prompts
+        This is the CRITICAL function that prevents legal hallucinations:
+        - A US query will NEVER retrieve German BGB
+        - A Spanish query will NEVER retrieve US Code
         
         Args:
-            user_query: User's legal question
-            target_jurisdiction: Which country's law to query
-            user_role: INVESTOR, LANDLORD, etc.
-            user_language: de, es, en
-            sub_jurisdiction: Optional state/region
-            source_filter: Optional list of doc_types (e.g., ["GESETZ", "URTEIL", "LITERATUR"])
-            gerichtsebene_filter: Optional list of court levels (e.g., ["BGH", "OLG"])
-            use_public_sources: 🔑 Use public sources for enhanced answers
+            query: User's question
+            target_jurisdiction: MUST match - no cross-contamination
+            sub_jurisdiction: Optional state/region filter
+            limit: Max number of results
+            source_filter: Optional list of doc_types to include
+                          (e.g., ["GESETZ", "URTEIL", "LITERATUR"]); if None, all types are included
+            gerichtsebene_filter: Optional list of court levels (e.g., ["BGH", "OLG", "LG", "AG"])
+                                 Only applies when URTEIL is in source_filter
+            query_vector: Precomputed query embedding (skips embedding the query)
             
         Returns:
-            QueryResponse with answer, sources, and warnings
+            List of relevant LegalDocument objects (empty if Qdrant unavailable)
         """
-        # Step 1: Detect jurisdiction mismatch
+        scored = await self.retrieve(
+            query=query,
+            target_jurisdiction=target_jurisdiction,
+            sub_jurisdiction=sub_jurisdiction,
+            limit=limit,
+            source_filter=source_filter,
+            gerichtsebene_filter=gerichtsebene_filter,
+            query_vector=query_vector,
+        )
+        return [hit.document for hit in scored]
+    
+    async def rerank(
+        self,
+        query: str,
+        hits: List[ScoredDocument],
+        limit: int,
+        token_budget: Optional[int] = None,
+    ) -> List[ScoredDocument]:
+        """
+        Reorder retrieved hits by reranker relevance blended with a
+        recency prior and keep the best `limit` within `token_budget`.
+        
+        Scores of the returned hits are the blended scores. Without a
+        reranker (or if it fails) the retrieval order is kept.
+        """
+        if self.reranker is None or len(hits) < 2:
+            return select_within_budget(hits, limit, token_budget)
+        
+        passages = [
+            f"{hit.document.title}\n{hit.document.content_original[:PASSAGE_CHARS]}" for hit in hits
+        ]
+        try:
+            relevance = await asyncio.to_thread(self.reranker.score, query, passages)
+        except Exception as e:
+            logger.error(f"Reranker {self.reranker.name} failed, keeping retrieval order: {e}")
+            return select_within_budget(hits, limit, token_budget)
+        
+        recency = recency_prior(
+            [hit.document.publication_date for hit in hits],
+            self.rerank_recency_half_life_days,
+        )
+        weight = self.rerank_recency_weight
+        combined = (1.0 - weight) * relevance + weight * recency
+        ranked = [
+            ScoredDocument(document=hits[i].document, score=float(combined[i]))
+            for i in np.argsort(-combined, kind="stable")
+        ]
+        return select_within_budget(ranked, limit, token_budget)
+    
+    def _jurisdiction_warning(
+        self,
+        user_query: str,
+        target_jurisdiction: Jurisdiction,
+    ) -> Optional[str]:
+        """Warn if the query contains terms from a different jurisdiction."""
         detected_jurisdictions = detect_jurisdiction_from_query(user_query)
         foreign_terms = []
         
@@ -305,44 +700,24 @@ class RAGEngine:
                     if kw.lower() in user_query.lower()
                 ])
         
-        jurisdiction_warning = None
-        if foreign_terms:
-            jurisdiction_warning = get_jurisdiction_warning(
-                target_jurisdiction,
-                foreign_terms[:3],  # Limit to first 3 matches
-            )
-        
-        # Step 2: Retrieve relevant documents (empty if Qdrant unavailable)
-        # Lawyers get more sources (15) than regular users (5)
-        search_limit = 15 if user_role == UserRole.LAWYER else 5
-        
-        relevant_docs = await self.search(
-            query=user_query,
-            target_jurisdiction=target_jurisdiction,
-            sub_jurisdiction=sub_jurisdiction,
-            gerichtsebene_filter=gerichtsebene_filter,
-            limit=search_limit,
-            source_filter=source_filter,
+        if not foreign_terms:
+            return None
+        return get_jurisdiction_warning(
+            target_jurisdiction,
+            foreign_terms[:3],  # Limit to first 3 matches
         )
-        
-        # Sort by recency - newest documents first (for most current legal state)
-        relevant_docs.sort(key=lambda d: d.publication_date, reverse=True)
-        
-        # Step 3: Handle Gemini-only mode (no Qdrant)
-        # Build user document context if available
-        user_doc_context = ""
-        if uploaded_documents:
-            user_doc_parts = []
-            for doc in uploaded_documents:
-                doc_text = doc.get('text', '')
-                if doc_text:
-                    user_doc_parts.append(f"📎 HOCHGELADENES DOKUMENT:\n{doc_text[:10000]}")  # Max 10k chars per doc
-            if user_doc_parts:
-                user_doc_context = "\n\n---\n\n".join(user_doc_parts) + "\n\n---\n\n"
-        
-        if not relevant_docs:
-            # Generate answer directly with Gemini (no document grounding)
-            gemini_only_prompt = f"""You are a legal expert assistant for {target_jurisdiction.value} real estate law.
+    
+    @staticmethod
+    def _gemini_only_prompt(
+        user_query: str,
+        target_jurisdiction: Jurisdiction,
+        user_role: UserRole,
+        user_language: str,
+        sub_jurisdiction: Optional[str],
+        user_doc_context: str,
+    ) -> str:
+        """Prompt for answers without document grounding (no Qdrant hits)."""
+        return f"""You are a legal expert assistant for {target_jurisdiction.value} real estate law.
             
 **User Role:** {user_role.value}
 **Target Jurisdiction:** {target_jurisdiction.value}
@@ -364,49 +739,242 @@ class RAGEngine:
 4. If a document was uploaded, analyze it thoroughly and reference specific clauses/paragraphs
 5. Respond confidently in {user_language} - you ARE the expert
 """
-            try:
-                response = await asyncio.to_thread(
-                    self.generation_model.generate_content,
-                    gemini_only_prompt,
-                    generation_config={
-                        "temperature": 0.1,  # Slightly higher for general knowledge
-                        "max_output_tokens": 8192,
-                    },
-                )
-                answer = response.text
-                
-                # No disclaimer needed - the answer stands on its own
-                
-            except Exception as e:
-                answer = f"Error generating answer: {str(e)}"
-            
-            return QueryResponse(
-                answer=answer,
-                sources=[],
-                jurisdiction_warning=jurisdiction_warning,
+    
+    @staticmethod
+    def _public_sources_warning(user_language: str) -> str:
+        """🔑 Halluzinations-Warnung bei allgemeinem KI-Wissen (ohne Datenbank)."""
+        if user_language == "de":
+            return (
+                "\n\n⚠️ **WARNUNG - KEINE DATENBANKNUTZUNG:** Diese Antwort basiert auf "
+                "**allgemeinem KI-Chatbot-Wissen** ohne Zugriff auf die verlässliche Datenbank. "
+                "Die KI nutzt nur ihr Trainingswissen mit **erhöhtem Risiko für Halluzinationen "
+                "und Fehler**. Prüfen Sie ALLE Paragraphen, Urteile und rechtlichen Angaben "
+                "eigenständig nach!"
             )
+        elif user_language == "en":
+            return (
+                "\n\n⚠️ **WARNING - NO DATABASE ACCESS:** This answer is based on general AI "
+                "chatbot knowledge without access to the reliable database. Higher risk of "
+                "hallucinations and errors. Verify all legal details independently!"
+            )
+        elif user_language == "es":
+            return (
+                "\n\n⚠️ **ADVERTENCIA - SIN ACCESO A BASE DE DATOS:** Esta respuesta se basa en "
+                "conocimiento general del chatbot de IA sin acceso a la base de datos confiable. "
+                "Mayor riesgo de alucinaciones y errores. ¡Verifique todos los detalles legales "
+                "de forma independiente!"
+            )
+        return ""
+    
+    async def _critique(self, context: str, answer: str) -> str:
+        """
+        Self-Critique Verification Loop (anti-hallucination guard).
         
-        # Step 3: Build context from retrieved documents + user documents
-        context_parts = []
+        Returns:
+            Critic verdict ("VERIFIED" or "HALLUCINATION DETECTED: ...")
+        """
+        critique_prompt = f"""You are a fact-checker. \
+Review the following answer against the provided context.
+
+**CONTEXT:**
+{context}
+
+**ANSWER TO VERIFY:**
+{answer}
+
+**TASK:**
+Does the answer contain ANY claims NOT directly supported by the context?
+If YES, output: "HALLUCINATION DETECTED: [specific claim]"
+If NO, output: "VERIFIED"
+"""
         
-        # Add user-uploaded documents first (if any)
-        if user_doc_context:
-            context_parts.append(user_doc_context)
+        critique_response = await asyncio.to_thread(
+            self.generation_model.generate_content,
+            critique_prompt,
+            generation_config={"temperature": 0.0},
+        )
         
-        # Add database sources
-        for doc in relevant_docs:
-            context_parts.append(
-                f"**Source:** {doc.title}\n"
-                f"**Date:** {doc.publication_date}\n"
-                f"**URL:** {doc.source_url}\n\n"
-                f"{doc.content_original[:1500]}..."  # Limit context per doc
-            )
+        return critique_response.text.strip()
+    
+    async def verify(self, context: str, answer: str) -> Verification:
+        """
+        Verify an answer against its context.
         
-        context = "\n\n---\n\n".join(context_parts)
+        The local check matches every § / Aktenzeichen of the answer against
+        the context; a citation missing from the context is a hallucination
+        without asking the critic. All other answers go to the LLM critic
+        (never with verification_mode="local").
+        """
+        if self.verification_mode != "llm":
+            local = check_references(answer, context)
+            if local.conclusive:
+                return Verification(verdict=local.verdict, method="local")
+            if self.verification_mode == "local":
+                return Verification(verdict=UNVERIFIED, method="none")
+        try:
+            return Verification(verdict=await self._critique(context, answer), method="llm")
+        except Exception as e:
+            logger.warning(f"Self-critique failed: {e}")
+            return Verification(verdict=UNVERIFIED, method="none")
+    
+    async def verify_for_response(
+        self, context: str, answer: str
+    ) -> Tuple[Verification, Optional[str]]:
+        """
+        Verdict to send with an answer, plus a verification_id to poll.
         
-        # Step 4: Get strict legal analyst prompt (anti-hallucination)
+        Async mode: the local check runs inline (a missing citation is
+        returned right away), the critic afterwards - the answer goes out
+        PENDING instead of waiting for a second Gemini call.
+        """
+        if not self.verification_async or self.verification_mode == "local":
+            return await self.verify(context, answer), None
+        if self.verification_mode != "llm":
+            local = check_references(answer, context)
+            if local.conclusive:
+                return Verification(verdict=local.verdict, method="local"), None
+        verification_id = await self._verify_later(context, answer)
+        return Verification(verdict=PENDING, method="pending"), verification_id
+    
+    async def _verify_later(self, context: str, answer: str) -> str:
+        """
+        Start verification in the background; returns the verification_id.
+        The id is stored as pending first, so it can be polled right away.
+        """
+        verification_id = uuid.uuid4().hex
+        await self.verifications.set(verification_id, "pending")
+        
+        async def run():
+            verification = await self.verify(context, answer)
+            await self.verifications.set(verification_id, "done", verification)
+        
+        task = asyncio.create_task(run())
+        # Keep a reference until done (the event loop only holds weak ones)
+        self._verification_tasks.add(task)
+        task.add_done_callback(self._verification_tasks.discard)
+        return verification_id
+    
+    async def upload_passages(
+        self,
+        query: str,
+        uploaded_documents: Optional[List[dict]],
+    ) -> Optional[List[dict]]:
+        """
+        Uploads cut down to the passages relevant to the query, each within
+        its share of the context budget. On failure the uploads are returned
+        unchanged (the context assembler then truncates them).
+        """
+        uploads = [doc for doc in uploaded_documents or [] if doc.get("text")]
+        if not uploads:
+            return uploaded_documents
+        budget = self.context_assembler.upload_budget(len(uploads))
+        try:
+            texts = await asyncio.gather(*(
+                self.upload_retriever.passages(query, doc["text"], budget) for doc in uploads
+            ))
+        except Exception as e:
+            logger.warning(f"Upload retrieval failed, using truncated uploads: {e}")
+            return uploaded_documents
+        return [{**doc, "text": text} for doc, text in zip(uploads, texts)]
+    
+    async def _prepare_query(
+        self,
+        user_query: str,
+        target_jurisdiction: Jurisdiction,
+        user_role: UserRole,
+        user_language: str,
+        sub_jurisdiction: Optional[str],
+        source_filter: Optional[List[str]],
+        gerichtsebene_filter: Optional[List[str]],
+        use_public_sources: Optional[bool],
+        uploaded_documents: Optional[List[dict]],
+    ) -> dict:
+        """
+        Shared retrieval + prompt construction for query() and query_stream().
+        
+        Returns:
+            dict with jurisdiction_warning, sources, context, prompt,
+            generation_config and grounded (False in Gemini-only mode)
+        """
+        # Step 1: Detect jurisdiction mismatch
+        jurisdiction_warning = self._jurisdiction_warning(user_query, target_jurisdiction)
+        
+        # Passages of long uploads relevant to the question (alongside retrieval)
+        uploads_task = asyncio.ensure_future(self.upload_passages(user_query, uploaded_documents))
+        
+        try:
+            # Step 2: Retrieve relevant documents (empty if Qdrant unavailable)
+            is_lawyer = user_role == UserRole.LAWYER
+            if self.reranker is not None:
+                # Over-fetch, rerank, keep the best few within the context budget
+                candidates = await self.retrieve(
+                    query=user_query,
+                    target_jurisdiction=target_jurisdiction,
+                    sub_jurisdiction=sub_jurisdiction,
+                    limit=self.rerank_candidates,
+                    source_filter=source_filter,
+                    gerichtsebene_filter=gerichtsebene_filter,
+                )
+                reranked = await self.rerank(
+                    user_query,
+                    candidates,
+                    limit=self.rerank_top_n_lawyer if is_lawyer else self.rerank_top_n,
+                    token_budget=self.rerank_token_budget,
+                )
+                relevant_docs = [hit.document for hit in reranked]
+            else:
+                # Lawyers get more sources than regular users (5); hybrid ranking is
+                # precise enough that 10 fused hits cover what 15 dense hits did
+                if is_lawyer:
+                    search_limit = 10 if self.lexical is not None else 15
+                else:
+                    search_limit = 5
+            
+                relevant_docs = await self.search(
+                    query=user_query,
+                    target_jurisdiction=target_jurisdiction,
+                    sub_jurisdiction=sub_jurisdiction,
+                    gerichtsebene_filter=gerichtsebene_filter,
+                    limit=search_limit,
+                    source_filter=source_filter,
+                )
+            
+                # Sort by recency - newest documents first (for most current legal state)
+                relevant_docs.sort(key=lambda d: d.publication_date, reverse=True)
+            
+            uploaded_documents = await uploads_task
+        finally:
+            # Retrieval failed: don't leave the upload embedding running unobserved
+            self._cancel_pending(uploads_task)
+        
+        # Uploads first, then merged/deduplicated sources within the token budget
+        assembled = self.context_assembler.assemble(relevant_docs, uploaded_documents)
+        
+        # Step 3: Handle Gemini-only mode (no Qdrant)
+        if not relevant_docs:
+            return {
+                "jurisdiction_warning": jurisdiction_warning,
+                "sources": [],
+                "context": "",
+                "grounded": False,
+                "prompt": self._gemini_only_prompt(
+                    user_query=user_query,
+                    target_jurisdiction=target_jurisdiction,
+                    user_role=user_role,
+                    user_language=user_language,
+                    sub_jurisdiction=sub_jurisdiction,
+                    user_doc_context=assembled.uploads,
+                ),
+                "generation_config": {
+                    "temperature": 0.1,  # Slightly higher for general knowledge
+                    "max_output_tokens": 8192,
+                },
+            }
+        
+        # Step 4: Build context + strict legal analyst prompt (anti-hallucination)
         from rag.prompts import get_strict_legal_prompt
         
+        context = assembled.text
         strict_prompt = get_strict_legal_prompt(
             context_chunks=context,
             query=user_query,
@@ -416,56 +984,87 @@ class RAGEngine:
             use_public_sources=use_public_sources,  # 🔑 Öffentliche Quellen
         )
         
-        # Step 5: Generate answer with strict grounding (temperature=0.0)
+        return {
+            "jurisdiction_warning": jurisdiction_warning,
+            "sources": assembled.sources,
+            "context": context,
+            "grounded": True,
+            "prompt": strict_prompt,
+            "generation_config": {
+                "temperature": 0.0,  # STRICT: No randomness
+                "top_p": 1.0,
+                "max_output_tokens": 8192,
+            },
+        }
+    
+    async def query(
+        self,
+        user_query: str,
+        target_jurisdiction: Jurisdiction,
+        user_role: UserRole,
+        user_language: str = "de",
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        use_public_sources: Optional[bool] = False,
+        uploaded_documents: Optional[List[dict]] = None,
+    ) -> QueryResponse:
+        """
+        Main RAG query function with Cultural Bridge.
+        
+        Workflow:
+        1. Detect if query contains foreign jurisdiction terms → warn
+        2. Search Qdrant with strict filtering
+        3. Generate answer using Gemini with culturally-aware prompts
+        
+        Args:
+            user_query: User's legal question
+            target_jurisdiction: Which country's law to query
+            user_role: INVESTOR, LANDLORD, etc.
+            user_language: de, es, en
+            sub_jurisdiction: Optional state/region
+            source_filter: Optional list of doc_types (e.g., ["GESETZ", "URTEIL", "LITERATUR"])
+            gerichtsebene_filter: Optional list of court levels (e.g., ["BGH", "OLG"])
+            use_public_sources: 🔑 Use public sources for enhanced answers
+            
+        Returns:
+            QueryResponse with answer, sources, and warnings
+        """
+        prepared = await self._prepare_query(
+            user_query=user_query,
+            target_jurisdiction=target_jurisdiction,
+            user_role=user_role,
+            user_language=user_language,
+            sub_jurisdiction=sub_jurisdiction,
+            source_filter=source_filter,
+            gerichtsebene_filter=gerichtsebene_filter,
+            use_public_sources=use_public_sources,
+            uploaded_documents=uploaded_documents,
+        )
+        
+        # Step 5: Generate answer (strict grounding: temperature=0.0)
+        verification = None
+        verification_id = None
         try:
             response = await asyncio.to_thread(
                 self.generation_model.generate_content,
-                strict_prompt,
-                generation_config={
-                    "temperature": 0.0,  # STRICT: No randomness
-                    "top_p": 1.0,
-                    "max_output_tokens": 8192,
-                },
+                prepared["prompt"],
+                generation_config=prepared["generation_config"],
             )
-            
             answer = response.text
             
-            # 🔑 Halluzinations-Warnung bei allgemeinem KI-Wissen (ohne Datenbank)
-            if use_public_sources:
-                if user_language == "de":
-                    answer += "\n\n⚠️ **WARNUNG - KEINE DATENBANKNUTZUNG:** Diese Antwort basiert auf **allgemeinem KI-Chatbot-Wissen** ohne Zugriff auf die verlässliche Datenbank. Die KI nutzt nur ihr Trainingswissen mit **erhöhtem Risiko für Halluzinationen und Fehler**. Prüfen Sie ALLE Paragraphen, Urteile und rechtlichen Angaben eigenständig nach!"
-                elif user_language == "en":
-                    answer += "\n\n⚠️ **WARNING - NO DATABASE ACCESS:** This answer is based on general AI chatbot knowledge without access to the reliable database. Higher risk of hallucinations and errors. Verify all legal details independently!"
-                elif user_language == "es":
-                    answer += "\n\n⚠️ **ADVERTENCIA - SIN ACCESO A BASE DE DATOS:** Esta respuesta se basa en conocimiento general del chatbot de IA sin acceso a la base de datos confiable. Mayor riesgo de alucinaciones y errores. ¡Verifique todos los detalles legales de forma independiente!"
-            
-            
-            # Step 6: Self-Critique Verification Loop (anti-hallucination guard)
-            critique_prompt = f"""You are a fact-checker. Review the following answer against the provided context.
-
-**CONTEXT:**
-{context}
-
-**ANSWER TO VERIFY:**
-{answer}
-
-**TASK:**
-Does the answer contain ANY claims NOT directly supported by the context?
-If YES, output: "HALLUCINATION DETECTED: [specific claim]"
-If NO, output: "VERIFIED"
-"""
-            
-            critique_response = await asyncio.to_thread(
-                self.generation_model.generate_content,
-                critique_prompt,
-                generation_config={"temperature": 0.0},
-            )
-            
-            critique_result = critique_response.text.strip()
-            
-            # If hallucination detected, append warning
-            if "HALLUCINATION DETECTED" in critique_result.upper():
-                answer += f"\n\n⚠️ **SYSTEM WARNING:** {critique_result}"
+            if prepared["grounded"]:
+                if use_public_sources:
+                    answer += self._public_sources_warning(user_language)
+                
+                # Step 6: Verification (anti-hallucination guard, critic deferred in async mode)
+                result, verification_id = await self.verify_for_response(
+                    prepared["context"], answer
+                )
+                verification = result.verdict
+                # If hallucination detected, append warning
+                if result.hallucination_detected:
+                    answer += f"\n\n⚠️ **SYSTEM WARNING:** {result.verdict}"
             
         except Exception as e:
             answer = f"Error generating answer: {str(e)}"
@@ -473,6 +1072,105 @@ If NO, output: "VERIFIED"
         # Step 7: Return response with sources
         return QueryResponse(
             answer=answer,
-            sources=relevant_docs,
-            jurisdiction_warning=jurisdiction_warning,
+            sources=prepared["sources"],
+            jurisdiction_warning=prepared["jurisdiction_warning"],
+            verification=verification,
+            verification_id=verification_id,
         )
+    
+    async def query_stream(
+        self,
+        user_query: str,
+        target_jurisdiction: Jurisdiction,
+        user_role: UserRole,
+        user_language: str = "de",
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        use_public_sources: Optional[bool] = False,
+        uploaded_documents: Optional[List[dict]] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Streaming variant of query() for server-sent events.
+        
+        Yields events (dicts with a "type" key) in this order:
+        - sources:      retrieved documents, right after search
+        - token:        answer text deltas from Gemini's streaming API
+        - verification: verdict + method (local citation check or LLM critic;
+                        grounded answers only), in async mode PENDING +
+                        verification_id unless the local check decides
+        - done:         final QueryResponse (answer incl. appended warnings)
+        - error:        generation failed; stream ends after this event
+        """
+        prepared = await self._prepare_query(
+            user_query=user_query,
+            target_jurisdiction=target_jurisdiction,
+            user_role=user_role,
+            user_language=user_language,
+            sub_jurisdiction=sub_jurisdiction,
+            source_filter=source_filter,
+            gerichtsebene_filter=gerichtsebene_filter,
+            use_public_sources=use_public_sources,
+            uploaded_documents=uploaded_documents,
+        )
+        
+        yield {
+            "type": "sources",
+            "sources": [doc.model_dump(mode="json") for doc in prepared["sources"]],
+            "jurisdiction_warning": prepared["jurisdiction_warning"],
+        }
+        
+        parts: List[str] = []
+        try:
+            response = await self.generation_model.generate_content_async(
+                prepared["prompt"],
+                generation_config=prepared["generation_config"],
+                stream=True,
+            )
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+        except Exception as e:
+            yield {"type": "error", "detail": f"Error generating answer: {str(e)}"}
+            return
+        
+        answer = "".join(parts)
+        
+        verification = None
+        verification_id = None
+        if prepared["grounded"]:
+            # Verification runs while the client is still rendering the last tokens
+            verification_task = asyncio.create_task(
+                self.verify_for_response(prepared["context"], answer)
+            )
+            
+            if use_public_sources:
+                warning = self._public_sources_warning(user_language)
+                if warning:
+                    answer += warning
+                    yield {"type": "token", "text": warning}
+            
+            result, verification_id = await verification_task
+            verification = result.verdict
+            if result.hallucination_detected:
+                answer += f"\n\n⚠️ **SYSTEM WARNING:** {result.verdict}"
+            yield {
+                "type": "verification",
+                "verdict": result.verdict,
+                "method": result.method,
+                "hallucination_detected": result.hallucination_detected,
+                "verification_id": verification_id,
+            }
+        
+        yield {
+            "type": "done",
+            "response": QueryResponse(
+                answer=answer,
+                sources=prepared["sources"],
+                jurisdiction_warning=prepared["jurisdiction_warning"],
+                verification=verification,
+                verification_id=verification_id,
+            ),
+        }
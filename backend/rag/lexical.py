@@ -0,0 +1,414 @@
+"""
+Lexical Retrieval for DOMULEX
+In-process BM25 index over the Qdrant payloads, fused with dense results.
+
+German legal queries hinge on exact tokens ("§ 558 BGB", "VIII ZR 185/14",
+"Schönheitsreparaturen") that embeddings match poorly. This module adds:
+
+1. German-aware tokenization: citations become single tokens
+   ("§558", "§558:bgb", "az:viii zr 185/14"), words are lowercased,
+   umlaut-folded and lightly stemmed
+2. BM25Index: inverted index with the same filter semantics as
+   RAGEngine._build_filter
+3. Exact-citation lookup: documents containing every citation of the query
+4. reciprocal_rank_fusion for combining dense and lexical rankings
+
+LexicalIndex builds the BM25 index from a collection (scroll, off the event
+loop) and rebuilds it periodically so points written by the ingestion
+workers become searchable.
+
+Memory: every API worker process holds its own index - roughly 5 KB per
+short chunk and 15-20 KB per full 512-token chunk (postings, ids, filter
+metadata), i.e. 1.5-2 GB per million points per worker. Size the workers
+(or turn hybrid_retrieval off) accordingly for large collections.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Law abbreviations: BGB, BauGB, WEG, VOB/B, GrEStG, ErbbauRG, EStG, ...
+_LAW = r"[A-ZÄÖÜ][A-Za-zÄÖÜäöü]*[A-Z](?:/[A-Z])?"
+# Paragraph/article number with optional Abs./Satz/Nr. qualifiers before the law
+_NORM = (
+    r"(?P<kind>§§?|Art\.|Artikel)\s*(?P<num>\d+[a-z]?)\b"
+    r"(?:\s*(?:Abs\.|Absatz|S\.|Satz|Nr\.|Hs\.)\s*\d+[a-z]?)*(?:\s*ff?\.)?"
+)
+_CITATION_AFTER_RE = re.compile(_NORM + r"(?:\s+(?P<law>" + _LAW + r")\b)?")
+_CITATION_BEFORE_RE = re.compile(r"\b(?P<law>" + _LAW + r")\s+" + _NORM)
+# Aktenzeichen: VIII ZR 185/14, I-24 U 43/18, 14 Wx 18/19, 411 C 6543/20
+_AKTENZEICHEN_RE = re.compile(
+    r"\b(?P<senat>(?:[IVXL]+-)?(?:[IVXL]+|\d{1,3}))\s+"
+    r"(?P<register>[A-Z][A-Za-z]{0,3})\s+"
+    r"(?P<num>\d{1,5})/(?P<year>\d{2}|\d{4})\b"
+)
+_WORD_RE = re.compile(r"[a-zäöüß0-9]+")
+
+_FOLD = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_SUFFIXES = ("ern", "en", "er", "es", "em", "e", "n", "s")
+
+STOPWORDS = frozenset({
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem", "einen",
+    "und", "oder", "aber", "auch", "als", "am", "an", "auf", "aus", "bei", "bis", "durch",
+    "fuer", "gegen", "im", "in", "ins", "mit", "nach", "ohne", "um", "unter", "ueber", "vom",
+    "von", "vor", "zu", "zum", "zur", "ist", "sind", "war", "wird", "werden", "wurde", "kann",
+    "koennen", "muss", "muessen", "darf", "duerfen", "soll", "hat", "haben", "habe", "ich",
+    "du", "er", "sie", "es", "wir", "ihr", "mein", "meine", "meinen", "meiner", "sein",
+    "seine", "seinen", "sich", "nicht", "kein", "keine", "wie", "was", "wer", "wann", "wo",
+    "welche", "welcher", "welches", "ob", "dass", "wenn", "so", "noch", "nur", "schon",
+    "mehr", "sehr", "dann", "da", "hier", "dies", "diese", "dieser", "dieses", "man", "jeder",
+    "the", "a", "an", "of", "and", "or", "to", "is", "are", "my", "i", "can", "el", "la",
+    "los", "las", "de", "del", "y", "en", "que", "un", "una", "por", "para", "se",
+})
+
+
+def _stem(word: str) -> str:
+    """Light German suffix stripping (Mieter/Miete/Mieten -> miet)."""
+    if len(word) > 5 and not word.isdigit():
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix):
+                return word[:-len(suffix)]
+    return word
+
+
+def _norm_token(kind: str, num: str) -> str:
+    prefix = "art" if kind.startswith("Art") else "§"
+    return f"{prefix}{num.lower()}"
+
+
+def find_citations(text: str) -> List[Tuple[int, int, str]]:
+    """
+    Citation tokens with their spans (start, end, token), ordered by position:
+    '§558', '§558:bgb', 'art14:gg', 'az:viii zr 185/14'.
+    """
+    found: List[Tuple[int, int, str]] = []
+    for regex in (_CITATION_AFTER_RE, _CITATION_BEFORE_RE):
+        for match in regex.finditer(text):
+            norm = _norm_token(match.group("kind"), match.group("num"))
+            found.append((match.start(), match.end(), norm))
+            if match.group("law"):
+                found.append((match.start(), match.end(), f"{norm}:{match.group('law').lower()}"))
+    for match in _AKTENZEICHEN_RE.finditer(text):
+        year = match.group("year")[-2:]
+        senat, register, num = match.group("senat", "register", "num")
+        found.append((match.start(), match.end(), f"az:{senat} {register} {num}/{year}".lower()))
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def extract_citations(text: str) -> List[str]:
+    """Citation tokens of a text in order of appearance (without duplicates)."""
+    return list(dict.fromkeys(token for _, _, token in find_citations(text)))
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25 tokens: citation tokens followed by stemmed, stopword-free words."""
+    words = [
+        _stem(word)
+        for word in _WORD_RE.findall(text.lower().translate(_FOLD))
+        if word not in STOPWORDS
+    ]
+    return extract_citations(text) + words
+
+
+def matches_filter(
+    meta: Tuple,
+    jurisdiction: str,
+    sub_jurisdiction: Optional[str] = None,
+    source_filter: Optional[List[str]] = None,
+    gerichtsebene_filter: Optional[List[str]] = None,
+) -> bool:
+    """Same semantics as RAGEngine._build_filter on (jurisdiction, sub, doc_type, gerichtsebene)."""
+    doc_jurisdiction, doc_sub, doc_type, gerichtsebene = meta
+    if doc_jurisdiction != jurisdiction:
+        return False
+    if sub_jurisdiction and doc_sub != sub_jurisdiction:
+        return False
+    if source_filter and doc_type not in source_filter:
+        return False
+    if gerichtsebene_filter and source_filter and "URTEIL" in source_filter:
+        if gerichtsebene not in gerichtsebene_filter:
+            return False
+    return True
+
+
+def payload_text(payload: Dict) -> str:
+    """Indexed text of a point: descriptive fields + content."""
+    fields = ("title", "source", "law", "section", "aktenzeichen", "citation", "content")
+    return "\n".join(str(payload[field]) for field in fields if payload.get(field))
+
+
+def payload_meta(payload: Dict) -> Tuple:
+    return (
+        payload.get("jurisdiction", "DE"),
+        payload.get("sub_jurisdiction"),
+        payload.get("doc_type"),
+        payload.get("gerichtsebene"),
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[str]],
+    k: int = 60,
+) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+@dataclass
+class LexicalResult:
+    """Exact citation matches and BM25 ranking for one query (point IDs)."""
+
+    exact: List[str]
+    ranked: List[Tuple[str, float]]
+
+
+class BM25Index:
+    """
+    Thread-safe in-memory BM25 (Okapi) index keyed by Qdrant point ID.
+
+    Re-adding a point ID replaces the previous version (tombstoned slot);
+    compact() drops the tombstones.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._ids: List[str] = []
+        self._meta: List[Tuple] = []
+        self._lengths: List[int] = []
+        self._slots: Dict[str, int] = {}
+        self._deleted: set = set()
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, point_id: str, payload: Dict):
+        counts = Counter(tokenize(payload_text(payload)))
+        length = sum(counts.values())
+        with self._lock:
+            old = self._slots.get(point_id)
+            if old is not None:
+                self._deleted.add(old)
+                self._total_length -= self._lengths[old]
+            slot = len(self._ids)
+            self._ids.append(point_id)
+            self._meta.append(payload_meta(payload))
+            self._lengths.append(length)
+            self._slots[point_id] = slot
+            self._total_length += length
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((slot, tf))
+
+    @property
+    def deleted(self) -> int:
+        """Tombstoned slots (replaced point versions)."""
+        return len(self._deleted)
+
+    def compact(self):
+        """
+        Drop tombstoned slots and renumber the postings (also corrects the
+        document frequencies).
+        """
+        with self._lock:
+            if not self._deleted:
+                return
+            remap: Dict[int, int] = {}
+            ids: List[str] = []
+            meta: List[Tuple] = []
+            lengths: List[int] = []
+            for slot, point_id in enumerate(self._ids):
+                if slot in self._deleted:
+                    continue
+                remap[slot] = len(ids)
+                ids.append(point_id)
+                meta.append(self._meta[slot])
+                lengths.append(self._lengths[slot])
+            postings: Dict[str, List[Tuple[int, int]]] = {}
+            for term, entries in self._postings.items():
+                kept = [(remap[slot], tf) for slot, tf in entries if slot in remap]
+                if kept:
+                    postings[term] = kept
+            self._ids, self._meta, self._lengths, self._postings = ids, meta, lengths, postings
+            self._slots = {point_id: slot for slot, point_id in enumerate(ids)}
+            self._deleted = set()
+
+    def search(
+        self,
+        query: str,
+        jurisdiction: str,
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        limit: int = 50,
+    ) -> LexicalResult:
+        """BM25 top `limit` within the filter, plus exact citation matches."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        citations = extract_citations(query)
+
+        with self._lock:
+            live = len(self._slots)
+            if not live or not terms:
+                return LexicalResult([], [])
+            avg_length = self._total_length / live
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+                for slot, tf in postings:
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[slot] / avg_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            def allowed(slot: int) -> bool:
+                return slot not in self._deleted and matches_filter(
+                    self._meta[slot],
+                    jurisdiction,
+                    sub_jurisdiction,
+                    source_filter,
+                    gerichtsebene_filter,
+                )
+
+            ranked = heapq.nlargest(
+                limit,
+                ((score, slot) for slot, score in scores.items() if allowed(slot)),
+            )
+
+            exact: List[str] = []
+            if citations:
+                # Most specific citation (with law / Aktenzeichen) must match; ordered by BM25
+                specific = [c for c in citations if ":" in c] or citations
+                candidates = None
+                for citation in specific:
+                    slots = {slot for slot, _ in self._postings.get(citation, ())}
+                    candidates = slots if candidates is None else candidates & slots
+                exact = [
+                    self._ids[slot]
+                    for slot in sorted(candidates or (), key=lambda s: -scores.get(s, 0.0))
+                    if allowed(slot)
+                ][:limit]
+
+            return LexicalResult(exact, [(self._ids[slot], score) for score, slot in ranked])
+
+
+class LexicalIndex:
+    """
+    BM25 index of one Qdrant collection.
+
+    Built in the background on first use (scroll + tokenize in a worker
+    thread); until it is ready, retrieval stays dense-only. Rebuilt every
+    `refresh_seconds` to pick up points written by other processes. Points
+    this process upserts while a build scrolls are replayed into the new
+    index, which is compacted before it is swapped in.
+    """
+
+    SCROLL_PAGE = 1000
+
+    def __init__(self, qdrant, collection_name: str, refresh_seconds: int = 3600):
+        self.qdrant = qdrant
+        self.collection_name = collection_name
+        self.refresh_seconds = refresh_seconds
+        self.index: Optional[BM25Index] = None
+        self._built_at = 0.0
+        self._build_task: Optional[asyncio.Task] = None
+        self._written: Optional[list] = None  # points upserted during a build
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def ensure_fresh(self):
+        """Start a (re)build in the background if the index is missing or stale."""
+        if self._build_task is not None and not self._build_task.done():
+            return
+        if self.index is None or time.monotonic() - self._built_at > self.refresh_seconds:
+            self._build_task = asyncio.create_task(self.build())
+
+    async def build(self):
+        """Scroll the whole collection into a new index and swap it in."""
+        started = time.monotonic()
+        index = BM25Index()
+        self._written = []
+        try:
+            offset = None
+            while True:
+                records, offset = await self.qdrant.scroll(
+                    collection_name=self.collection_name,
+                    limit=self.SCROLL_PAGE,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+                await asyncio.to_thread(self._add_records, index, records)
+                if offset is None:
+                    break
+            # Pages scrolled before an upsert miss it or hold the old version
+            written, self._written = self._written, []
+            await asyncio.to_thread(self._add_records, index, written)
+            await asyncio.to_thread(index.compact)
+        except Exception as e:
+            logger.warning(f"Lexical index build failed, staying dense-only: {e}")
+            self._built_at = time.monotonic()  # retry after refresh_seconds
+            return
+        finally:
+            # Upserts during the replay above, without yielding to the event loop
+            late, self._written = self._written or [], None
+        self._add_records(index, late)
+        self.index = index
+        self._built_at = time.monotonic()
+        logger.info(f"✅ Lexical index: {len(index)} points in {self._built_at - started:.1f}s")
+
+    @staticmethod
+    def _add_records(index: BM25Index, records):
+        for record in records:
+            index.add(str(record.id), record.payload or {})
+
+    def add_points(self, points):
+        """Index freshly upserted PointStructs (into the current index and a running build)."""
+        if self._written is not None:
+            self._written.extend(points)
+        if self.index is not None:
+            for point in points:
+                self.index.add(str(point.id), point.payload or {})
+
+    async def search(
+        self,
+        query: str,
+        jurisdiction: str,
+        sub_jurisdiction: Optional[str] = None,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+        limit: int = 50,
+    ) -> Optional[LexicalResult]:
+        """BM25 search off the event loop (None while the index is not ready)."""
+        self.ensure_fresh()
+        index = self.index
+        if index is None:
+            return None
+        return await asyncio.to_thread(
+            index.search,
+            query,
+            jurisdiction,
+            sub_jurisdiction,
+            source_filter,
+            gerichtsebene_filter,
+            limit,
+        )
@@ -0,0 +1,192 @@
+"""
+Collection Rebuild for DOMULEX
+Copies a collection into a new one with the current vector storage settings
+(quantization, on-disk vectors, HNSW) and switches serving over with a
+Qdrant alias.
+
+Serving name = alias whose name differs from every collection (e.g.
+legal_documents_live -> legal_documents_live_20260301T120000):
+1. create <alias>_<timestamp> with rag.schema.create_collection
+2. copy points in scroll batches (vectors + payloads) from the collection
+   behind the alias - for the first cutover from the legacy collection
+   given as source (e.g. legal_documents)
+3. verify the point count
+4. create or swap the alias in one update_collection_aliases call (atomic)
+
+No collection is deleted before the alias points at the copy, so even the
+first cutover has no window without a serving collection. The legacy
+collection stays untouched: instances still configured with only
+QDRANT_COLLECTION keep serving it until QDRANT_COLLECTION_ALIAS is set.
+Previous alias targets are kept for rollback unless drop_old is set.
+
+Ingestion must be paused for the whole rebuild: points upserted into the
+source after the scroll has passed them are not copied and are gone from
+the alias after the swap (the count check only catches missing points, not
+stale payloads). Stop the Celery ingestion workers and don't call
+POST /ingest/run until the alias is switched.
+
+Usage:
+    python -m rag.rebuild legal_documents_live --source legal_documents  # first cutover
+    python -m rag.rebuild legal_documents_live [--batch-size 256] [--drop-old]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PointStruct,
+)
+
+from rag.schema import create_collection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RebuildStats:
+    alias: str
+    source: str
+    target: str
+    points: int = 0
+    seconds: float = 0.0
+    dropped_old: bool = False
+
+
+async def resolve_alias(qdrant, name: str) -> Optional[str]:
+    """Collection the alias `name` points to (None if `name` is no alias)."""
+    response = await qdrant.get_aliases()
+    for alias in response.aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return None
+
+
+async def rebuild_collection(
+    qdrant,
+    alias: str,
+    batch_size: int = 256,
+    drop_old: bool = False,
+    target: Optional[str] = None,
+    source: Optional[str] = None,
+) -> RebuildStats:
+    """
+    Rebuild the collection served as `alias` and point the alias at the copy.
+
+    Args:
+        alias: Serving alias - must not be the name of a collection
+        source: Collection to copy while `alias` does not exist yet (first cutover)
+
+    Writes to the source during the copy are lost - pause ingestion first
+    (see module docstring).
+    """
+    started = time.monotonic()
+    current = await resolve_alias(qdrant, alias)
+    if current is None:
+        if await qdrant.collection_exists(alias):
+            raise ValueError(
+                f"{alias} is a collection - serve through an alias with another name, "
+                f"e.g. rebuild {alias}_live --source {alias}"
+            )
+        if source is None:
+            raise ValueError(
+                f"Alias {alias} does not exist yet - pass the collection to copy as source"
+            )
+    source = current or source
+    target = target or f"{alias}_{time.strftime('%Y%m%dT%H%M%S')}"
+    stats = RebuildStats(alias=alias, source=source, target=target)
+
+    info = await qdrant.get_collection(source)
+    await create_collection(qdrant, target, info.config.params.vectors.size)
+    logger.info(f"Rebuilding {source} -> {target}")
+
+    offset = None
+    while True:
+        records, offset = await qdrant.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            await qdrant.upsert(
+                collection_name=target,
+                points=[PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+                wait=True,
+            )
+            stats.points += len(records)
+            logger.info(f"{target}: {stats.points} points copied")
+        if offset is None:
+            break
+
+    source_count = (await qdrant.count(source, exact=True)).count
+    target_count = (await qdrant.count(target, exact=True)).count
+    if target_count < source_count:
+        raise RuntimeError(
+            f"Rebuild of {source} incomplete: {target_count}/{source_count} points in {target}, "
+            f"alias not switched"
+        )
+
+    operations = []
+    if current is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    operations.append(
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias))
+    )
+    await qdrant.update_collection_aliases(change_aliases_operations=operations)
+
+    # Only a previous alias target - the legacy collection may still be served directly
+    if drop_old and current is not None:
+        await qdrant.delete_collection(current)
+        stats.dropped_old = True
+
+    stats.seconds = round(time.monotonic() - started, 1)
+    logger.info(f"✅ {alias} -> {target} ({stats.points} points in {stats.seconds}s)")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="DOMULEX collection rebuild with alias cutover (pause ingestion while it runs)"
+    )
+    parser.add_argument(
+        "alias", help="Serving alias, e.g. legal_documents_live (QDRANT_COLLECTION_ALIAS)"
+    )
+    parser.add_argument(
+        "--source", help="Collection to copy for the first cutover, e.g. legal_documents"
+    )
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--drop-old", action="store_true", help="Delete the previous alias target after the swap"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from qdrant_pool import create_async_qdrant_client
+
+    async def run():
+        qdrant = create_async_qdrant_client()
+        try:
+            stats = await rebuild_collection(
+                qdrant, args.alias, args.batch_size, args.drop_old, source=args.source
+            )
+            print(asdict(stats))
+        finally:
+            await qdrant.close()
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Reranking for DOMULEX
+Second stage after hybrid retrieval: score (query, passage) pairs jointly,
+blend in a recency prior and keep the best hits that fit the context budget.
+
+- CrossEncoderReranker: sentence-transformers cross-encoder on CPU, all
+  pairs of a query scored in batched forward passes
+- LexicalReranker: BM25 over the candidate set, no model download
+  (tests and offline benchmarks)
+
+Backends are selected with settings.reranker_backend (default
+"cross-encoder"; "none" disables the stage and the engine keeps the
+retrieval order). "cross-encoder" needs sentence-transformers
+(requirements.txt): without it get_reranker raises, and the model is loaded
+at startup (Reranker.load in the app lifespan), so a misconfigured
+deployment fails to start instead of silently serving unreranked results.
+"""
+
+import importlib.util
+import logging
+import threading
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import get_settings
+from models.legal import ScoredDocument
+from rag.context import estimate_tokens
+from rag.lexical import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Characters of a passage the reranker sees (cross-encoders truncate at ~512 tokens anyway)
+PASSAGE_CHARS = 2000
+
+
+class Reranker:
+    """
+    Interface of a reranking backend.
+
+    score is blocking - callers run it in a worker thread. Scores are in
+    [0, 1] so they can be blended with the recency prior.
+    """
+
+    name: str = ""
+
+    def load(self):
+        """Load models ahead of the first query (blocking; no-op without a model)."""
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    sentence-transformers CrossEncoder running in-process.
+
+    Requires the optional `sentence-transformers` package (checked on
+    construction). The model is loaded by load(), at the latest on first
+    use; logits are mapped to [0, 1] with a sigmoid.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+        device: str = "cpu",
+        batch_size: int = 32,
+        max_length: int = 512,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.name = f"cross-encoder:{model_name}"
+        self._model = None
+        self._lock = threading.Lock()
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise RuntimeError(
+                "RERANKER_BACKEND=cross-encoder requires the sentence-transformers package "
+                "(pip install sentence-transformers) - or set RERANKER_BACKEND=lexical"
+            )
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                    except ImportError as e:
+                        raise RuntimeError(
+                            "RERANKER_BACKEND=cross-encoder requires the "
+                            "sentence-transformers package"
+                        ) from e
+                    logger.info(f"📦 Loading cross-encoder {self.model_name} ({self.device})")
+                    self._model = CrossEncoder(
+                        self.model_name, device=self.device, max_length=self.max_length
+                    )
+        return self._model
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        logits = self.load().predict(
+            [(query, passage) for passage in passages],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        logits = np.asarray(logits, dtype=np.float32).reshape(len(passages), -1)[:, -1]
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class LexicalReranker(Reranker):
+    """BM25 of the query terms within the candidate set, scaled to [0, 1]."""
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not passages:
+            return np.zeros(len(passages), dtype=np.float32)
+        counts = [Counter(tokenize(passage)) for passage in passages]
+        tf = np.array([[c.get(term, 0) for term in terms] for c in counts], dtype=np.float32)
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1.0 + (len(passages) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        scores = (tf * (self.k1 + 1) / (tf + norm[:, None]) * idf).sum(axis=1)
+        top = scores.max()
+        return scores / top if top > 0 else scores
+
+
+def recency_prior(
+    published: Sequence[date],
+    half_life_days: float,
+    today: Optional[date] = None,
+) -> np.ndarray:
+    """0.5 ** (age / half-life): 1.0 for today, 0.5 after one half-life."""
+    today = today or date.today()
+    ages = np.array([max((today - day).days, 0) for day in published], dtype=np.float32)
+    return np.power(0.5, ages / max(half_life_days, 1.0))
+
+
+def select_within_budget(
+    hits: List[ScoredDocument],
+    limit: int,
+    token_budget: Optional[int] = None,
+    chars_per_doc: int = 1500,
+) -> List[ScoredDocument]:
+    """
+    Best `limit` hits whose context excerpts fit into `token_budget`
+    (rag.context.estimate_tokens). Hits that do not fit are skipped, so a
+    shorter lower-ranked document can still take the remaining budget.
+    The best hit is always kept.
+    """
+    selected: List[ScoredDocument] = []
+    used = 0
+    for hit in hits:
+        if len(selected) >= limit:
+            break
+        cost = estimate_tokens(hit.document.title + hit.document.content_original[:chars_per_doc])
+        if token_budget is not None and selected and used + cost > token_budget:
+            continue
+        selected.append(hit)
+        used += cost
+    return selected
+
+
+# Process-wide rerankers by backend name (models are expensive to load)
+_rerankers: Dict[str, Reranker] = {}
+
+
+def get_reranker(backend: Optional[str] = None) -> Optional[Reranker]:
+    """
+    Get the reranker for a backend ('cross-encoder', 'lexical', 'none').
+    Defaults to settings.reranker_backend; None disables reranking.
+    """
+    settings = get_settings()
+    backend = (backend or settings.reranker_backend).lower()
+    if backend in ("", "none"):
+        return None
+
+    if backend not in _rerankers:
+        if backend == "cross-encoder":
+            reranker: Reranker = CrossEncoderReranker(
+                model_name=settings.reranker_model,
+                device=settings.reranker_device,
+                batch_size=settings.reranker_batch_size,
+            )
+        elif backend == "lexical":
+            reranker = LexicalReranker()
+        else:
+            raise ValueError(f"Unknown reranker backend: {backend}")
+        logger.info(f"✅ Reranker: {reranker.name}")
+        _rerankers[backend] = reranker
+
+    return _rerankers[backend]
@@ -0,0 +1,304 @@
+"""
+Answer Cache for DOMULEX /query
+Exact + near-duplicate (semantic) lookup of full QueryResponse objects.
+
+Keys are scoped by everything that changes the answer besides the wording of
+the question (jurisdiction, role, language, filters, uploaded documents) and by
+a fingerprint of the Qdrant collection, so re-indexing invalidates all entries.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from cache import get_redis_client
+from config import get_settings
+from models.legal import QueryRequest, QueryResponse
+from rag.embeddings import normalize_text
+from rag.lexical import extract_citations
+from rag.verification import PENDING
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def request_scope(request: QueryRequest) -> str:
+    """Canonical description of every QueryRequest field except the question."""
+    # Stored uploads are referenced by their content hash
+    uploaded = sorted(
+        _hash(doc.text) if doc.text is not None else doc.document_id
+        for doc in (request.uploaded_documents or [])
+    )
+    scope = {
+        "jurisdiction": request.target_jurisdiction.value,
+        "sub_jurisdiction": request.sub_jurisdiction or None,
+        "role": request.user_role.value,
+        "language": request.user_language,
+        "source_filter": sorted(request.source_filter or []),
+        "gerichtsebene_filter": sorted(request.gerichtsebene_filter or []),
+        "public_sources": bool(request.use_public_sources),
+        "uploaded": uploaded,
+    }
+    return _hash(json.dumps(scope, sort_keys=True))
+
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def query_signature(query: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Cited norms / Aktenzeichen and numbers of a question. Questions that
+    differ in these (§ 558 vs § 559 BGB, 3 vs 6 Monate) embed almost
+    identically but need different answers.
+    """
+    return (
+        tuple(sorted(set(extract_citations(query)))),
+        tuple(sorted(set(_NUMBER_RE.findall(query)))),
+    )
+
+
+def request_key(request: QueryRequest) -> Tuple[str, str]:
+    """Return (scope, exact key) for a request."""
+    scope = request_scope(request)
+    return scope, _hash(f"{scope}:{normalize_text(request.query).lower()}")
+
+
+class QueryResponseCache:
+    """
+    Response cache in front of RAGEngine.query.
+
+    - Exact hits: canonical key from QueryRequest fields
+    - Near-duplicate hits: cosine similarity of the query embedding against
+      recently cached queries in the same scope that cite the same norms and
+      contain the same numbers (query_signature)
+    - Storage: Redis when available, otherwise an in-process dict
+    - Invalidation: TTL + collection fingerprint (points_count plus a shared
+      generation counter bumped by invalidate()) in every key
+    """
+
+    def __init__(
+        self,
+        rag_engine,
+        ttl: Optional[int] = None,
+        similarity_threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        fingerprint_interval: int = 60,
+    ):
+        settings = get_settings()
+        self.rag = rag_engine
+        self.ttl = ttl if ttl is not None else settings.cache_ttl
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None
+            else settings.answer_cache_similarity
+        )
+        self.max_entries = (
+            max_entries if max_entries is not None else settings.answer_cache_max_entries
+        )
+        self.fingerprint_interval = fingerprint_interval
+
+        # Local fallback store: key -> (expires_at, response_json)
+        # (read and written from worker threads, guarded by _local_lock)
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._local_lock = threading.Lock()
+        # Semantic index:
+        # scope -> OrderedDict[exact_key -> (expires_at, unit vector, query signature)]
+        self._vectors: Dict[str, "OrderedDict[str, Tuple[float, np.ndarray, Tuple]]"] = {}
+
+        self._generation = 0
+        self._fingerprint = "0.0"
+        self._fingerprint_checked = 0.0
+
+    # ------------------------------------------------------------------
+    # Collection fingerprint
+    # ------------------------------------------------------------------
+
+    GENERATION_KEY = "domulex:answer:generation"
+
+    async def _read_fingerprint(self) -> str:
+        points = "no-qdrant"
+        if self.rag.qdrant_available:
+            try:
+                info = await self.rag.qdrant.get_collection(self.rag.collection_name)
+                points = str(info.points_count)
+            except Exception as e:
+                logger.debug(f"Answer cache fingerprint unavailable: {e}")
+                points = self._fingerprint.split(".")[0]
+        generation = self._generation
+        client = get_redis_client()
+        if client is not None:
+            try:
+                generation = int(await asyncio.to_thread(client.get, self.GENERATION_KEY) or 0)
+            except Exception:
+                pass
+        return f"{points}.{generation}"
+
+    async def fingerprint(self) -> str:
+        """Collection fingerprint, refreshed at most every fingerprint_interval seconds."""
+        now = time.monotonic()
+        if now - self._fingerprint_checked >= self.fingerprint_interval:
+            self._fingerprint_checked = now
+            current = await self._read_fingerprint()
+            if current != self._fingerprint:
+                self._fingerprint = current
+                self._drop_local()
+        return self._fingerprint
+
+    async def invalidate(self):
+        """Drop all cached answers on every worker (e.g. after ingestion)."""
+        self._generation += 1
+        client = get_redis_client()
+        if client is not None:
+            try:
+                self._generation = await asyncio.to_thread(client.incr, self.GENERATION_KEY)
+            except Exception as e:
+                logger.warning(f"Answer cache invalidation failed: {e}")
+        self._fingerprint_checked = 0.0
+        self._drop_local()
+
+    def _drop_local(self):
+        with self._local_lock:
+            self._local.clear()
+        self._vectors.clear()
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _storage_key(self, fingerprint: str, key: str) -> str:
+        return f"domulex:answer:{fingerprint}:{key}"
+
+    def _get(self, storage_key: str) -> Optional[str]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                return client.get(storage_key)
+            except Exception as e:
+                logger.warning(f"Answer cache read failed: {e}")
+        with self._local_lock:
+            entry = self._local.get(storage_key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                self._local.pop(storage_key, None)
+                return None
+            self._local.move_to_end(storage_key)
+            return payload
+
+    def _set(self, storage_key: str, payload: str):
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.setex(storage_key, self.ttl, payload)
+                return
+            except Exception as e:
+                logger.warning(f"Answer cache write failed: {e}")
+        with self._local_lock:
+            self._local[storage_key] = (time.monotonic() + self.ttl, payload)
+            self._local.move_to_end(storage_key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Semantic index
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+
+    def _nearest(self, scope: str, vector: np.ndarray, signature: Tuple) -> Optional[str]:
+        entries = self._vectors.get(scope)
+        if not entries:
+            return None
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _, _) in entries.items() if expires_at < now]:
+            del entries[key]
+        # Only questions about the same norms and numbers can share an answer
+        candidates = [(k, vec) for k, (_, vec, sig) in entries.items() if sig == signature]
+        if not candidates:
+            return None
+        keys = [k for k, _ in candidates]
+        matrix = np.stack([vec for _, vec in candidates])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return keys[best]
+        return None
+
+    def _remember(self, scope: str, key: str, vector: np.ndarray, signature: Tuple):
+        entries = self._vectors.setdefault(scope, OrderedDict())
+        entries[key] = (time.monotonic() + self.ttl, vector, signature)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    async def _query_vector(self, request: QueryRequest) -> Optional[np.ndarray]:
+        try:
+            return self._unit(await self.rag.embed_text(request.query))
+        except Exception as e:
+            logger.debug(f"Answer cache embedding failed: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, request: QueryRequest) -> Optional[QueryResponse]:
+        """Return a cached answer for request (exact or near-duplicate), if any."""
+        fingerprint = await self.fingerprint()
+        scope, key = request_key(request)
+
+        payload = await asyncio.to_thread(self._get, self._storage_key(fingerprint, key))
+        if payload is None and self.similarity_threshold < 1.0:
+            vector = await self._query_vector(request)
+            if vector is not None:
+                similar_key = self._nearest(scope, vector, query_signature(request.query))
+                if similar_key is not None:
+                    payload = await asyncio.to_thread(
+                        self._get, self._storage_key(fingerprint, similar_key)
+                    )
+                    if payload is not None:
+                        logger.debug("📦 Answer cache HIT (semantic)")
+        elif payload is not None:
+            logger.debug("📦 Answer cache HIT (exact)")
+
+        if payload is None:
+            return None
+        try:
+            return QueryResponse.model_validate_json(payload)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached answer: {e}")
+            return None
+
+    async def set(self, request: QueryRequest, response: QueryResponse):
+        """
+        Store an answer for request. Error answers are never cached; answers
+        still being verified are cached without the caller's verification_id.
+        """
+        if response.answer.startswith("Error generating answer"):
+            return
+        if response.verification == PENDING:
+            response = response.model_copy(update={"verification": None, "verification_id": None})
+        fingerprint = await self.fingerprint()
+        scope, key = request_key(request)
+        await asyncio.to_thread(
+            self._set, self._storage_key(fingerprint, key), response.model_dump_json()
+        )
+        if self.similarity_threshold < 1.0:
+            vector = await self._query_vector(request)
+            if vector is not None:
+                self._remember(scope, key, vector, query_signature(request.query))
@@ -0,0 +1,357 @@
+"""
+Collection Schema for DOMULEX
+Vector storage, payload indexes, canonical payload fields and the
+legacy-payload migration.
+
+Vector storage (settings.qdrant_*): float32 originals on disk, scalar (int8)
+or binary quantized copies in RAM for the HNSW search, candidates rescored
+with the originals. Only applies to new collections - existing ones are
+rebuilt with `python -m rag.rebuild`.
+
+The seed scripts wrote several payload dialects over time:
+- content vs content_original
+- law / type vs document_type (display type) and doc_type (filter category)
+- last_updated / datum / date vs publication_date
+- topics vs keywords, source / doc_id vs title
+
+Canonical payloads (schema_version = PAYLOAD_SCHEMA_VERSION) carry one field
+per concept, so the filters in RAGEngine._build_filter hit indexed fields and
+to_legal_document reads them without fallbacks.
+
+Migration (scrolls in batches, no vectors transferred):
+    python -m rag.schema --collection legal_documents --collection law_texts [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    OverwritePayloadOperation,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SetPayload,
+    VectorParams,
+)
+
+from config import get_settings
+from models.legal import LegalDocument
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_SCHEMA_VERSION = 1
+
+# Fields used in search filters (RAGEngine._build_filter, citation/lexical lookups)
+PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    "jurisdiction": PayloadSchemaType.KEYWORD,
+    "sub_jurisdiction": PayloadSchemaType.KEYWORD,
+    "doc_type": PayloadSchemaType.KEYWORD,
+    "gerichtsebene": PayloadSchemaType.KEYWORD,
+    "language": PayloadSchemaType.KEYWORD,
+    "publication_date": PayloadSchemaType.DATETIME,
+}
+
+# Filter categories of the lawyer source selection
+DOC_TYPES = frozenset({"GESETZ", "URTEIL", "LITERATUR", "VERWALTUNG", "FAQ"})
+
+# Legacy fields replaced by a canonical one (dropped by the migration)
+LEGACY_FIELDS = ("content_original", "last_updated", "datum", "date", "topics", "type")
+
+# Per-collection defaults for fields the seed scripts never wrote
+COLLECTION_DEFAULTS: Dict[str, Dict] = {
+    "legal_documents": {"jurisdiction": "DE"},
+    "law_texts": {"jurisdiction": "DE", "doc_type": "GESETZ"},
+}
+
+DEFAULT_PUBLICATION_DATE = date(2025, 1, 1)
+
+# Collections whose indexes were provisioned by this process
+_provisioned: Set[Tuple[int, str]] = set()
+
+
+def vector_params(size: int, settings=None) -> VectorParams:
+    """Cosine vectors, originals on disk if configured."""
+    settings = settings or get_settings()
+    return VectorParams(
+        size=size, distance=Distance.COSINE, on_disk=settings.qdrant_vectors_on_disk
+    )
+
+
+def quantization_config(settings=None):
+    """Quantized in-RAM copy of the vectors (None: float32 only)."""
+    settings = settings or get_settings()
+    mode = settings.qdrant_quantization.lower()
+    if mode == "scalar":
+        # int8: 4x smaller, recall loss recovered by rescoring
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        # 1 bit per dimension: 32x smaller, needs higher oversampling
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    if mode in ("", "none"):
+        return None
+    raise ValueError(f"Unknown qdrant_quantization: {settings.qdrant_quantization}")
+
+
+def hnsw_config(settings=None) -> HnswConfigDiff:
+    settings = settings or get_settings()
+    return HnswConfigDiff(m=settings.qdrant_hnsw_m, ef_construct=settings.qdrant_hnsw_ef_construct)
+
+
+def search_params(settings=None) -> SearchParams:
+    """Search-time HNSW beam width and quantization rescoring."""
+    settings = settings or get_settings()
+    quantization = None
+    if settings.qdrant_quantization.lower() not in ("", "none"):
+        quantization = QuantizationSearchParams(
+            rescore=settings.qdrant_rescore,
+            oversampling=settings.qdrant_oversampling,
+        )
+    return SearchParams(hnsw_ef=settings.qdrant_hnsw_ef, quantization=quantization)
+
+
+async def create_collection(qdrant, collection_name: str, vector_size: int, settings=None):
+    """Create a collection with the configured vector storage and payload indexes."""
+    settings = settings or get_settings()
+    await qdrant.create_collection(
+        collection_name=collection_name,
+        vectors_config=vector_params(vector_size, settings),
+        hnsw_config=hnsw_config(settings),
+        quantization_config=quantization_config(settings),
+    )
+    await ensure_payload_indexes(qdrant, collection_name)
+
+
+async def ensure_payload_indexes(qdrant, collection_name: str) -> List[str]:
+    """
+    Create the declared payload indexes that are missing (idempotent).
+
+    Returns the names of the newly created indexes.
+    """
+    key = (id(qdrant), collection_name)
+    if key in _provisioned:
+        return []
+    info = await qdrant.get_collection(collection_name)
+    existing = info.payload_schema or {}
+    created = []
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        await qdrant.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True,
+        )
+        created.append(field_name)
+    _provisioned.add(key)
+    if created:
+        logger.info(f"✅ Payload indexes on {collection_name}: {', '.join(created)}")
+    return created
+
+
+def _iso_date(value) -> Optional[str]:
+    """'2023-05-15', '2023-05-15T10:00:00' or date/datetime -> '2023-05-15' (None if unparsable)."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and value:
+        try:
+            return date.fromisoformat(value[:10]).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def normalize_payload(payload: Dict, defaults: Optional[Dict] = None) -> Dict:
+    """
+    Canonical version of a payload (returned as is if already canonical).
+    Unknown fields are kept.
+    """
+    if payload.get("schema_version") == PAYLOAD_SCHEMA_VERSION:
+        return payload
+    defaults = defaults or {}
+    normalized = {key: value for key, value in payload.items() if key not in LEGACY_FIELDS}
+
+    normalized["jurisdiction"] = payload.get("jurisdiction") or defaults.get("jurisdiction", "DE")
+    normalized["title"] = (
+        payload.get("title") or payload.get("source") or payload.get("doc_id") or "Unbekannt"
+    )
+    normalized["content"] = payload.get("content") or payload.get("content_original") or ""
+    normalized["language"] = payload.get("language") or "de"
+    normalized["source_url"] = payload.get("source_url") or ""
+    normalized["keywords"] = payload.get("keywords") or payload.get("topics") or []
+
+    published = None
+    for field in ("publication_date", "last_updated", "datum", "date"):
+        published = _iso_date(payload.get(field))
+        if published:
+            break
+    if published:
+        normalized["publication_date"] = published
+    else:
+        normalized.pop("publication_date", None)
+
+    document_type = (
+        payload.get("document_type") or payload.get("law") or payload.get("type")
+        or payload.get("doc_type") or "Gesetz"
+    )
+    normalized["document_type"] = document_type
+    doc_type = payload.get("doc_type")
+    if not doc_type and str(document_type).upper() in DOC_TYPES:
+        doc_type = str(document_type).upper()
+    doc_type = doc_type or defaults.get("doc_type")
+    if doc_type:
+        normalized["doc_type"] = doc_type
+
+    normalized["schema_version"] = PAYLOAD_SCHEMA_VERSION
+    return normalized
+
+
+def document_payload(doc: LegalDocument) -> Dict:
+    """Canonical payload of a LegalDocument (RAGEngine.index_documents)."""
+    return normalize_payload({
+        "jurisdiction": doc.jurisdiction.value,
+        "sub_jurisdiction": doc.sub_jurisdiction,
+        "title": doc.title,
+        "content": doc.content_original,
+        "source_url": str(doc.source_url or ""),
+        "publication_date": doc.publication_date.isoformat(),
+        "document_type": doc.document_type,
+        "language": doc.language,
+        "keywords": doc.keywords,
+    })
+
+
+def to_legal_document(point_id, payload: Dict) -> LegalDocument:
+    """
+    LegalDocument from a Qdrant payload.
+
+    Canonical payloads are read field by field without fallbacks;
+    legacy payloads are normalized first.
+    """
+    if payload.get("schema_version") != PAYLOAD_SCHEMA_VERSION:
+        payload = normalize_payload(payload)
+    published = payload.get("publication_date")
+    return LegalDocument(
+        id=UUID(int=point_id) if isinstance(point_id, int) else point_id,
+        jurisdiction=payload["jurisdiction"],
+        sub_jurisdiction=payload.get("sub_jurisdiction"),
+        title=payload["title"],
+        content_original=payload["content"],
+        source_url=payload["source_url"],
+        publication_date=published or DEFAULT_PUBLICATION_DATE,
+        document_type=payload["document_type"],
+        language=payload["language"],
+        keywords=payload["keywords"],
+        embedding_vector=None,  # Don't return vectors in response
+        document_hash=payload.get("document_hash"),
+        chunk_index=payload.get("chunk_index"),
+    )
+
+
+@dataclass
+class MigrationStats:
+    collection: str
+    scanned: int = 0
+    migrated: int = 0
+    indexes_created: int = 0
+
+
+async def migrate_collection(
+    qdrant,
+    collection_name: str,
+    batch_size: int = 500,
+    dry_run: bool = False,
+) -> MigrationStats:
+    """
+    Provision payload indexes and rewrite legacy payloads of one collection.
+
+    Scrolls payloads only (no vectors) and overwrites each batch in one
+    batch_update_points call; already canonical points are skipped, so the
+    job can be re-run or resumed at any time.
+    """
+    stats = MigrationStats(collection=collection_name)
+    defaults = COLLECTION_DEFAULTS.get(collection_name)
+    if not dry_run:
+        stats.indexes_created = len(await ensure_payload_indexes(qdrant, collection_name))
+
+    offset = None
+    while True:
+        records, offset = await qdrant.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        operations = []
+        for record in records:
+            payload = record.payload or {}
+            if payload.get("schema_version") == PAYLOAD_SCHEMA_VERSION:
+                continue
+            operations.append(OverwritePayloadOperation(
+                overwrite_payload=SetPayload(
+                    payload=normalize_payload(payload, defaults), points=[record.id]
+                ),
+            ))
+        stats.scanned += len(records)
+        stats.migrated += len(operations)
+        if operations and not dry_run:
+            await qdrant.batch_update_points(
+                collection_name=collection_name, update_operations=operations
+            )
+        logger.info(f"{collection_name}: {stats.scanned} scanned, {stats.migrated} migrated")
+        if offset is None:
+            break
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="DOMULEX payload schema migration")
+    parser.add_argument(
+        "--collection", action="append", dest="collections",
+        help="Collection to migrate (repeatable, default: legal_documents and law_texts)",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count points that need migration"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from qdrant_pool import create_async_qdrant_client
+
+    async def run():
+        qdrant = create_async_qdrant_client()
+        try:
+            for collection_name in args.collections or list(COLLECTION_DEFAULTS):
+                stats = await migrate_collection(
+                    qdrant, collection_name, args.batch_size, args.dry_run
+                )
+                print(asdict(stats))
+        finally:
+            await qdrant.close()
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Upload Index for DOMULEX
+Query-time retrieval over long uploaded documents.
+
+Uploads that fit their share of the context budget go into the prompt
+whole. Longer ones are chunked (ingestion.chunker.LegalChunker) and
+embedded once; every question then gets the passages of the upload most
+similar to it, in document order, instead of the first N characters.
+Chunks are embedded batch by batch past the embedding caches, and only the
+first settings.upload_index_max_chunks chunks of an upload are indexed.
+
+Indexes live in process and expire settings.upload_index_ttl seconds after
+their last use. They are keyed by SHA-256 of the text, so follow-up turns
+that re-send the text or reference a stored upload reuse the same index.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from ingestion.chunker import LegalChunker
+from rag.context import estimate_tokens
+from rag.embeddings import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_SEPARATOR = "\n[...]\n"
+
+
+@dataclass
+class UploadIndex:
+    """Chunks of one upload with their L2-normalized embeddings."""
+
+    chunks: List[str]
+    vectors: np.ndarray  # (chunks, dimension)
+    expires: float = 0.0
+
+    def ranked(self, query_vector: List[float]) -> np.ndarray:
+        """Chunk positions by descending cosine similarity to the query."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        return np.argsort(-(self.vectors @ query), kind="stable")
+
+
+class UploadRetriever:
+    """
+    Relevant passages of uploaded documents, within a token budget.
+
+    Args:
+        embeddings: Embedding service of the engine (same model as retrieval)
+        chunk_tokens: Chunk size of the upload index
+        top_k: Passages per upload and question at most
+        ttl: Seconds an index is kept after its last use
+        max_entries: Indexes kept in process
+        max_chunks: Chunks indexed per upload (the rest of the text is dropped)
+    """
+
+    def __init__(
+        self,
+        embeddings: EmbeddingService,
+        chunk_tokens: int = 256,
+        top_k: int = 8,
+        ttl: int = 1800,
+        max_entries: int = 64,
+        max_chunks: int = 400,
+    ):
+        self.embeddings = embeddings
+        self.chunker = LegalChunker(max_tokens=chunk_tokens, overlap_tokens=chunk_tokens // 8)
+        self.top_k = top_k
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_chunks = max_chunks
+        self._indexes: "OrderedDict[str, UploadIndex]" = OrderedDict()
+        self._building: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    async def _build(self, text: str) -> UploadIndex:
+        started = time.monotonic()
+        chunks = self.chunker.chunk(text)
+        if len(chunks) > self.max_chunks:
+            logger.warning(
+                f"Upload has {len(chunks)} chunks, indexing the first {self.max_chunks}"
+            )
+            chunks = chunks[:self.max_chunks]
+        vectors = np.asarray(
+            await self.embeddings.embed_uncached(chunks, task_type="retrieval_document"),
+            dtype=np.float32,
+        )
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        logger.info(f"📎 Upload indexed: {len(chunks)} chunks in {time.monotonic() - started:.2f}s")
+        return UploadIndex(chunks=chunks, vectors=vectors)
+
+    async def index(self, text: str) -> UploadIndex:
+        """Index of an upload, built once per text (concurrent callers share the build)."""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        index = self._indexes.get(key)
+        if index is None or index.expires < now:
+            task = self._building.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._build(text))
+                self._building[key] = task
+                task.add_done_callback(lambda _: self._building.pop(key, None))
+            index = await task
+            self._indexes[key] = index
+            stale = [k for k, entry in self._indexes.items() if entry.expires < now and k != key]
+            for k in stale:
+                del self._indexes[k]
+        index.expires = now + self.ttl
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_entries:
+            self._indexes.popitem(last=False)
+        return index
+
+    async def passages(self, query: str, text: str, max_tokens: int) -> str:
+        """
+        The upload itself if it fits max_tokens, else its passages most
+        relevant to the query (best first until the budget is used), joined
+        in document order.
+        """
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        index = await self.index(text)
+        query_vector = await self.embeddings.embed(query, task_type="retrieval_query")
+
+        selected: List[int] = []
+        used = 0
+        for position in index.ranked(query_vector):
+            if len(selected) >= self.top_k:
+                break
+            cost = estimate_tokens(index.chunks[position] + PASSAGE_SEPARATOR)
+            if selected and used + cost > max_tokens:
+                continue
+            selected.append(int(position))
+            used += cost
+        return PASSAGE_SEPARATOR.join(index.chunks[i] for i in sorted(selected))
+
@@ -0,0 +1,164 @@
+"""
+Answer Verification for DOMULEX
+Checks generated answers against the retrieved context before (or instead
+of) the LLM critic.
+
+1. Local check: every § / Art. / Aktenzeichen cited in the answer must
+   appear in the context. A citation the context does not contain is a
+   hallucination and decides the verdict without the critic.
+2. LLM critic (RAGEngine._critique): for every other answer. Citations that
+   are all backed by the context do not prove the claims around them, so
+   such answers are not marked verified locally. Dates are not checked:
+   deadlines computed from the question appear in neither text.
+
+With settings.verification_async (default) only the local check runs
+before the response: a local hallucination verdict is returned at once,
+every other answer is returned PENDING while the critic runs in the
+background. VerificationStore keeps those verdicts for the follow-up
+endpoint GET /query/verification/{verification_id}.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Set, Tuple
+
+from cache import get_redis_client
+from config import get_settings
+from rag.lexical import find_citations
+
+logger = logging.getLogger(__name__)
+
+VERIFIED = "VERIFIED"
+UNVERIFIED = "UNVERIFIED"
+PENDING = "PENDING"
+HALLUCINATION = "HALLUCINATION DETECTED"
+
+
+def references(text: str) -> List[Tuple[str, str]]:
+    """
+    Checkable references of a text: (normalized key, surface form).
+
+    Norms cited with a law are kept law-qualified ('§558:bgb'); a bare '§558'
+    only counts where the text names no law for it.
+    """
+    spans = find_citations(text)
+    qualified = {
+        token.split(":")[0] for _, _, token in spans
+        if ":" in token and not token.startswith("az:")
+    }
+    found = [
+        (token, text[start:end])
+        for start, end, token in spans
+        if ":" in token or token not in qualified
+    ]
+    return list(dict(found).items())
+
+
+@dataclass
+class LocalCheck:
+    """Result of matching the answer's references against the context."""
+
+    checked: List[str] = field(default_factory=list)
+    unsupported: List[str] = field(default_factory=list)
+
+    @property
+    def conclusive(self) -> bool:
+        """Only an unsupported citation settles the verdict locally."""
+        return bool(self.unsupported)
+
+    @property
+    def verdict(self) -> str:
+        if self.unsupported:
+            return f"{HALLUCINATION}: nicht im Kontext belegt: {', '.join(self.unsupported)}"
+        return VERIFIED if self.checked else UNVERIFIED
+
+
+def check_references(answer: str, context: str) -> LocalCheck:
+    """Match every citation of the answer against the context."""
+    context_keys: Set[str] = {key for key, _ in references(context)}
+    context_keys.update(token for _, _, token in find_citations(context))
+    context_words = set(re.findall(r"[a-zäöüß/]+", context.lower()))
+
+    result = LocalCheck()
+    for key, surface in references(answer):
+        result.checked.append(surface)
+        if key in context_keys:
+            continue
+        if ":" in key and not key.startswith("az:"):
+            # '§558:bgb' is backed by a bare '§ 558' in a context that names the law
+            norm, law = key.split(":", 1)
+            if norm in context_keys and law in context_words:
+                continue
+        result.unsupported.append(surface)
+    return result
+
+
+@dataclass
+class Verification:
+    """Verdict on one answer."""
+
+    verdict: str
+    method: str  # "local", "llm", "none" or "pending" (critic still running)
+
+    @property
+    def hallucination_detected(self) -> bool:
+        return HALLUCINATION in self.verdict.upper()
+
+
+class VerificationStore:
+    """
+    Verdicts of asynchronously verified answers, by verification_id.
+
+    Redis when available (any worker can answer the follow-up request),
+    otherwise an in-process dict with TTL.
+    """
+
+    PREFIX = "domulex:verification:"
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: int = 4096):
+        self.ttl = ttl if ttl is not None else get_settings().verification_ttl
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def set(
+        self,
+        verification_id: str,
+        status: str,
+        verification: Optional[Verification] = None,
+    ):
+        payload = json.dumps({
+            "status": status,
+            **(asdict(verification) if verification else {"verdict": PENDING, "method": "none"}),
+        })
+        client = get_redis_client()
+        if client is not None:
+            try:
+                await asyncio.to_thread(
+                    client.setex, self.PREFIX + verification_id, self.ttl, payload
+                )
+                return
+            except Exception as e:
+                logger.warning(f"Verification store write failed: {e}")
+        self._local[verification_id] = (time.monotonic() + self.ttl, payload)
+        self._local.move_to_end(verification_id)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, verification_id: str) -> Optional[dict]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                payload = await asyncio.to_thread(client.get, self.PREFIX + verification_id)
+                return json.loads(payload) if payload else None
+            except Exception as e:
+                logger.warning(f"Verification store read failed: {e}")
+        entry = self._local.get(verification_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._local.pop(verification_id, None)
+            return None
+        return json.loads(entry[1])
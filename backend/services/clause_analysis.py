@@ -0,0 +1,181 @@
+"""
+Clause Analysis Pipeline for /analyze_contract
+Retrieval-only batch search for all clauses (one embedding request, one
+Qdrant batch search) and bounded concurrent Gemini comparisons.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from models import Jurisdiction, UserRole, RetrievalQuery, LegalDocument
+from services.pdf_parser import PDFParser, ClauseAnalysis, RiskLevel
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+NO_LEGAL_CONTEXT = (
+    "Keine spezifische Rechtsgrundlage in der Datenbank gefunden. "
+    "Die Analyse basiert auf allgemeinem deutschem Immobilienrecht."
+)
+NOT_ANALYSED = "Klausel konnte nicht automatisch analysiert werden."
+NOT_ANALYSED_RECOMMENDATION = (
+    "Bitte prüfen Sie diese Klausel manuell oder lassen Sie sie anwaltlich prüfen."
+)
+
+
+class ClauseAnalysisPipeline:
+    """
+    Analyzes identified contract clauses against the law.
+
+    Per contract:
+    1. RAGEngine.retrieve_many for all clauses: ONE batched embedding request
+       and ONE Qdrant batch search (no answer generation)
+    2. PDFParser.compare_clause_with_law per clause in worker threads,
+       concurrently, bounded by a semaphore
+
+    A 15-clause lease costs 1 embedding request + 15 comparisons instead of
+    15 × (embedding + answer + critique) + 15 comparisons. A clause whose
+    comparison fails is reported as not analysed (YELLOW) instead of failing
+    the whole contract.
+    """
+
+    def __init__(self, rag_engine, gemini_model, max_concurrency: Optional[int] = None):
+        self.rag = rag_engine
+        self.gemini_model = gemini_model
+        self.max_concurrency = max_concurrency or get_settings().clause_analysis_concurrency
+
+    @staticmethod
+    def search_query(clause_type: str, jurisdiction: Jurisdiction) -> str:
+        """Search query used to find the law relevant to a clause type."""
+        return f"{clause_type} law {jurisdiction.value} real estate lease"
+
+    async def analyze(
+        self,
+        clauses: List[Dict[str, str]],
+        jurisdiction: Jurisdiction,
+        user_role: UserRole,
+        source_filter: Optional[List[str]] = None,
+        gerichtsebene_filter: Optional[List[str]] = None,
+    ) -> List[ClauseAnalysis]:
+        """
+        Analyze all clauses.
+
+        Args:
+            clauses: Output of PDFParser.identify_key_clauses ({"type", "text"})
+            jurisdiction: Target jurisdiction
+            user_role: Perspective for the risk assessment
+            source_filter: Optional doc_type filter for the search
+            gerichtsebene_filter: Optional court level filter for the search
+
+        Returns:
+            ClauseAnalysis objects in the same order as clauses
+        """
+        if not clauses:
+            return []
+
+        queries = [
+            self.search_query(clause.get("type", "Unknown"), jurisdiction)
+            for clause in clauses
+        ]
+
+        # One batched retrieval for all clauses - the best match is all the comparison uses
+        try:
+            results = await self.rag.retrieve_many([
+                RetrievalQuery(
+                    query=query,
+                    target_jurisdiction=jurisdiction,
+                    limit=1,
+                    source_filter=source_filter,
+                    gerichtsebene_filter=gerichtsebene_filter,
+                )
+                for query in queries
+            ])
+        except Exception as e:
+            logger.warning(f"Clause retrieval failed: {e}")
+            results = [[] for _ in queries]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def analyze_one(clause: Dict[str, str], hits) -> ClauseAnalysis:
+            async with semaphore:
+                return await self._analyze_clause(
+                    clause=clause,
+                    top_source=hits[0].document if hits else None,
+                    jurisdiction=jurisdiction,
+                    user_role=user_role,
+                )
+
+        outcomes = await asyncio.gather(
+            *[analyze_one(clause, hits) for clause, hits in zip(clauses, results)],
+            return_exceptions=True,
+        )
+        analyses = []
+        for clause, outcome in zip(clauses, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(
+                    f"Clause analysis failed for {clause.get('type', 'Unknown')}: {outcome}"
+                )
+                outcome = self.not_analysed(clause)
+            analyses.append(outcome)
+        return analyses
+
+    @staticmethod
+    def not_analysed(clause: Dict[str, str]) -> ClauseAnalysis:
+        """Result for a clause whose comparison failed - flagged for manual review."""
+        return ClauseAnalysis(
+            clause_type=clause.get("type", "Unknown"),
+            clause_text=clause.get("text", ""),
+            risk_level=RiskLevel.YELLOW,
+            legal_standard="",
+            comparison=NOT_ANALYSED,
+            recommendation=NOT_ANALYSED_RECOMMENDATION,
+        )
+
+    async def _analyze_clause(
+        self,
+        clause: Dict[str, str],
+        top_source: Optional[LegalDocument],
+        jurisdiction: Jurisdiction,
+        user_role: UserRole,
+    ) -> ClauseAnalysis:
+        clause_type = clause.get("type", "Unknown")
+        clause_text = clause.get("text", "")
+
+        source_title = None
+        source_url = None
+        if top_source is not None:
+            legal_context = top_source.content_original
+            source_title = top_source.title
+            source_url = str(top_source.source_url)
+        else:
+            legal_context = NO_LEGAL_CONTEXT
+
+        # Blocking Gemini call - keep it off the event loop
+        comparison_result = await asyncio.to_thread(
+            PDFParser.compare_clause_with_law,
+            clause_type=clause_type,
+            clause_text=clause_text,
+            legal_context=legal_context,
+            user_role=user_role,
+            jurisdiction=jurisdiction,
+            gemini_model=self.gemini_model,
+        )
+
+        try:
+            risk_level = RiskLevel(comparison_result.get("risk_level", "YELLOW"))
+        except ValueError:
+            risk_level = RiskLevel.YELLOW
+
+        return ClauseAnalysis(
+            clause_type=clause_type,
+            clause_text=clause_text,
+            risk_level=risk_level,
+            legal_standard=(
+                legal_context[:300] + "..." if len(legal_context) > 300 else legal_context
+            ),
+            comparison=comparison_result.get("comparison", "No comparison available"),
+            recommendation=comparison_result.get("recommendation"),
+            source_title=source_title,
+            source_url=source_url,
+        )
@@ -19,6 +19,8 @@ from models.crm import (
     ChatWithDocumentsRequest, ChatWithDocumentsResponse,
     ClientStatus, MandateStatus, DocumentCategory
 )
+from config import get_settings
+from services.document_index import crm_document_text, get_document_index, rerank
 
 logger = logging.getLogger(__name__)
 
@@ -463,61 +465,82 @@ Antworte NUR mit einer Zahl zwischen 0 und 1, z.B. "0.75"
         lawyer_id: str,
         request: SearchDocumentsRequest
     ) -> List[DocumentSearchResult]:
-        """Search documents using AI semantic search."""
+        """
+        Search documents semantically.
+        
+        One query embedding against the lawyer's document index (new and
+        changed documents are embedded on the way, deleted ones dropped);
+        hits below document_search_min_score are discarded and only the
+        best few are reranked by Gemini in a single call.
+        """
+        settings = get_settings()
+        index = get_document_index()
         
         # Get candidate documents
         documents = await self.list_documents(
             lawyer_id=lawyer_id,
             client_id=request.client_id,
             mandate_id=request.mandate_id,
-            category=request.category
+            category=request.category,
+            limit=settings.document_search_max_documents
         )
+        if request.tags:
+            documents = [doc for doc in documents if set(doc.tags) & set(request.tags)]
         
         if not documents:
             return []
         
-        # Use AI to rank by relevance
-        results = []
+        # Embed new or changed documents; an unfiltered, complete listing also drops deleted ones
+        by_id = {doc.document_id: doc for doc in documents}
+        complete = (
+            not (request.client_id or request.mandate_id or request.category or request.tags)
+            and len(documents) < settings.document_search_max_documents
+        )
+        await index.sync(
+            lawyer_id,
+            {doc_id: crm_document_text(doc) for doc_id, doc in by_id.items()},
+            complete=complete
+        )
         
-        for doc in documents:
-            # Build document context
-            doc_context = f"""
-Dateiname: {doc.filename}
-Kategorie: {doc.category.value}
-Zusammenfassung: {doc.ai_summary or 'N/A'}
-Schlüsselpunkte: {', '.join(doc.ai_key_points) if doc.ai_key_points else 'N/A'}
-"""
-            
-            try:
-                # Ask AI to rate relevance
-                relevance_prompt = f"""
-Suchanfrage: {request.query}
-
-Dokument:
-{doc_context}
-
-Wie relevant ist dieses Dokument für die Suchanfrage?
-Antworte NUR mit einer Zahl zwischen 0.0 (nicht relevant) und 1.0 (sehr relevant).
-"""
-                response = self.ai_flash.generate_content(relevance_prompt)
-                try:
-                    score = float(response.text.strip())
-                    score = max(0.0, min(1.0, score))
-                except ValueError:
-                    score = 0.0
-                
-                if score > 0.3:  # Threshold
-                    results.append(DocumentSearchResult(
-                        document=doc,
-                        relevance_score=score,
-                        matching_excerpt=doc.ai_summary[:200] if doc.ai_summary else None
-                    ))
-            
-            except Exception as e:
-                logger.warning(f"Failed to score document {doc.document_id}: {e}")
+        rerank_top_n = settings.document_search_rerank_top_n
+        hits = await index.search(
+            lawyer_id,
+            request.query,
+            limit=max(request.limit, rerank_top_n),
+            candidates=by_id.keys(),
+            min_score=settings.document_search_min_score
+        )
         
-        # Sort by relevance
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
+        results = [
+            DocumentSearchResult(
+                document=by_id[doc_id],
+                relevance_score=max(0.0, min(1.0, score)),
+                matching_excerpt=(by_id[doc_id].ai_summary or "")[:200] or None
+            )
+            for doc_id, score in hits
+        ]
+        
+        # Optional: Gemini reranks the best hits, irrelevant ones (< 0.3) are dropped
+        if rerank_top_n > 0 and results:
+            top = results[:rerank_top_n]
+            reranked = await rerank(self.ai_flash, request.query, [
+                (result.document.document_id, f"""Dateiname: {result.document.filename}
+Kategorie: {result.document.category.value}
+Zusammenfassung: {result.document.ai_summary or 'N/A'}
+Schlüsselpunkte: {', '.join(result.document.ai_key_points or []) or 'N/A'}""")
+                for result in top
+            ])
+            if reranked:
+                for result in top:
+                    result.relevance_score, result.ai_explanation = reranked.get(
+                        result.document.document_id, (0.0, None)
+                    )
+                top = sorted(
+                    (result for result in top if result.relevance_score > 0.3),
+                    key=lambda x: x.relevance_score,
+                    reverse=True
+                )
+                results = top + results[rerank_top_n:]
         
         return results[:request.limit]
     
@@ -0,0 +1,271 @@
+"""
+Document Index for DOMULEX
+Embedding search over CRM documents and generated documents.
+
+Every lawyer (namespace) gets an in-process matrix of L2-normalized
+document vectors. Documents are embedded once per content: the index keeps a
+fingerprint per document and brings the index up to date with the Firestore
+listing at search time (sync): new or changed documents are embedded,
+deleted ones dropped - documents are written by the frontend, not through
+this backend. A search is one query embedding plus one matrix product; hits
+below a minimum cosine score are discarded and only the best few are
+optionally reranked by Gemini in a single call (rerank), instead of one LLM
+call per document.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import get_settings
+from rag.embeddings import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+def crm_document_text(document) -> str:
+    """Indexed text of a CRM document (models.crm.Document)."""
+    parts = [
+        document.title or document.filename,
+        f"Kategorie: {document.category.value}",
+        document.description or "",
+        ", ".join(document.tags),
+        document.ai_summary or "",
+        "; ".join(document.ai_key_points),
+        "; ".join(document.ai_legal_issues),
+        document.extracted_text or "",
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+def generated_document_text(document: dict) -> str:
+    """Indexed text of a generated document as sent by the frontend."""
+    parts = [
+        document.get("templateName") or "",
+        document.get("clientName") or "",
+        document.get("caseNumber") or "",
+        document.get("summary") or "",
+        document.get("content") or "",
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+@dataclass
+class _Namespace:
+    """Vectors of one lawyer, by document ID."""
+
+    # id -> (fingerprint, vector)
+    entries: Dict[str, Tuple[str, np.ndarray]] = field(default_factory=dict)
+    ids: List[str] = field(default_factory=list)
+    matrix: Optional[np.ndarray] = None  # stacked vectors of ids, rebuilt after changes
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def stacked(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        if self.matrix is None and self.entries:
+            self.ids = list(self.entries)
+            self.matrix = np.stack([self.entries[i][1] for i in self.ids])
+        return self.ids, self.matrix
+
+
+class DocumentIndex:
+    """
+    Per-lawyer embedding index of documents, maintained incrementally.
+
+    Args:
+        embeddings: Embedding service (cached, batched)
+        max_chars: Characters of a document's text that are embedded
+        max_namespaces: Lawyers kept in process (least recently used evicted)
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[EmbeddingService] = None,
+        max_chars: int = 8000,
+        max_namespaces: int = 256,
+    ):
+        self.embeddings = embeddings or EmbeddingService()
+        self.max_chars = max_chars
+        self.max_namespaces = max_namespaces
+        self._namespaces: "OrderedDict[str, _Namespace]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._namespaces)
+
+    def size(self, namespace: str) -> int:
+        entry = self._namespaces.get(namespace)
+        return len(entry.entries) if entry else 0
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        entry = self._namespaces.get(namespace)
+        if entry is None:
+            entry = self._namespaces[namespace] = _Namespace()
+        self._namespaces.move_to_end(namespace)
+        while len(self._namespaces) > self.max_namespaces:
+            self._namespaces.popitem(last=False)
+        return entry
+
+    def _fingerprint(self, text: str) -> str:
+        return hashlib.sha256(text[: self.max_chars].encode("utf-8")).hexdigest()
+
+    async def _vectors(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        truncated = [text[: self.max_chars] for text in texts]
+        vectors = np.asarray(
+            await self.embeddings.embed_many(truncated, task_type=task_type), dtype=np.float32
+        )
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    async def sync(self, namespace: str, texts: Dict[str, str], complete: bool = False) -> int:
+        """
+        Bring a namespace up to date with documents by ID: embed new and
+        changed ones; with complete=True (texts is every document of the
+        namespace) also drop the ones no longer listed.
+
+        Returns:
+            Number of documents embedded
+        """
+        entry = self._namespace(namespace)
+        async with entry.lock:
+            fingerprints = {
+                doc_id: self._fingerprint(text) for doc_id, text in texts.items() if text
+            }
+            changed = [
+                doc_id for doc_id, fingerprint in fingerprints.items()
+                if entry.entries.get(doc_id, ("",))[0] != fingerprint
+            ]
+            removed = []
+            if complete:
+                removed = [doc_id for doc_id in entry.entries if doc_id not in fingerprints]
+
+            if changed:
+                vectors = await self._vectors([texts[doc_id] for doc_id in changed])
+                for doc_id, vector in zip(changed, vectors):
+                    entry.entries[doc_id] = (fingerprints[doc_id], vector)
+            for doc_id in removed:
+                del entry.entries[doc_id]
+            if changed or removed:
+                entry.matrix = None
+                logger.info(
+                    f"🗂️ Document index {namespace}: "
+                    f"{len(changed)} embedded, {len(removed)} removed"
+                )
+            return len(changed)
+
+    async def upsert(self, namespace: str, document_id: str, text: str) -> bool:
+        """Index a created or updated document. Returns whether it was embedded."""
+        return await self.sync(namespace, {document_id: text}) > 0
+
+    def remove(self, namespace: str, document_id: str):
+        """Drop a deleted document from the index."""
+        entry = self._namespaces.get(namespace)
+        if entry is not None and entry.entries.pop(document_id, None) is not None:
+            entry.matrix = None
+
+    async def search(
+        self,
+        namespace: str,
+        query: str,
+        limit: int = 10,
+        candidates: Optional[Iterable[str]] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[str, float]]:
+        """
+        Documents of a namespace most similar to the query.
+
+        Args:
+            candidates: Restrict the result to these document IDs (filters)
+            min_score: Cosine similarity below which hits are irrelevant
+
+        Returns:
+            (document_id, cosine similarity) pairs, best first
+        """
+        entry = self._namespace(namespace)
+        ids, matrix = entry.stacked()
+        if matrix is None:
+            return []
+        query_vector = (await self._vectors([query], task_type="retrieval_query"))[0]
+        scores = matrix @ query_vector
+        allowed = set(candidates) if candidates is not None else None
+
+        hits = []
+        for position in np.argsort(-scores, kind="stable"):
+            if scores[position] < min_score:
+                break
+            doc_id = ids[position]
+            if allowed is not None and doc_id not in allowed:
+                continue
+            hits.append((doc_id, float(scores[position])))
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+async def rerank(
+    model,
+    query: str,
+    candidates: List[Tuple[str, str]],
+) -> Dict[str, Tuple[float, str]]:
+    """
+    Rerank the best hits with one LLM call.
+
+    Args:
+        model: genai.GenerativeModel
+        candidates: (document_id, short description) pairs
+
+    Returns:
+        document_id -> (relevance 0.0-1.0, one-sentence reason); empty if the
+        call or its answer fails, so callers keep the vector order
+    """
+    if not candidates:
+        return {}
+    listing = "\n\n".join(
+        f"[{number}]\n{description[:1500]}" for number, (_, description) in enumerate(candidates, 1)
+    )
+    prompt = f"""Bewerte die Relevanz jedes Dokuments für die Suchanfrage.
+
+Suchanfrage: "{query}"
+
+Dokumente:
+{listing}
+
+Antworte NUR mit einem JSON-Array, ein Objekt pro Dokument:
+[{{"nr": 1, "score": 0.0-1.0, "begruendung": "ein Satz"}}]"""
+
+    try:
+        response = await asyncio.to_thread(model.generate_content, prompt)
+        match = re.search(r"\[.*\]", response.text, re.DOTALL)
+        ratings = json.loads(match.group(0)) if match else []
+        reranked = {}
+        for rating in ratings:
+            number = int(rating.get("nr", 0))
+            if 1 <= number <= len(candidates):
+                score = max(0.0, min(1.0, float(rating.get("score", 0.0))))
+                reason = str(rating.get("begruendung", "")).strip()
+                reranked[candidates[number - 1][0]] = (score, reason)
+        return reranked
+    except Exception as e:
+        logger.warning(f"Document rerank failed, keeping vector order: {e}")
+        return {}
+
+
+# Process-wide index
+_index: Optional[DocumentIndex] = None
+
+
+def get_document_index() -> DocumentIndex:
+    """Get the shared document index, configured from settings."""
+    global _index
+
+    if _index is None:
+        settings = get_settings()
+        _index = DocumentIndex(
+            max_chars=settings.document_index_max_chars,
+            max_namespaces=settings.document_index_max_lawyers,
+        )
+    return _index
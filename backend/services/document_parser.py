@@ -7,16 +7,17 @@ Mit OCR-Unterstützung für gescannte PDFs
 import io
 import logging
 import csv
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from enum import Enum
 from pydantic import BaseModel, Field
 
 import fitz  # PyMuPDF
 from PIL import Image
 import pytesseract
-from pdf2image import convert_from_bytes
 from docx import Document
 
+from services.ocr_engine import get_ocr_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,11 +35,39 @@ class DocumentType(str, Enum):
     EML = "eml"
 
 
+EXTENSIONS = {
+    'pdf': DocumentType.PDF,
+    'docx': DocumentType.DOCX,
+    'doc': DocumentType.DOCX,
+    'txt': DocumentType.TXT,
+    'jpg': DocumentType.IMAGE,
+    'jpeg': DocumentType.IMAGE,
+    'png': DocumentType.IMAGE,
+    'gif': DocumentType.IMAGE,
+    'bmp': DocumentType.IMAGE,
+    'tiff': DocumentType.IMAGE,
+    'tif': DocumentType.IMAGE,
+    'webp': DocumentType.IMAGE,
+    'xlsx': DocumentType.EXCEL,
+    'xls': DocumentType.EXCEL,
+    'csv': DocumentType.CSV,
+    'rtf': DocumentType.RTF,
+    'html': DocumentType.HTML,
+    'htm': DocumentType.HTML,
+    'xml': DocumentType.XML,
+    'eml': DocumentType.EML,
+}
+
+# PDFs with less extractable text than this are treated as scans
+OCR_MIN_CHARS = 100
+
+
 class DocumentParseResult(BaseModel):
     """Result of document parsing"""
     text: str = Field(..., description="Extracted text content")
     doc_type: DocumentType
     page_count: Optional[int] = None
+    page_offsets: Optional[List[int]] = Field(None, description="Start of each page in text (PDF)")
     char_count: int
     word_count: int
     ocr_applied: bool = False
@@ -69,35 +98,19 @@ class DocumentParser:
         """
         ext = filename.lower().split('.')[-1]
         
-        if ext == 'pdf':
-            return DocumentType.PDF
-        elif ext in ['docx', 'doc']:
-            return DocumentType.DOCX
-        elif ext == 'txt':
-            return DocumentType.TXT
-        elif ext in ['jpg', 'jpeg', 'png', 'tiff', 'tif', 'webp']:
-            return DocumentType.IMAGE
-        elif ext in ['xlsx', 'xls']:
-            return DocumentType.EXCEL
-        elif ext == 'csv':
-            return DocumentType.CSV
-        elif ext == 'rtf':
-            return DocumentType.RTF
-        elif ext in ['html', 'htm']:
-            return DocumentType.HTML
-        elif ext == 'xml':
-            return DocumentType.XML
-        elif ext == 'eml':
-            return DocumentType.EML
-        else:
-            # Fallback: Versuche als Text zu lesen
-            logger.warning(f"Unknown file type: {ext}, treating as TXT")
-            return DocumentType.TXT
+        if ext in EXTENSIONS:
+            return EXTENSIONS[ext]
+        
+        # Fallback: Versuche als Text zu lesen
+        logger.warning(f"Unknown file type: {ext}, treating as TXT")
+        return DocumentType.TXT
     
     @staticmethod
     async def extract_text_with_ocr(file_bytes: bytes) -> str:
         """
         Extract text from scanned PDF using OCR (Tesseract).
+        Pages are recognized in parallel by the shared OCR engine,
+        off the event loop.
         
         Args:
             file_bytes: Raw PDF bytes
@@ -108,36 +121,23 @@ class DocumentParser:
         logger.info("🔍 Using OCR to extract text from scanned PDF...")
         
         try:
-            # Convert PDF pages to images
-            images = convert_from_bytes(file_bytes, dpi=300)
-            logger.info(f"📄 Converted PDF to {len(images)} images")
-            
-            full_text = []
-            
-            for i, image in enumerate(images):
-                # Run OCR on each page (German + English)
-                text = pytesseract.image_to_string(image, lang='deu+eng')
-                if text.strip():
-                    full_text.append(text)
-                logger.debug(f"📝 OCR page {i+1}: {len(text)} characters")
-            
-            extracted = "\n\n".join(full_text).strip()
-            logger.info(f"✅ OCR extracted {len(extracted)} characters from {len(images)} pages")
-            
-            return extracted
+            result = await get_ocr_engine().extract_text_async(file_bytes)
+            return result.text
             
         except Exception as e:
             logger.error(f"❌ OCR extraction failed: {e}")
             raise ValueError(f"OCR extraction failed: {str(e)}")
     
     @staticmethod
-    async def parse_pdf(file_bytes: bytes) -> DocumentParseResult:
+    def parse_pdf(file_bytes: bytes, ocr: bool = True) -> DocumentParseResult:
         """
         Extract text from PDF using PyMuPDF.
         Falls back to OCR for scanned documents.
         
         Args:
             file_bytes: Raw PDF bytes
+            ocr: Run the OCR fallback (False: return the little text
+                there is, see needs_ocr)
             
         Returns:
             DocumentParseResult with extracted text
@@ -154,13 +154,24 @@ class DocumentParser:
             page_count = pdf_document.page_count
             pdf_document.close()
             
-            extracted = "\n\n".join(full_text).strip()
+            joined = "\n\n".join(full_text)
+            extracted = joined.strip()
+            
+            # Page start offsets in the stripped text
+            lead = len(joined) - len(joined.lstrip())
+            page_offsets, offset = [], 0
+            for text in full_text:
+                page_offsets.append(min(max(offset - lead, 0), len(extracted)))
+                offset += len(text) + 2
             
             # If no text or very little text, try OCR
-            if not extracted or len(extracted) < 100:
+            ocr_applied = False
+            if len(extracted) < OCR_MIN_CHARS and ocr:
                 logger.info("📄 PDF has little/no extractable text, trying OCR...")
                 try:
-                    extracted = await DocumentParser.extract_text_with_ocr(file_bytes)
+                    extracted = get_ocr_engine().extract_text(file_bytes).text
+                    ocr_applied = True
+                    page_offsets = None
                 except Exception as ocr_error:
                     logger.error(f"OCR also failed: {ocr_error}")
                     return DocumentParseResult(
@@ -169,16 +180,18 @@ class DocumentParser:
                         page_count=page_count,
                         char_count=0,
                         word_count=0,
+                        ocr_applied=True,
                         error=f"Konnte keinen Text extrahieren (auch nicht mit OCR): {str(ocr_error)}"
                     )
             
-            if not extracted:
+            if not extracted and ocr:
                 return DocumentParseResult(
                     text="",
                     doc_type=DocumentType.PDF,
                     page_count=page_count,
                     char_count=0,
                     word_count=0,
+                    ocr_applied=ocr_applied,
                     error="Konnte keinen Text aus dem PDF extrahieren"
                 )
             
@@ -188,8 +201,10 @@ class DocumentParser:
                 text=extracted,
                 doc_type=DocumentType.PDF,
                 page_count=page_count,
+                page_offsets=page_offsets,
                 char_count=len(extracted),
-                word_count=len(extracted.split())
+                word_count=len(extracted.split()),
+                ocr_applied=ocr_applied
             )
         
         except Exception as e:
@@ -203,7 +218,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_docx(file_bytes: bytes) -> DocumentParseResult:
+    def parse_docx(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from DOCX using python-docx.
         
@@ -254,7 +269,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_txt(file_bytes: bytes) -> DocumentParseResult:
+    def parse_txt(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from TXT file.
         
@@ -293,7 +308,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_image_ocr(file_bytes: bytes) -> DocumentParseResult:
+    def parse_image_ocr(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from image using Tesseract OCR.
         
@@ -351,7 +366,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_excel(file_bytes: bytes) -> DocumentParseResult:
+    def parse_excel(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from Excel files (XLS, XLSX) using openpyxl.
         """
@@ -393,7 +408,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_csv(file_bytes: bytes) -> DocumentParseResult:
+    def parse_csv(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from CSV files.
         """
@@ -431,7 +446,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_html(file_bytes: bytes) -> DocumentParseResult:
+    def parse_html(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from HTML files using BeautifulSoup.
         """
@@ -470,7 +485,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_xml(file_bytes: bytes) -> DocumentParseResult:
+    def parse_xml(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text content from XML files.
         """
@@ -504,7 +519,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_eml(file_bytes: bytes) -> DocumentParseResult:
+    def parse_eml(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from EML (email) files.
         """
@@ -561,7 +576,7 @@ class DocumentParser:
             )
     
     @staticmethod
-    async def parse_rtf(file_bytes: bytes) -> DocumentParseResult:
+    def parse_rtf(file_bytes: bytes) -> DocumentParseResult:
         """
         Extract text from RTF files.
         """
@@ -598,6 +613,47 @@ class DocumentParser:
                 error=str(e)
             )
     
+    @staticmethod
+    def needs_ocr(result: DocumentParseResult) -> bool:
+        """PDF parsed with ocr=False that is most likely a scan."""
+        return (
+            result.doc_type == DocumentType.PDF
+            and not result.error
+            and not result.ocr_applied
+            and len(result.text) < OCR_MIN_CHARS
+        )
+    
+    @classmethod
+    def parse(
+        cls, doc_type: DocumentType, file_bytes: bytes, ocr: bool = True
+    ) -> DocumentParseResult:
+        """
+        Run the parser for a document type (blocking, CPU-bound).
+        
+        Args:
+            doc_type: Detected document type
+            file_bytes: Raw file bytes
+            ocr: OCR fallback for scanned PDFs
+            
+        Returns:
+            DocumentParseResult with extracted text
+        """
+        if doc_type == DocumentType.PDF:
+            return cls.parse_pdf(file_bytes, ocr=ocr)
+        parsers = {
+            DocumentType.DOCX: cls.parse_docx,
+            DocumentType.TXT: cls.parse_txt,
+            DocumentType.IMAGE: cls.parse_image_ocr,
+            DocumentType.EXCEL: cls.parse_excel,
+            DocumentType.CSV: cls.parse_csv,
+            DocumentType.HTML: cls.parse_html,
+            DocumentType.XML: cls.parse_xml,
+            DocumentType.EML: cls.parse_eml,
+            DocumentType.RTF: cls.parse_rtf,
+        }
+        # Fallback: treat as text
+        return parsers.get(doc_type, cls.parse_txt)(file_bytes)
+    
     async def parse_document(
         self, 
         file_bytes: bytes,
@@ -605,6 +661,7 @@ class DocumentParser:
     ) -> DocumentParseResult:
         """
         Route document to correct parser based on file type.
+        Parsing runs off the event loop (services.parsing_service).
         
         Args:
             file_bytes: Raw file bytes
@@ -613,44 +670,9 @@ class DocumentParser:
         Returns:
             DocumentParseResult with extracted text
         """
-        try:
-            doc_type = self.detect_document_type(filename)
-            
-            logger.info(f"📄 Parsing {doc_type.value} document: {filename}")
-            
-            if doc_type == DocumentType.PDF:
-                return await self.parse_pdf(file_bytes)
-            elif doc_type == DocumentType.DOCX:
-                return await self.parse_docx(file_bytes)
-            elif doc_type == DocumentType.TXT:
-                return await self.parse_txt(file_bytes)
-            elif doc_type == DocumentType.IMAGE:
-                return await self.parse_image_ocr(file_bytes)
-            elif doc_type == DocumentType.EXCEL:
-                return await self.parse_excel(file_bytes)
-            elif doc_type == DocumentType.CSV:
-                return await self.parse_csv(file_bytes)
-            elif doc_type == DocumentType.HTML:
-                return await self.parse_html(file_bytes)
-            elif doc_type == DocumentType.XML:
-                return await self.parse_xml(file_bytes)
-            elif doc_type == DocumentType.EML:
-                return await self.parse_eml(file_bytes)
-            elif doc_type == DocumentType.RTF:
-                return await self.parse_rtf(file_bytes)
-            else:
-                # Fallback: treat as text
-                return await self.parse_txt(file_bytes)
+        from services.parsing_service import get_parsing_service
         
-        except Exception as e:
-            logger.error(f"❌ Document parsing failed: {e}")
-            return DocumentParseResult(
-                text="",
-                doc_type=DocumentType.TXT,  # fallback
-                char_count=0,
-                word_count=0,
-                error=str(e)
-            )
+        return await get_parsing_service().parse(file_bytes, filename)
 
 
 # Singleton instance
@@ -9,6 +9,14 @@ from datetime import datetime
 import google.generativeai as genai
 from pydantic import BaseModel
 
+from config import get_settings
+from services.document_index import (
+    DocumentIndex,
+    generated_document_text,
+    get_document_index,
+    rerank,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,13 +40,14 @@ class GeneratedDocumentSearchResult(BaseModel):
 
 
 class DocumentSearchService:
-    """Service for semantic document search using Gemini AI."""
+    """Service for semantic document search (embedding index + Gemini rerank)."""
     
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str, index: Optional[DocumentIndex] = None):
         """Initialize the document search service."""
         self.gemini_api_key = gemini_api_key
         genai.configure(api_key=gemini_api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.index = index if index is not None else get_document_index()
     
     async def generate_document_summary(self, content: str, template_name: str) -> str:
         """Generate AI summary for a document."""
@@ -63,15 +72,25 @@ Zusammenfassung:"""
         self,
         documents: List[dict],
         query: str,
-        max_results: int = 10
+        max_results: int = 10,
+        user_id: Optional[str] = None,
+        rerank_top_n: Optional[int] = None,
+        min_score: Optional[float] = None
     ) -> List[GeneratedDocumentSearchResult]:
         """
-        Search documents using semantic AI search.
+        Search documents using semantic search.
+        
+        Documents are embedded once per content in the user's namespace of
+        the document index; the query is one embedding plus one matrix
+        product. Only the best rerank_top_n hits go to Gemini, in one call.
         
         Args:
             documents: List of document dicts with keys: id, templateName, content, clientName, etc.
             query: Search query
             max_results: Maximum number of results
+            user_id: Authenticated owner of the documents (index namespace)
+            rerank_top_n: Hits reranked by Gemini (default: settings, 0 = off)
+            min_score: Minimum cosine similarity of a hit (default: settings)
             
         Returns:
             List of search results ranked by relevance
@@ -79,76 +98,66 @@ Zusammenfassung:"""
         if not documents:
             return []
         
+        settings = get_settings()
+        if rerank_top_n is None:
+            rerank_top_n = settings.document_search_rerank_top_n
+        if min_score is None:
+            min_score = settings.document_search_min_score
+        
+        by_id = {str(doc['id']): doc for doc in documents if doc.get('id')}
+        # Without an owner: throwaway index (vectors still come from the embedding cache)
+        index = (
+            self.index if user_id else DocumentIndex(self.index.embeddings, self.index.max_chars)
+        )
+        namespace = f"generated:{user_id}"
+        # The frontend sends all of the user's documents: the listing is complete
+        await index.sync(
+            namespace,
+            {doc_id: generated_document_text(doc) for doc_id, doc in by_id.items()},
+            complete=True
+        )
+        # Restricted to this listing: a concurrent request may have synced other IDs
+        hits = await index.search(
+            namespace,
+            query,
+            limit=max(max_results, rerank_top_n),
+            candidates=by_id.keys(),
+            min_score=min_score,
+        )
+        
         results = []
+        for doc_id, score in hits:
+            doc = by_id[doc_id]
+            content = doc.get('content', '')
+            results.append(GeneratedDocumentSearchResult(
+                document_id=doc_id,
+                template_name=doc.get('templateName', 'Unbekannt'),
+                client_name=doc.get('clientName'),
+                case_number=doc.get('caseNumber'),
+                created_at=doc.get('createdAt', datetime.now()),
+                relevance_score=max(0.0, min(1.0, score)),
+                summary=doc.get('summary') or f"Dokument: {doc.get('templateName', 'Dokument')}",
+                matching_excerpt=content[:200] + "..." if len(content) > 200 else content
+            ))
         
-        for doc in documents:
-            try:
-                # Build document context
-                doc_context = f"""
-Dokumenttyp: {doc.get('templateName', 'Unbekannt')}
-Mandant: {doc.get('clientName', 'N/A')}
-Aktenzeichen: {doc.get('caseNumber', 'N/A')}
-Erstellt: {doc.get('createdAt', 'N/A')}
-
-Inhalt (Auszug):
-{doc.get('content', '')[:1000]}
-"""
-                
-                # Ask AI to rate relevance
-                relevance_prompt = f"""Bewerte die Relevanz dieses Dokuments für die Suchanfrage.
-
-Suchanfrage: "{query}"
-
-Dokument:
-{doc_context}
-
-Antworte NUR mit einer Zahl zwischen 0.0 (nicht relevant) und 1.0 (sehr relevant).
-Keine Erklärung, nur die Zahl."""
-
-                response = self.model.generate_content(relevance_prompt)
-                
-                # Parse relevance score
-                try:
-                    relevance = float(response.text.strip())
-                    relevance = max(0.0, min(1.0, relevance))  # Clamp to [0, 1]
-                except ValueError:
-                    relevance = 0.0
-                
-                # Skip if not relevant
-                if relevance < 0.1:
-                    continue
-                
-                # Generate summary
-                summary = await self.generate_document_summary(
-                    doc.get('content', ''),
-                    doc.get('templateName', 'Dokument')
+        # Optional: Gemini reranks the best hits (and summarizes them),
+        # irrelevant ones (< 0.1) are dropped
+        if rerank_top_n > 0 and results:
+            top = results[:rerank_top_n]
+            reranked = await rerank(self.model, query, [
+                (result.document_id, generated_document_text(by_id[result.document_id])[:1000])
+                for result in top
+            ])
+            if reranked:
+                for result in top:
+                    result.relevance_score, reason = reranked.get(result.document_id, (0.0, ""))
+                    if reason and not by_id[result.document_id].get('summary'):
+                        result.summary = reason
+                top = sorted(
+                    (result for result in top if result.relevance_score >= 0.1),
+                    key=lambda x: x.relevance_score,
+                    reverse=True
                 )
-                
-                # Find matching excerpt (simple approach - first 200 chars)
-                excerpt = None
-                content = doc.get('content', '')
-                if len(content) > 200:
-                    excerpt = content[:200] + "..."
-                else:
-                    excerpt = content
-                
-                results.append(GeneratedDocumentSearchResult(
-                    document_id=doc['id'],
-                    template_name=doc.get('templateName', 'Unbekannt'),
-                    client_name=doc.get('clientName'),
-                    case_number=doc.get('caseNumber'),
-                    created_at=doc.get('createdAt', datetime.now()),
-                    relevance_score=relevance,
-                    summary=summary,
-                    matching_excerpt=excerpt
-                ))
-            
-            except Exception as e:
-                logger.error(f"Error processing document {doc.get('id')}: {e}")
-                continue
-        
-        # Sort by relevance
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
+                results = top + results[rerank_top_n:]
         
-        # Limit results
         return results[:max_results]
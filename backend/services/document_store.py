@@ -0,0 +1,192 @@
+"""
+Content-Addressed Document Store for DOMULEX
+Parsed uploads keyed by SHA-256 of the file bytes.
+
+Uploading the same Mietvertrag again (to /upload/document, /analyze_contract,
+/templates/extract-document) returns the stored text instead of parsing and
+OCR'ing it again. The hash doubles as document ID: /query and
+/documents/analyze accept it instead of the full text.
+
+Backends:
+- Redis (settings.enable_cache): one key per document with a sliding TTL;
+  size is capped by the server's maxmemory LRU policy
+- Local disk (settings.document_store_path): one JSON file per document,
+  least recently used files are evicted above document_store_max_mb
+
+Only users who uploaded a document (owners) can resolve it by ID; callers
+pass the authenticated Firebase uid, never a client-supplied user_id.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from cache import get_redis_client
+from config import get_settings
+from services.document_parser import DocumentParseResult
+from services.parsing_service import get_parsing_service
+
+logger = logging.getLogger(__name__)
+
+
+def document_hash(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class StoredDocument(BaseModel):
+    """Parse result of an uploaded file plus its content address."""
+    document_hash: str
+    filename: str
+    parse: DocumentParseResult
+    owners: List[str] = Field(default_factory=list)
+    stored_at: datetime = Field(default_factory=datetime.utcnow)
+    cached: bool = Field(False, exclude=True)  # served from the store
+
+    @property
+    def text(self) -> str:
+        return self.parse.text
+
+
+class DocumentStore:
+    """
+    Parsed documents by SHA-256, Redis or local disk with an LRU size cap.
+
+    Args:
+        path: Directory of the disk backend
+        max_bytes: Size cap of the disk backend
+        ttl: Seconds a document stays in Redis after its last use
+    """
+
+    PREFIX = "domulex:document:"
+
+    def __init__(self, path: str, max_bytes: int, ttl: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[str]:
+        client = get_redis_client()
+        if client is not None:
+            try:
+                payload = client.get(self.PREFIX + key)
+                if payload is not None:
+                    client.expire(self.PREFIX + key, self.ttl)
+                return payload
+            except Exception as e:
+                logger.warning(f"Document store read failed: {e}")
+        try:
+            payload = self._file(key).read_text(encoding="utf-8")
+            os.utime(self._file(key))  # LRU order = mtime
+            return payload
+        except OSError:
+            return None
+
+    def _write(self, key: str, payload: str):
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.setex(self.PREFIX + key, self.ttl, payload)
+                return
+            except Exception as e:
+                logger.warning(f"Document store write failed: {e}")
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._file(key).with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self._file(key))
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the store fits max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[StoredDocument]:
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            return None
+        payload = await asyncio.to_thread(self._read, key)
+        if payload is None:
+            return None
+        return StoredDocument(**json.loads(payload), cached=True)
+
+    async def put(self, document: StoredDocument):
+        await asyncio.to_thread(self._write, document.document_hash, document.model_dump_json())
+
+    async def resolve(self, key: str, user_id: Optional[str]) -> Optional[StoredDocument]:
+        """Stored document by ID, only for users who uploaded it (authenticated uid)."""
+        if not user_id:
+            return None
+        document = await self.get(key)
+        if document is None or user_id not in document.owners:
+            return None
+        return document
+
+    async def get_or_parse(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        user_id: Optional[str] = None,
+    ) -> StoredDocument:
+        """
+        Parse result of an upload, from the store if the same bytes were
+        parsed before. Failed parses are returned but not stored.
+        """
+        key = document_hash(file_bytes)
+        document = await self.get(key)
+        if document is not None:
+            logger.info(f"✅ Document store hit: {filename} ({key[:12]})")
+            if user_id and user_id not in document.owners:
+                document.owners.append(user_id)
+                await self.put(document)
+            return document
+
+        parse = await get_parsing_service().parse(file_bytes, filename)
+        document = StoredDocument(
+            document_hash=key,
+            filename=filename,
+            parse=parse,
+            owners=[user_id] if user_id else [],
+        )
+        if not parse.error and parse.text:
+            await self.put(document)
+        return document
+
+
+# Process-wide store
+_store: Optional[DocumentStore] = None
+
+
+def get_document_store() -> DocumentStore:
+    """Get the shared document store, configured from settings."""
+    global _store
+
+    if _store is None:
+        settings = get_settings()
+        _store = DocumentStore(
+            path=settings.document_store_path,
+            max_bytes=settings.document_store_max_mb * 1024 * 1024,
+            ttl=settings.document_store_ttl,
+        )
+    return _store
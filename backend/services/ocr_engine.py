@@ -0,0 +1,272 @@
+"""
+OCR Engine for DOMULEX
+Text of scanned PDFs via Tesseract, pages recognized in parallel.
+
+- Pages are rasterized one at a time (PyMuPDF, 8-bit grayscale) while
+  earlier pages are being recognized; at most two pages per worker are in
+  flight, so memory stays flat for an 80-page scan
+- Recognition runs in a bounded ProcessPoolExecutor shared by all requests
+  of the process (Tesseract is CPU-bound)
+- Page texts are joined in page order, whatever order the workers finish in
+- Per-document budgets: settings.ocr_max_pages and settings.ocr_timeout_seconds;
+  over budget, the pages recognized so far are returned (truncated=True)
+- Complete results are cached by SHA-256 of the PDF (Redis when enabled,
+  otherwise an in-process LRU)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+
+from cache import get_redis_client
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageImage:
+    """One rasterized page, picklable for the worker processes."""
+
+    index: int
+    width: int
+    height: int
+    samples: bytes  # 8-bit grayscale, row-major
+
+
+@dataclass
+class OCRResult:
+    """Recognized text of one PDF."""
+
+    text: str
+    pages: int  # pages recognized
+    page_count: int  # pages in the document
+    truncated: bool = False  # page or time budget exhausted
+    cached: bool = False
+
+
+def recognize_page(page: PageImage, lang: str, timeout: float) -> str:
+    """Tesseract on one page (runs in a worker process)."""
+    image = Image.frombytes("L", (page.width, page.height), page.samples)
+    return pytesseract.image_to_string(image, lang=lang, timeout=timeout)
+
+
+def _init_worker():
+    # One Tesseract thread per process - parallelism comes from the pool
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def rasterize(pdf: fitz.Document, dpi: int, max_pages: int) -> Iterator[PageImage]:
+    """Render pages lazily, one pixmap at a time."""
+    for index in range(min(pdf.page_count, max_pages)):
+        pixmap = pdf[index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        yield PageImage(
+            index=index, width=pixmap.width, height=pixmap.height, samples=pixmap.samples
+        )
+
+
+class OCREngine:
+    """
+    Page-parallel OCR of scanned PDFs.
+
+    extract_text blocks the calling thread until the document is done (or
+    its time budget is spent) - async callers run it via asyncio.to_thread.
+
+    Args:
+        workers: Size of the process pool
+        dpi: Rasterization resolution
+        lang: Tesseract languages
+        max_pages: Pages recognized per document
+        timeout: Seconds per document
+        cache_size: Results kept in process when Redis is not available
+        cache_ttl: Seconds results stay in Redis
+        recognize: Page function run in the workers (module-level, picklable)
+    """
+
+    PREFIX = "domulex:ocr:"
+
+    def __init__(
+        self,
+        workers: int = 2,
+        dpi: int = 300,
+        lang: str = "deu+eng",
+        max_pages: int = 100,
+        timeout: float = 120.0,
+        cache_size: int = 64,
+        cache_ttl: int = 86400,
+        recognize: Callable[[PageImage, str, float], str] = recognize_page,
+    ):
+        self.workers = max(workers, 1)
+        self.dpi = dpi
+        self.lang = lang
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.recognize = recognize
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process with gRPC/uvicorn threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def cache_key(self, pdf_bytes: bytes) -> str:
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        return f"{self.PREFIX}{digest}:{self.dpi}:{self.lang}:{self.max_pages}"
+
+    def _cache_get(self, key: str) -> Optional[OCRResult]:
+        payload = None
+        client = get_redis_client()
+        if client is not None:
+            try:
+                payload = client.get(key)
+            except Exception as e:
+                logger.warning(f"OCR cache read failed: {e}")
+        if payload is None:
+            with self._lock:
+                payload = self._cache.get(key)
+                if payload is not None:
+                    self._cache.move_to_end(key)
+        if payload is None:
+            return None
+        return OCRResult(**{**json.loads(payload), "cached": True})
+
+    def _cache_set(self, key: str, result: OCRResult):
+        payload = json.dumps(asdict(result))
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.setex(key, self.cache_ttl, payload)
+                return
+            except Exception as e:
+                logger.warning(f"OCR cache write failed: {e}")
+        with self._lock:
+            self._cache[key] = payload
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _collect(item: Tuple[int, Future], texts: Dict[int, str], deadline: float):
+        """Wait for one page; raises TimeoutError when the document budget is spent."""
+        index, future = item
+        try:
+            texts[index] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except TimeoutError:
+            raise
+        except Exception as e:
+            # Tesseract timeout or crash on one page - keep the others
+            logger.warning(f"⚠️ OCR page {index + 1} failed: {e}")
+            texts[index] = ""
+
+    def extract_text(self, pdf_bytes: bytes) -> OCRResult:
+        """OCR text of a PDF, pages in order (blocking)."""
+        key = self.cache_key(pdf_bytes)
+        cached = self._cache_get(key)
+        if cached is not None:
+            logger.info(f"✅ OCR cache hit ({cached.pages} pages)")
+            return cached
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        pool = self._executor()
+        texts: Dict[int, str] = {}
+        pending: Deque[Tuple[int, Future]] = deque()
+        timed_out = False
+
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+            page_count = pdf.page_count
+            try:
+                for page in rasterize(pdf, self.dpi, self.max_pages):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError
+                    future = pool.submit(self.recognize, page, self.lang, remaining)
+                    pending.append((page.index, future))
+                    while len(pending) >= 2 * self.workers:
+                        self._collect(pending.popleft(), texts, deadline)
+                while pending:
+                    self._collect(pending.popleft(), texts, deadline)
+            except TimeoutError:
+                timed_out = True
+                for _, future in pending:
+                    future.cancel()
+                logger.warning(
+                    f"⚠️ OCR time budget ({self.timeout:.0f}s) spent after {len(texts)} pages"
+                )
+
+        result = OCRResult(
+            text="\n\n".join(texts[i] for i in sorted(texts) if texts[i].strip()).strip(),
+            pages=len(texts),
+            page_count=page_count,
+            truncated=timed_out or page_count > self.max_pages,
+        )
+        logger.info(
+            f"✅ OCR extracted {len(result.text)} characters from {result.pages}/{page_count} pages "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        if not timed_out:
+            # Time-budget results depend on load - only cache complete runs
+            self._cache_set(key, result)
+        return result
+
+    async def extract_text_async(self, pdf_bytes: bytes) -> OCRResult:
+        return await asyncio.to_thread(self.extract_text, pdf_bytes)
+
+
+# Process-wide engine (one process pool per API worker)
+_engine: Optional[OCREngine] = None
+
+
+def get_ocr_engine() -> OCREngine:
+    """Get the shared OCR engine, configured from settings."""
+    global _engine
+
+    if _engine is None:
+        settings = get_settings()
+        _engine = OCREngine(
+            workers=settings.ocr_workers,
+            dpi=settings.ocr_dpi,
+            lang=settings.ocr_languages,
+            max_pages=settings.ocr_max_pages,
+            timeout=settings.ocr_timeout_seconds,
+            cache_size=settings.ocr_cache_size,
+            cache_ttl=settings.ocr_cache_ttl,
+        )
+    return _engine
+
+
+def shutdown_ocr_engine():
+    """Stop the worker processes (FastAPI lifespan shutdown)."""
+    global _engine
+
+    if _engine is not None:
+        _engine.shutdown()
+        _engine = None
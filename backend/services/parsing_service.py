@@ -0,0 +1,197 @@
+"""
+Document Parsing Service for DOMULEX
+Runs DocumentParser off the event loop, shared by all upload endpoints.
+
+Routing by format and size:
+- inline: small TXT/CSV files (decoding is cheaper than a thread hop)
+- thread: DOCX, HTML, XML, EML, RTF and larger text files
+- process: PDF, Excel, image OCR and any file from parse_process_min_bytes
+  (CPU-bound, would hold the GIL)
+
+Each format has its own concurrency limit, so a burst of Excel uploads
+cannot take all workers from PDFs. Every job has a timeout; a process pool
+with a job past its timeout is replaced so later jobs do not queue behind it.
+Scanned PDFs come back from the process pool without text and are then
+OCR'd by the shared OCR engine (services/ocr_engine.py).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from config import get_settings
+from services.document_parser import DocumentParser, DocumentParseResult, DocumentType
+
+logger = logging.getLogger(__name__)
+
+INLINE, THREAD, PROCESS = "inline", "thread", "process"
+
+ROUTES: Dict[DocumentType, str] = {
+    DocumentType.TXT: INLINE,
+    DocumentType.CSV: INLINE,
+    DocumentType.DOCX: THREAD,
+    DocumentType.HTML: THREAD,
+    DocumentType.XML: THREAD,
+    DocumentType.EML: THREAD,
+    DocumentType.RTF: THREAD,
+    DocumentType.PDF: PROCESS,
+    DocumentType.EXCEL: PROCESS,
+    DocumentType.IMAGE: PROCESS,
+}
+
+# Concurrent jobs per format (per API worker)
+FORMAT_LIMITS: Dict[DocumentType, int] = {
+    DocumentType.PDF: 4,
+    DocumentType.EXCEL: 2,
+    DocumentType.IMAGE: 2,
+}
+DEFAULT_FORMAT_LIMIT = 4
+
+
+def _parse_job(doc_type: DocumentType, file_bytes: bytes) -> DocumentParseResult:
+    """Worker-process entry point; OCR of scanned PDFs stays with the OCR engine."""
+    return DocumentParser.parse(doc_type, file_bytes, ocr=False)
+
+
+def _failed(doc_type: DocumentType, error: str) -> DocumentParseResult:
+    return DocumentParseResult(text="", doc_type=doc_type, char_count=0, word_count=0, error=error)
+
+
+class ParsingService:
+    """
+    Parses uploaded documents in a thread or process pool.
+
+    Args:
+        workers: Size of the process pool
+        timeout: Seconds per parse job (OCR has its own budget)
+        inline_max_bytes: Largest TXT/CSV parsed on the event loop
+        process_min_bytes: Files from this size always go to a process
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 60.0,
+        inline_max_bytes: int = 256 * 1024,
+        process_min_bytes: int = 5 * 1024 * 1024,
+    ):
+        self.workers = max(workers, 1)
+        self.timeout = timeout
+        self.inline_max_bytes = inline_max_bytes
+        self.process_min_bytes = process_min_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._limits: Dict[DocumentType, asyncio.Semaphore] = {}
+
+    def route(self, doc_type: DocumentType, size: int) -> str:
+        route = ROUTES.get(doc_type, THREAD)
+        if route == INLINE and size > self.inline_max_bytes:
+            route = THREAD
+        if size >= self.process_min_bytes:
+            route = PROCESS
+        return route
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process with gRPC/uvicorn threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """
+        Replace a pool whose worker is stuck. Jobs already queued there still
+        run (cancelling them would cancel other requests); the stuck job
+        finishes on its own and the old workers exit.
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _limit(self, doc_type: DocumentType) -> asyncio.Semaphore:
+        if doc_type not in self._limits:
+            self._limits[doc_type] = asyncio.Semaphore(
+                FORMAT_LIMITS.get(doc_type, DEFAULT_FORMAT_LIMIT)
+            )
+        return self._limits[doc_type]
+
+    async def _run(
+        self, route: str, doc_type: DocumentType, file_bytes: bytes
+    ) -> DocumentParseResult:
+        if route == INLINE:
+            return DocumentParser.parse(doc_type, file_bytes)
+        if route == THREAD:
+            return await asyncio.wait_for(
+                asyncio.to_thread(DocumentParser.parse, doc_type, file_bytes), self.timeout
+            )
+
+        pool = self._executor()
+        future = asyncio.get_running_loop().run_in_executor(pool, _parse_job, doc_type, file_bytes)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self._discard_pool(pool)
+            raise
+
+    async def parse(self, file_bytes: bytes, filename: str) -> DocumentParseResult:
+        """Extracted text of an uploaded file; errors are returned in the result."""
+        doc_type = DocumentParser.detect_document_type(filename or "")
+        route = self.route(doc_type, len(file_bytes))
+        logger.info(f"📄 Parsing {doc_type.value} document ({route}): {filename}")
+
+        try:
+            async with self._limit(doc_type):
+                result = await self._run(route, doc_type, file_bytes)
+                if DocumentParser.needs_ocr(result):
+                    logger.info("📄 PDF has little/no extractable text, trying OCR...")
+                    result = await asyncio.to_thread(DocumentParser.parse_pdf, file_bytes)
+            return result
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Parsing {filename} timed out after {self.timeout:.0f}s")
+            return _failed(
+                doc_type, f"Zeitüberschreitung beim Verarbeiten der Datei ({self.timeout:.0f}s)"
+            )
+        except Exception as e:
+            logger.error(f"❌ Document parsing failed: {e}")
+            return _failed(doc_type, str(e))
+
+
+# Process-wide service (one process pool per API worker)
+_service: Optional[ParsingService] = None
+
+
+def get_parsing_service() -> ParsingService:
+    """Get the shared parsing service, configured from settings."""
+    global _service
+
+    if _service is None:
+        settings = get_settings()
+        _service = ParsingService(
+            workers=settings.parse_workers,
+            timeout=settings.parse_timeout_seconds,
+            inline_max_bytes=settings.parse_inline_max_bytes,
+            process_min_bytes=settings.parse_process_min_bytes,
+        )
+    return _service
+
+
+def shutdown_parsing_service():
+    """Stop the worker processes (FastAPI lifespan shutdown)."""
+    global _service
+
+    if _service is not None:
+        _service.shutdown()
+        _service = None
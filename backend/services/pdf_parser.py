@@ -12,11 +12,9 @@ from enum import Enum
 
 import fitz  # PyMuPDF
 from pydantic import BaseModel, Field
-import pytesseract
-from pdf2image import convert_from_bytes
-from PIL import Image
 
 from models import Jurisdiction, UserRole
+from services.ocr_engine import get_ocr_engine
 
 
 logger = logging.getLogger(__name__)
@@ -72,6 +70,7 @@ class PDFParser:
     def extract_text_with_ocr(pdf_bytes: bytes) -> str:
         """
         Extract text from scanned PDF using OCR (Tesseract).
+        Pages are recognized in parallel by the shared OCR engine.
         
         Args:
             pdf_bytes: Raw PDF file bytes
@@ -82,24 +81,7 @@ class PDFParser:
         logger.info("🔍 Using OCR to extract text from scanned PDF...")
         
         try:
-            # Convert PDF pages to images
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-            logger.info(f"📄 Converted PDF to {len(images)} images")
-            
-            full_text = []
-            
-            for i, image in enumerate(images):
-                # Run OCR on each page (German + English)
-                text = pytesseract.image_to_string(image, lang='deu+eng')
-                if text.strip():
-                    full_text.append(text)
-                logger.debug(f"📝 OCR page {i+1}: {len(text)} characters")
-            
-            extracted = "\n\n".join(full_text).strip()
-            logger.info(f"✅ OCR extracted {len(extracted)} characters from {len(images)} pages")
-            
-            return extracted
-            
+            return get_ocr_engine().extract_text(pdf_bytes).text
         except Exception as e:
             logger.error(f"❌ OCR extraction failed: {e}")
             raise ValueError(f"OCR extraction failed: {str(e)}")
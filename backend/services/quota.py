@@ -0,0 +1,413 @@
+"""
+Quota Counter for AI Queries
+Fast check/increment in front of the Firestore `queriesUsed` field.
+
+- Counter: Redis hash per user (shared by all instances) or an in-process
+  dict when Redis is unavailable. Loaded from Firestore once per
+  quota_cache_ttl, then answered without touching Firestore. Load and
+  increment are Lua scripts: a hash always holds used and limit together,
+  and an expired hash is reloaded instead of being recreated by HINCRBY.
+- Flusher: background task that writes the aggregated per-user deltas to
+  Firestore every quota_flush_interval seconds with Increment() in
+  batched writes (no read-modify-write transactions).
+- Reconciliation: periodically re-queues deltas of flushes that never
+  finished (crashed worker) and drops stale in-process counters.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from cache import get_redis_client
+from config import get_settings
+from services.user_service import PLAN_LIMITS, get_user_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _QuotaState:
+    used: int
+    limit: int
+    expires_at: float
+
+
+class QuotaCounter:
+    """
+    Per-user AI query counter.
+
+    check() and increment() only hit Firestore on a cache miss; all
+    increments are written back asynchronously by the flusher.
+    """
+
+    PREFIX = "domulex:quota:user:"
+    PENDING_KEY = "domulex:quota:pending"
+    FLUSHING_PREFIX = "domulex:quota:flushing:"
+
+    # Firestore allows 500 writes per batch
+    FIRESTORE_BATCH_SIZE = 500
+
+    # KEYS: user hash; ARGV: used, limit, ttl. Keeps a complete hash loaded by another instance.
+    LOAD_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], 'limit') == 0 then
+    redis.call('HSET', KEYS[1], 'used', ARGV[1], 'limit', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return redis.call('HMGET', KEYS[1], 'used', 'limit')
+"""
+    # KEYS: user hash, pending hash; ARGV: user id, amount. Nil if the hash expired.
+    INCREMENT_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], 'limit') == 0 then
+    return false
+end
+redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[2])
+return redis.call('HINCRBY', KEYS[1], 'used', ARGV[2])
+"""
+
+    def __init__(
+        self,
+        user_service=None,
+        flush_interval: Optional[float] = None,
+        reconcile_interval: Optional[int] = None,
+        cache_ttl: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.user_service = user_service or get_user_service()
+        self.flush_interval = (
+            flush_interval if flush_interval is not None else settings.quota_flush_interval
+        )
+        self.reconcile_interval = (
+            reconcile_interval if reconcile_interval is not None
+            else settings.quota_reconcile_interval
+        )
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.quota_cache_ttl
+        # Flushes older than this are considered crashed and re-queued
+        self.stale_flush_after = max(60, int(self.flush_interval * 10))
+
+        # In-process fallback
+        self._local: Dict[str, _QuotaState] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Firestore
+    # ------------------------------------------------------------------
+
+    def _load(self, user_id: str) -> Optional[Tuple[int, int]]:
+        """(queriesUsed, queriesLimit) from Firestore, None for unknown users."""
+        user = self.user_service.get_user(user_id)
+        if not user:
+            return None
+        return user.get("queriesUsed", 0) or 0, user.get("queriesLimit", PLAN_LIMITS["free"])
+
+    def _write_deltas(self, deltas: Dict[str, int]) -> Dict[str, int]:
+        """
+        Apply deltas with Increment() in batched writes.
+
+        Returns:
+            Deltas that could not be written (to be re-queued)
+        """
+        db = self.user_service.db
+        if db is None:
+            return deltas
+
+        failed: Dict[str, int] = {}
+        items = list(deltas.items())
+        for start in range(0, len(items), self.FIRESTORE_BATCH_SIZE):
+            chunk = items[start:start + self.FIRESTORE_BATCH_SIZE]
+            batch = db.batch()
+            for user_id, delta in chunk:
+                batch.update(db.collection("users").document(user_id), {
+                    "queriesUsed": firestore.Increment(delta),
+                    "lastQueryAt": firestore.SERVER_TIMESTAMP,
+                })
+            try:
+                batch.commit()
+                continue
+            except Exception as e:
+                logger.warning(f"Quota batch write failed, retrying per user: {e}")
+
+            # One bad document (e.g. deleted user) fails the whole batch
+            for user_id, delta in chunk:
+                try:
+                    db.collection("users").document(user_id).update({
+                        "queriesUsed": firestore.Increment(delta),
+                        "lastQueryAt": firestore.SERVER_TIMESTAMP,
+                    })
+                except NotFound:
+                    logger.warning(f"Dropping quota delta for missing user {user_id}")
+                except Exception:
+                    failed[user_id] = delta
+        return failed
+
+    # ------------------------------------------------------------------
+    # Counter storage (Redis or in-process)
+    # ------------------------------------------------------------------
+
+    def _state(self, user_id: str) -> Optional[Tuple[int, int]]:
+        """Current (used, limit), loading from Firestore on a cache miss."""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                used, limit = client.hmget(self.PREFIX + user_id, "used", "limit")
+                if used is not None and limit is not None:
+                    return int(used), int(limit)
+                loaded = self._load(user_id)
+                if loaded is None:
+                    return None
+                # Firestore lags by the deltas not flushed yet
+                pending = int(client.hget(self.PENDING_KEY, user_id) or 0)
+                used, limit = client.register_script(self.LOAD_SCRIPT)(
+                    keys=[self.PREFIX + user_id],
+                    args=[loaded[0] + pending, loaded[1], self.cache_ttl],
+                )
+                return int(used), int(limit)
+            except Exception as e:
+                logger.warning(f"Quota Redis unavailable, using local counter: {e}")
+
+        now = time.monotonic()
+        with self._lock:
+            state = self._local.get(user_id)
+            if state is not None and state.expires_at > now:
+                return state.used, state.limit
+        loaded = self._load(user_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            used = loaded[0] + self._pending.get(user_id, 0)
+            self._local[user_id] = _QuotaState(used, loaded[1], now + self.cache_ttl)
+        return used, loaded[1]
+
+    def _local_fast_path(self, user_id: str) -> Optional[_QuotaState]:
+        """Fresh in-process state when Redis is off - no thread hop needed."""
+        if get_redis_client() is not None:
+            return None
+        with self._lock:
+            state = self._local.get(user_id)
+        if state is not None and state.expires_at > time.monotonic():
+            return state
+        return None
+
+    def _increment(self, user_id: str, amount: int) -> Optional[int]:
+        if self._state(user_id) is None:
+            return None  # unknown user - nothing to count in Firestore
+        client = get_redis_client()
+        if client is not None:
+            try:
+                increment = client.register_script(self.INCREMENT_SCRIPT)
+                keys = [self.PREFIX + user_id, self.PENDING_KEY]
+                used = increment(keys=keys, args=[user_id, amount])
+                if used is None:
+                    # Hash expired since _state(): reload it, then count
+                    if self._state(user_id) is None:
+                        return None
+                    used = increment(keys=keys, args=[user_id, amount])
+                if used is None:
+                    client.hincrby(self.PENDING_KEY, user_id, amount)  # still counted in Firestore
+                    return None
+                return int(used)
+            except Exception as e:
+                logger.warning(f"Quota Redis unavailable, using local counter: {e}")
+
+        with self._lock:
+            self._pending[user_id] = self._pending.get(user_id, 0) + amount
+            state = self._local.get(user_id)
+            if state is None:
+                return None
+            state.used += amount
+            return state.used
+
+    def _take_pending(self) -> Tuple[Dict[str, int], Optional[str]]:
+        """Atomically take all pending deltas (Redis: RENAME to a flushing key)."""
+        deltas: Dict[str, int] = {}
+        token = None
+        client = get_redis_client()
+        if client is not None:
+            token = f"{self.FLUSHING_PREFIX}{int(time.time())}:{uuid.uuid4().hex}"
+            try:
+                client.rename(self.PENDING_KEY, token)
+                deltas = {user_id: int(delta) for user_id, delta in client.hgetall(token).items()}
+            except Exception:
+                token = None  # nothing pending (RENAME of a missing key fails)
+
+        with self._lock:
+            for user_id, delta in self._pending.items():
+                deltas[user_id] = deltas.get(user_id, 0) + delta
+            self._pending.clear()
+        return deltas, token
+
+    def _requeue(self, deltas: Dict[str, int]):
+        client = get_redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for user_id, delta in deltas.items():
+                    pipe.hincrby(self.PENDING_KEY, user_id, delta)
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Quota re-queue to Redis failed, keeping deltas locally: {e}")
+        with self._lock:
+            for user_id, delta in deltas.items():
+                self._pending[user_id] = self._pending.get(user_id, 0) + delta
+
+    def _finish(self, token: Optional[str]):
+        client = get_redis_client()
+        if token and client is not None:
+            try:
+                client.delete(token)
+            except Exception as e:
+                logger.warning(f"Could not remove quota flush marker {token}: {e}")
+
+    def _reconcile(self) -> int:
+        requeued = 0
+        client = get_redis_client()
+        if client is not None:
+            cutoff = time.time() - self.stale_flush_after
+            for key in client.scan_iter(match=f"{self.FLUSHING_PREFIX}*"):
+                try:
+                    started = int(key[len(self.FLUSHING_PREFIX):].split(":", 1)[0])
+                except ValueError:
+                    continue
+                if started >= cutoff:
+                    continue  # flush still in progress
+                deltas = {user_id: int(delta) for user_id, delta in client.hgetall(key).items()}
+                self._requeue(deltas)
+                client.delete(key)
+                requeued += len(deltas)
+
+        now = time.monotonic()
+        with self._lock:
+            for user_id in [u for u, s in self._local.items() if s.expires_at <= now]:
+                del self._local[user_id]
+        return requeued
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def check(self, user_id: str) -> Tuple[bool, int, int]:
+        """
+        Check if the user has remaining queries.
+
+        Returns:
+            Tuple of (can_query, queries_used, queries_limit)
+        """
+        cached = self._local_fast_path(user_id)
+        if cached is not None:
+            return cached.used < cached.limit, cached.used, cached.limit
+        try:
+            state = await asyncio.to_thread(self._state, user_id)
+        except Exception as e:
+            logger.error(f"Error checking query limit for user {user_id}: {e}")
+            return False, 0, 0
+        if state is None:
+            return False, 0, 0
+        used, limit = state
+        return used < limit, used, limit
+
+    async def increment(self, user_id: str, amount: int = 1) -> Optional[int]:
+        """Count queries for a user. Returns the new count or None for unknown users."""
+        if self._local_fast_path(user_id) is not None:
+            return self._increment(user_id, amount)  # dict update only
+        try:
+            return await asyncio.to_thread(self._increment, user_id, amount)
+        except Exception as e:
+            logger.error(f"Error incrementing query count for user {user_id}: {e}")
+            return None
+
+    def invalidate(self, user_id: str, drop_pending: bool = False):
+        """
+        Forget the cached counter of a user (plan change, monthly reset).
+
+        drop_pending discards unflushed increments - used on monthly reset
+        so last month's queries don't count against the new period.
+        """
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.delete(self.PREFIX + user_id)
+                if drop_pending:
+                    client.hdel(self.PENDING_KEY, user_id)
+            except Exception as e:
+                logger.warning(f"Quota invalidation failed for {user_id}: {e}")
+        with self._lock:
+            self._local.pop(user_id, None)
+            if drop_pending:
+                self._pending.pop(user_id, None)
+
+    async def flush(self) -> int:
+        """Write pending deltas to Firestore. Returns the number of users written."""
+        deltas, token = await asyncio.to_thread(self._take_pending)
+        if not deltas:
+            await asyncio.to_thread(self._finish, token)
+            return 0
+        try:
+            failed = await asyncio.to_thread(self._write_deltas, deltas)
+        except Exception as e:
+            logger.error(f"Quota flush failed: {e}")
+            failed = deltas
+        if failed:
+            await asyncio.to_thread(self._requeue, failed)
+        await asyncio.to_thread(self._finish, token)
+        written = len(deltas) - len(failed)
+        if written:
+            logger.debug(f"Flushed query counts for {written} users")
+        return written
+
+    async def reconcile(self) -> int:
+        """Re-queue deltas of crashed flushes and drop stale local counters."""
+        requeued = await asyncio.to_thread(self._reconcile)
+        if requeued:
+            logger.warning(f"Re-queued unfinished quota deltas for {requeued} users")
+        return requeued
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_reconcile = loop.time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if loop.time() - last_reconcile >= self.reconcile_interval:
+                    last_reconcile = loop.time()
+                    await self.reconcile()
+            except Exception as e:
+                logger.error(f"Quota flusher error: {e}")
+
+    def start(self):
+        """Start the background flusher (called from lifespan startup)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write what is left (called from lifespan shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Process-wide counter (initialized lazily)
+_quota_counter: Optional[QuotaCounter] = None
+
+
+def get_quota_counter() -> QuotaCounter:
+    """Get or create the QuotaCounter singleton."""
+    global _quota_counter
+    if _quota_counter is None:
+        _quota_counter = QuotaCounter()
+    return _quota_counter
@@ -10,6 +10,8 @@ from pydantic import BaseModel, Field
 from jinja2 import Template
 import google.generativeai as genai
 
+from models.legal import Jurisdiction
+
 logger = logging.getLogger(__name__)
 
 
@@ -412,13 +414,14 @@ class SchriftsatzGenerator:
             legal_context = ""
             if field.type == "long_text" and "begründung" in field.name.lower():
                 # Hole relevante Rechtsnormen
-                rag_result = await self.rag.search(
+                rag_result = await self.rag.retrieve(
                     query=f"Rechtliche Grundlagen für {field.label}",
-                    top_k=5
+                    target_jurisdiction=Jurisdiction.DE,
+                    limit=3
                 )
                 legal_sources = "\n".join([
-                    f"- {doc.title}: {doc.content[:200]}..."
-                    for doc in rag_result.results[:3]
+                    f"- {hit.document.title}: {hit.document.content_original[:200]}..."
+                    for hit in rag_result
                 ])
                 legal_context = f"\n\nRELEVANTE RECHTSNORMEN:\n{legal_sources}"
             
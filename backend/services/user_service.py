@@ -67,6 +67,11 @@ class UserService:
             logger.error(f"Error getting user {user_id}: {e}")
             return None
     
+    def _invalidate_quota(self, user_id: str, drop_pending: bool = False):
+        """Make the quota counter reload used/limit after a plan change."""
+        from services.quota import get_quota_counter
+        get_quota_counter().invalidate(user_id, drop_pending=drop_pending)
+    
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """
         Get user data by email.
@@ -135,6 +140,7 @@ class UserService:
             
             self.db.collection('users').document(user_id).update(update_data)
             
+            self._invalidate_quota(user_id)
             logger.info(f"✅ Updated subscription for user {user_id}: plan={plan}, limit={queries_limit}")
             return True
             
@@ -164,6 +170,7 @@ class UserService:
                 'updatedAt': firestore.SERVER_TIMESTAMP,
             })
             
+            self._invalidate_quota(user_id)
             logger.info(f"✅ Cancelled subscription for user {user_id}")
             return True
             
@@ -175,6 +182,9 @@ class UserService:
         """
         Increment user's query count and return new count.
         
+        Synchronous Firestore transaction - request handlers use the
+        buffered services.quota.QuotaCounter instead.
+        
         Args:
             user_id: Firebase Auth UID
             
@@ -265,6 +275,7 @@ class UserService:
                 'updatedAt': firestore.SERVER_TIMESTAMP,
             })
             
+            self._invalidate_quota(user_id, drop_pending=True)
             logger.info(f"✅ Reset monthly queries for user {user_id}")
             return True
             
@@ -311,6 +322,7 @@ class UserService:
             success = add_queries_in_transaction(transaction)
             
             if success:
+                self._invalidate_quota(user_id)
                 logger.info(f"✅ Added {queries} queries to user {user_id}")
             
             return success
@@ -2,12 +2,38 @@
 Pytest Configuration
 """
 
+import os
+
+# Offline reranker: the default cross-encoder would download its model at app startup
+os.environ.setdefault("RERANKER_BACKEND", "lexical")
+
 import pytest
 from fastapi.testclient import TestClient
 from qdrant_client import QdrantClient
 
 from main import app
 from config import get_settings
+from rag.embedder import HashingEmbedder
+from rag.embeddings import EmbeddingService
+
+
+class RecordingEmbeddings:
+    """Offline HashingEmbedder behind EmbeddingService that records every batch request."""
+
+    def __init__(self, dimension: int = 4096):
+        self.embedder = HashingEmbedder(dimension=dimension)
+        self.calls = []  # (task_type, texts) per model request
+
+    def embed_batch(self, texts, task_type):
+        self.calls.append((task_type, list(texts)))
+        return self.embedder.embed_batch(texts, task_type)
+
+    def service(self, **kwargs) -> EmbeddingService:
+        return EmbeddingService(**{"model": "test", "embed_batch": self.embed_batch, **kwargs})
+
+    def embedded(self, task_type: str = "retrieval_document") -> int:
+        """Texts sent to the model for task_type."""
+        return sum(len(texts) for call_type, texts in self.calls if call_type == task_type)
 
 
 @pytest.fixture
@@ -17,6 +43,12 @@ def client():
         yield test_client
 
 
+@pytest.fixture
+def recording_embeddings():
+    """Call-counting offline embeddings (recording_embeddings.service(...) builds the service)."""
+    return RecordingEmbeddings()
+
+
 @pytest.fixture
 def settings():
     """Get settings."""
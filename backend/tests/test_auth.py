@@ -0,0 +1,40 @@
+"""
+Tests for the authentication fast path (token and session caches)
+"""
+
+import time
+
+import pytest
+
+import auth
+
+
+@pytest.mark.asyncio
+async def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    """A repeated token is verified once; expired entries are re-verified."""
+    calls = []
+
+    def fake_verify(token):
+        calls.append(token)
+        exp = time.time() + (3600 if token == "valid" else -1)
+        return {"uid": "u1", "exp": exp}
+
+    monkeypatch.setattr(auth.auth, "verify_id_token", fake_verify)
+
+    for _ in range(3):
+        assert (await auth.verify_token("valid"))["uid"] == "u1"
+    assert calls == ["valid"]
+
+    await auth.verify_token("expired")
+    await auth.verify_token("expired")
+    assert calls == ["valid", "expired", "expired"]
+
+
+@pytest.mark.asyncio
+async def test_session_validation_uses_cached_session(monkeypatch):
+    """After register_session the new id is trusted without a Firestore read."""
+    auth._session_cache.put("u2", "session-new", time.time() + 30)
+    monkeypatch.setattr(auth, "get_firestore_db", lambda: pytest.fail("Firestore read"))
+
+    assert await auth.validate_session("u2", "session-new") is True
+    assert await auth.validate_session("u2", "session-old") is False
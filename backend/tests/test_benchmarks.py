@@ -0,0 +1,50 @@
+"""
+Tests for the retrieval benchmark harness
+"""
+
+import pytest
+
+from benchmarks.corpus import BenchmarkFixture, load_corpus
+from benchmarks.metrics import ndcg_at_k, percentile, recall_at_k, reciprocal_rank
+from benchmarks.runner import BenchmarkRunner, load_questions
+from rag.embedder import HashingEmbedder
+
+
+def test_ranking_metrics():
+    ranked = ["a", "x", "b", "y"]
+    gold = ["a", "b"]
+
+    assert recall_at_k(ranked, gold, 2) == 0.5
+    assert recall_at_k(ranked, gold, 4) == 1.0
+    assert reciprocal_rank(["x", "b"], gold, 10) == 0.5
+    assert ndcg_at_k(["a", "b"], gold, 10) == pytest.approx(1.0)
+    assert 0 < ndcg_at_k(ranked, gold, 10) < 1.0
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2], 95) == pytest.approx(1.95)
+
+
+def test_question_gold_ids_exist_in_corpus():
+    """Every gold source must be part of the benchmark corpus."""
+    source_ids = {document.source_id for document in load_corpus()}
+    for question in load_questions():
+        missing = set(question["gold"]) - source_ids
+        assert not missing, f"{question['id']}: {missing}"
+
+
+@pytest.mark.asyncio
+async def test_benchmark_runner_reports_quality_and_latency():
+    fixture = BenchmarkFixture(HashingEmbedder(dimension=256))
+    try:
+        await fixture.load()
+        runner = BenchmarkRunner(fixture, load_questions(), k=10)
+        results = await runner.evaluate()
+        throughput = await runner.throughput(concurrency=4, requests=20)
+    finally:
+        await fixture.close()
+
+    assert results["quality"]["questions"] > 0
+    assert 0 < results["quality"]["recall@10"] <= 1.0
+    assert results["isolation"]["foreign_jurisdiction_hits"] == 0
+    assert results["latency"]["p50_ms"] <= results["latency"]["p99_ms"]
+    assert throughput["requests"] == 20
+    assert throughput["searches_per_s"] > 0
@@ -0,0 +1,55 @@
+"""
+Tests for the legal text chunker
+"""
+
+from ingestion.chunker import LegalChunker, estimate_tokens, split_sections, split_units
+
+
+def test_abbreviations_do_not_end_sentences():
+    """Abs., Nr., S. and vgl. stay inside the sentence, dates and years end it."""
+    text = (
+        "Der Mieter hat gem. § 535 Abs. 1 S. 2 BGB Anspruch, vgl. BGH, Urt. v. 12.3.2020. "
+        "Die Miete ist am 3. Werktag fällig. Siehe Nr. 4 der Anlage."
+    )
+    units = [text[a:b].strip() for a, b in split_units(text)]
+    assert units == [
+        "Der Mieter hat gem. § 535 Abs. 1 S. 2 BGB Anspruch, vgl. BGH, Urt. v. 12.3.2020.",
+        "Die Miete ist am 3. Werktag fällig.",
+        "Siehe Nr. 4 der Anlage.",
+    ]
+
+
+def test_sections_from_statutes_and_judgments():
+    """Statute sections and judgment headings start new sections."""
+    text = (
+        "BGH, Urteil vom 09.07.2019\n\n"
+        "Leitsatz:\nDer Vermieter muss Schimmel beseitigen.\n\n"
+        "Gründe:\nDie Klage ist begründet.\n"
+        "§ 536 Mietminderung bei Sach- und Rechtsmängeln\nText.\n"
+    )
+    headings = [heading for _, _, heading in split_sections(text)]
+    assert headings == [
+        "", "Leitsatz:", "Gründe:", "§ 536 Mietminderung bei Sach- und Rechtsmängeln"
+    ]
+
+
+def test_chunks_respect_token_budget():
+    """Long sections are split within budget; continuation chunks repeat the heading."""
+    sentence = (
+        "Der Vermieter hat die Mietsache in einem zum vertragsgemäßen Gebrauch "
+        "geeigneten Zustand zu erhalten. "
+    )
+    text = "§ 535 Inhalt und Hauptpflichten des Mietvertrags\n" + sentence * 60
+    chunker = LegalChunker(max_tokens=120, overlap_tokens=20)
+
+    chunks = chunker.chunk(text)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 120 for chunk in chunks)
+    assert all(chunk.startswith("§ 535") for chunk in chunks)
+
+
+def test_small_sections_are_merged():
+    """Short sections share one chunk instead of one embedding each."""
+    text = "".join(f"§ {n} Kurz\nEin Satz.\n" for n in range(1, 6))
+    assert len(LegalChunker(max_tokens=512, overlap_tokens=64).chunk(text)) == 1
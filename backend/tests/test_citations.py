@@ -0,0 +1,128 @@
+"""
+Tests for the citation resolver (§ / Aktenzeichen lookup without embeddings)
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from models.legal import Jurisdiction
+from rag.citations import CitationIndex, CitationResolver, is_citation_only, payload_keys
+from rag.engine import RAGEngine
+
+STATUTE = {"jurisdiction": "DE", "doc_type": "GESETZ", "law_abbr": "BGB", "paragraph": "573c",
+           "title": "BGB § 573c - Fristen der ordentlichen Kündigung", "content": "..."}
+DECISION = {"jurisdiction": "DE", "doc_type": "URTEIL", "gerichtsebene": "BGH",
+            "aktenzeichen": "VIII ZR 242/13", "title": "BGH VIII ZR 242/13 - Schönheitsreparaturen",
+            "content": "...", "datum": "2015-03-18"}
+OTHER_COURT = {"jurisdiction": "DE", "doc_type": "URTEIL", "gerichtsebene": "LG",
+               "aktenzeichen": "VIII ZR 242/13", "title": "Gleiches Aktenzeichen", "content": "..."}
+
+
+def test_payload_keys_normalize_fields():
+    assert payload_keys(STATUTE) == ["§573c:bgb"]
+    assert payload_keys(DECISION) == ["az:viii zr 242/13"]
+    assert payload_keys({"section": "§ 652 BGB", "law": "Maklerrecht"}) == ["§652:bgb"]
+    assert payload_keys({"title": "Mietminderung bei Schimmel", "content": "§ 536 BGB"}) == []
+
+
+def test_is_citation_only():
+    assert is_citation_only("§ 573c BGB")
+    assert is_citation_only("Was regelt § 573c BGB?")
+    assert is_citation_only("BGH VIII ZR 242/13")
+    assert not is_citation_only("Kündigungsfrist für Mieter nach § 573c BGB")
+    assert not is_citation_only("Kündigungsfrist für Mieter")
+
+
+def test_index_lookup_filters_and_persistence():
+    index = CitationIndex.from_entries([("s", STATUTE), ("d", DECISION), ("o", OTHER_COURT)])
+
+    assert index.lookup("§573c:bgb", "DE") == ["s"]
+    assert index.lookup("§573c:bgb", "US") == []
+    assert index.lookup("§573c:bgb", "DE", source_filter=["URTEIL"]) == []
+    assert sorted(index.lookup("az:viii zr 242/13", "DE")) == ["d", "o"]
+    assert index.lookup("az:viii zr 242/13", "DE", court="BGH") == ["d"]
+
+    restored = CitationIndex.from_dict(index.to_dict())
+    assert restored.lookup("az:viii zr 242/13", "DE", court="BGH") == ["d"]
+
+    restored.add("n", {**STATUTE, "paragraph": "573"})
+    assert restored.lookup("§573:bgb", "DE") == ["n"]
+    assert restored.keys == sorted(restored.keys)
+
+
+def test_reupserted_point_replaces_its_entry():
+    index = CitationIndex.from_entries([("s", STATUTE), ("d", DECISION)])
+
+    index.add("s", {**STATUTE, "paragraph": "573", "jurisdiction": "US"})
+    assert index.lookup("§573c:bgb", "DE") == [] and index.lookup("§573:bgb", "DE") == []
+    assert index.lookup("§573:bgb", "US") == ["s"] and len(index) == 2
+
+    index.add("s", {"title": "Ohne Zitat", "jurisdiction": "DE"})
+    assert index.lookup("§573:bgb", "US") == [] and index.keys == sorted(index.keys)
+    assert index.lookup("az:viii zr 242/13", "DE") == ["d"]
+
+
+class NoEmbeddings:
+    """Fails the test if the engine tries to embed."""
+
+    model = "none"
+
+    async def embed(self, text, task_type="retrieval_query"):
+        raise AssertionError("citation query must not be embedded")
+
+    async def embed_many(self, texts, task_type="retrieval_query"):
+        raise AssertionError("citation query must not be embedded")
+
+
+@pytest.mark.asyncio
+async def test_citation_query_skips_embedding(tmp_path):
+    qdrant = AsyncQdrantClient(location=":memory:")
+    await qdrant.create_collection(
+        "docs", vectors_config=VectorParams(size=4, distance=Distance.COSINE)
+    )
+    await qdrant.upsert("docs", points=[
+        PointStruct(id=f"00000000-0000-0000-0000-00000000000{i}", vector=vector, payload=payload)
+        for i, vector, payload in ((1, [1, 0, 0, 0], STATUTE), (2, [0, 1, 0, 0], DECISION))
+    ])
+    engine = RAGEngine(qdrant, "test", collection_name="docs", vector_size=4,
+                       embedding_service=NoEmbeddings(), hybrid=False)
+    engine.citations = CitationResolver(qdrant, "docs", path=str(tmp_path / "citations.json"))
+    await engine.citations.build()
+
+    hits = await engine.retrieve("Was regelt § 573c BGB?", Jurisdiction.DE)
+    assert [hit.document.title for hit in hits] == [STATUTE["title"]]
+    assert hits[0].score == 1.0
+
+    hits = await engine.retrieve("BGH VIII ZR 242/13", Jurisdiction.DE)
+    assert [hit.document.title for hit in hits] == [DECISION["title"]]
+
+    # Persisted index is loaded by a fresh resolver, no temp file is left behind
+    resolver = CitationResolver(qdrant, "docs", path=str(tmp_path / "citations.json"))
+    assert resolver.resolve("§ 573c BGB", "DE") == ["00000000-0000-0000-0000-000000000001"]
+    assert [path.name for path in tmp_path.iterdir()] == ["citations.json"]
+    await qdrant.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_and_upserts_during_build(tmp_path):
+    path = str(tmp_path / "citations.json")
+    index = CitationIndex.from_entries([("s", STATUTE)])
+    resolvers = [CitationResolver(None, "docs", path=path) for _ in range(4)]
+    await asyncio.gather(*(
+        asyncio.to_thread(resolver._save, index) for resolver in resolvers for _ in range(5)
+    ))
+    assert [p.name for p in tmp_path.iterdir()] == ["citations.json"]
+
+    class UpsertDuringScroll:
+        async def scroll(self, collection_name, limit, offset, with_payload, with_vectors):
+            resolver.add_points([SimpleNamespace(id="d", payload=DECISION)])
+            return [SimpleNamespace(id="s", payload=STATUTE)], None
+
+    resolver = CitationResolver(UpsertDuringScroll(), "docs", path=path)
+    await resolver.build()
+    assert resolver.resolve("VIII ZR 242/13", "DE") == ["d"]
+    assert CitationResolver(None, "docs", path=path).resolve("§ 573c BGB", "DE") == ["s"]
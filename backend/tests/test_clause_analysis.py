@@ -0,0 +1,73 @@
+"""
+Tests for the clause analysis pipeline of /analyze_contract
+"""
+
+import pytest
+
+from models.legal import Jurisdiction, LegalDocument, ScoredDocument, UserRole
+from services.clause_analysis import NO_LEGAL_CONTEXT, NOT_ANALYSED, ClauseAnalysisPipeline
+from services.pdf_parser import RiskLevel
+
+CLAUSES = [
+    {"type": "Kaution", "text": "Der Mieter leistet eine Kaution von vier Monatsmieten."},
+    {"type": "Kündigung", "text": "Die Kündigungsfrist beträgt für den Mieter sechs Monate."},
+]
+
+STATUTE = LegalDocument(
+    jurisdiction=Jurisdiction.DE,
+    title="BGB § 551 - Begrenzung und Anlage von Mietsicherheiten",
+    content_original="Die Sicherheit darf höchstens das Dreifache der Monatsmiete betragen.",
+    source_url="https://www.gesetze-im-internet.de/bgb/__551.html",
+    publication_date="2002-01-01",
+    document_type="statute",
+    language="de",
+)
+
+
+class StubEngine:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def retrieve_many(self, queries):
+        self.calls.append(queries)
+        if self.fail:
+            raise RuntimeError("Qdrant nicht erreichbar")
+        return [[ScoredDocument(document=STATUTE, score=0.9)] for _ in queries]
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class ClauseModel:
+    """Valid verdict for the deposit clause, a JSON list (unusable) for the others."""
+
+    def generate_content(self, prompt):
+        if "Kaution" in prompt:
+            return Response(
+                '{"risk_level": "RED", "comparison": "Mehr als drei Monatsmieten", '
+                '"recommendation": "Kürzen"}'
+            )
+        return Response("[]")
+
+
+@pytest.mark.asyncio
+async def test_failed_clause_is_reported_not_analysed():
+    engine = StubEngine()
+    pipeline = ClauseAnalysisPipeline(engine, ClauseModel(), max_concurrency=2)
+    analyses = await pipeline.analyze(CLAUSES, Jurisdiction.DE, UserRole.TENANT)
+
+    assert len(engine.calls) == 1 and len(engine.calls[0]) == 2
+    deposit, termination = analyses
+    assert deposit.risk_level == RiskLevel.RED and deposit.source_title == STATUTE.title
+    assert termination.clause_type == "Kündigung" and termination.clause_text == CLAUSES[1]["text"]
+    assert termination.risk_level == RiskLevel.YELLOW and termination.comparison == NOT_ANALYSED
+
+
+@pytest.mark.asyncio
+async def test_retrieval_failure_falls_back_to_general_law():
+    pipeline = ClauseAnalysisPipeline(StubEngine(fail=True), ClauseModel())
+    deposit, _ = await pipeline.analyze(CLAUSES, Jurisdiction.DE, UserRole.TENANT)
+    assert deposit.legal_standard.startswith(NO_LEGAL_CONTEXT[:50]) and deposit.source_title is None
@@ -0,0 +1,82 @@
+"""
+Tests for the context assembler (chunk merge, dedup, token budget)
+"""
+
+from models.legal import Jurisdiction, LegalDocument
+from rag.context import ContextAssembler, MinHasher, estimate_tokens, merge_overlapping
+
+TEXT = (
+    "Der Vermieter kann die Zustimmung zu einer Erhöhung der Miete bis zur ortsüblichen "
+    "Vergleichsmiete verlangen, wenn die Miete in dem Zeitpunkt, zu dem die Erhöhung "
+    "eintreten soll, seit 15 Monaten unverändert ist. Das Mieterhöhungsverlangen kann "
+    "frühestens ein Jahr nach der letzten Mieterhöhung geltend gemacht werden. Erhöhungen "
+    "nach den §§ 559 bis 560 werden nicht berücksichtigt. Die ortsübliche Vergleichsmiete "
+    "wird gebildet aus den üblichen Entgelten."
+)
+
+
+def _doc(title: str, content: str, document_hash=None, chunk_index=None) -> LegalDocument:
+    return LegalDocument(
+        jurisdiction=Jurisdiction.DE,
+        title=title,
+        content_original=content,
+        publication_date="2020-01-01",
+        document_type="Gesetz",
+        language="de",
+        document_hash=document_hash,
+        chunk_index=chunk_index,
+    )
+
+
+def test_merge_overlapping_removes_repeated_text():
+    first, second = TEXT[:220], TEXT[150:]
+    assert merge_overlapping(first, second) == TEXT
+    merged = merge_overlapping("Erster Teil.", "Zweiter Teil ohne Overlap.")
+    assert merged == "Erster Teil.\nZweiter Teil ohne Overlap."
+
+
+def test_minhash_detects_near_duplicates():
+    hasher = MinHasher()
+    original = hasher.signature(TEXT)
+    reworded = hasher.signature(TEXT.replace("15 Monaten", "fünfzehn Monaten"))
+    unrelated = hasher.signature("Der Makler hat Anspruch auf Provision.")
+    assert hasher.similarity(original, reworded) > 0.8
+    assert hasher.similarity(original, unrelated) < 0.2
+
+
+def test_assembler_merges_chunks_and_drops_duplicates():
+    docs = [
+        _doc("BGB § 558", TEXT[150:], document_hash="h1", chunk_index=1),
+        _doc("Kommentar", TEXT + " "),  # same text from another source
+        _doc("BGB § 558", TEXT[:220], document_hash="h1", chunk_index=0),
+        _doc(
+            "BGB § 556d",
+            "Mietpreisbremse: Die Miete darf die ortsübliche Vergleichsmiete "
+            "um höchstens 10 % übersteigen.",
+        ),
+    ]
+    context = ContextAssembler().assemble(docs)
+
+    assert [doc.title for doc in context.sources] == ["BGB § 558", "BGB § 556d"]
+    assert context.dropped_duplicates == 1
+    assert context.text.count(TEXT[150:220]) == 1
+    assert TEXT in context.text
+
+
+def test_assembler_budget_caps_and_upload_priority():
+    long_docs = [
+        _doc(f"Quelle {i}", " ".join(f"wort{i}x{j}" for j in range(2000))) for i in range(5)
+    ]
+    upload = {"text": "Mietvertrag: " + "Klausel " * 10000}
+    assembler = ContextAssembler(token_budget=2000, source_max_tokens=400, upload_share=0.5)
+
+    context = assembler.assemble(long_docs, [upload])
+    assert context.text.startswith("📎 HOCHGELADENES DOKUMENT:")
+    assert estimate_tokens(context.uploads) <= 1010
+    assert context.tokens <= 2000
+    # Two full sources, the third cut to the remaining budget
+    assert len(context.sources) == 3
+    assert context.dropped_sources == 2
+
+    # Without uploads the whole budget goes to retrieved sources
+    assert len(assembler.assemble(long_docs).sources) == 5
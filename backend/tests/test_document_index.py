@@ -0,0 +1,110 @@
+"""
+Tests for the per-lawyer document index (CRM and generated document search)
+"""
+
+import pytest
+
+from services.document_index import DocumentIndex, rerank
+from services.document_search import DocumentSearchService
+
+DOCUMENTS = {
+    "kuendigung": "Kündigung des Mietverhältnisses wegen Eigenbedarf, Frist drei Monate",
+    "kaution": "Rückforderung der Mietkaution nach Auszug, Abrechnung des Kautionskontos",
+    "nebenkosten": "Widerspruch gegen die Nebenkostenabrechnung, Heizkosten und Grundsteuer",
+}
+
+
+@pytest.mark.asyncio
+async def test_search_embeds_each_document_once(recording_embeddings):
+    index = DocumentIndex(recording_embeddings.service(cache_size=0))
+    await index.sync("lawyer-1", DOCUMENTS, complete=True)
+    await index.sync("lawyer-1", DOCUMENTS, complete=True)
+    assert recording_embeddings.embedded() == 3
+
+    hits = await index.search("lawyer-1", "Mietkaution zurückfordern", limit=2)
+    assert hits[0][0] == "kaution" and len(hits) == 2
+    assert await index.search("lawyer-2", "Mietkaution", limit=2) == []
+
+    # Unrelated queries find nothing above the minimum score
+    unrelated = "Grunderwerbsteuer Photovoltaik"
+    assert await index.search("lawyer-1", unrelated, limit=3, min_score=0.3) == []
+
+    # Filters restrict the hits to candidate IDs
+    hits = await index.search(
+        "lawyer-1", "Mietkaution", limit=5, candidates=["kuendigung", "nebenkosten"]
+    )
+    assert {doc_id for doc_id, _ in hits} == {"kuendigung", "nebenkosten"}
+
+
+@pytest.mark.asyncio
+async def test_incremental_create_update_delete(recording_embeddings):
+    index = DocumentIndex(recording_embeddings.service(cache_size=0))
+    await index.sync("lawyer-1", DOCUMENTS, complete=True)
+
+    assert await index.upsert("lawyer-1", "kaution", DOCUMENTS["kaution"]) is False  # unchanged
+    assert await index.upsert("lawyer-1", "mietminderung", "Mietminderung wegen Schimmel im Bad")
+    assert recording_embeddings.embedded() == 4
+    best = await index.search("lawyer-1", "Schimmel Mietminderung", limit=1)
+    assert best[0][0] == "mietminderung"
+
+    index.remove("lawyer-1", "mietminderung")
+    assert index.size("lawyer-1") == 3
+
+    # A complete listing drops documents deleted elsewhere, re-embeds only changed ones
+    listing = dict(DOCUMENTS, kaution="Kaution: Klage auf Rückzahlung eingereicht")
+    del listing["nebenkosten"]
+    assert await index.sync("lawyer-1", listing, complete=True) == 1
+    assert index.size("lawyer-1") == 2
+
+
+class FakeModel:
+    def __init__(self, text):
+        self.text = text
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return self
+
+
+@pytest.mark.asyncio
+async def test_rerank_is_one_call_for_the_top_hits():
+    model = FakeModel(
+        '[{"nr": 1, "score": 0.2, "begruendung": "Nur am Rande"}, {"nr": 2, "score": 0.9}]'
+    )
+    reranked = await rerank(model, "Kaution", [("a", "Nebenkosten"), ("b", "Kaution")])
+    assert len(model.prompts) == 1
+    assert reranked == {"a": (0.2, "Nur am Rande"), "b": (0.9, "")}
+
+    assert await rerank(FakeModel("keine Zahl"), "Kaution", [("a", "Nebenkosten")]) == {}
+
+
+@pytest.mark.asyncio
+async def test_generated_document_search_without_rerank(recording_embeddings):
+    index = DocumentIndex(recording_embeddings.service(cache_size=0))
+    service = DocumentSearchService(gemini_api_key="test", index=index)
+    documents = [
+        {"id": doc_id, "templateName": "Schreiben", "content": text}
+        for doc_id, text in DOCUMENTS.items()
+    ]
+    results = await service.search_documents(
+        documents, "Nebenkostenabrechnung Heizkosten",
+        max_results=2, user_id="user-1", rerank_top_n=0, min_score=0.0,
+    )
+    assert [r.document_id for r in results][0] == "nebenkosten" and len(results) == 2
+    assert service.index.size("generated:user-1") == 3
+
+    # Another tab syncs a newer document into the shared namespace between sync and search
+    sync = index.sync
+
+    async def sync_then_concurrent_upsert(namespace, texts, complete=False):
+        embedded = await sync(namespace, texts, complete)
+        await sync(namespace, {"heizung": "Heizkosten Nebenkostenabrechnung Heizkostenverordnung"})
+        return embedded
+
+    index.sync = sync_then_concurrent_upsert
+    results = await service.search_documents(
+        documents, "Nebenkostenabrechnung Heizkosten",
+        max_results=3, user_id="user-1", rerank_top_n=0, min_score=0.0,
+    )
+    assert {r.document_id for r in results} <= set(DOCUMENTS)
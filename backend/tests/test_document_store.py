@@ -0,0 +1,107 @@
+"""
+Tests for the content-addressed document store
+"""
+
+import asyncio
+import os
+import time
+
+import fitz
+import pytest
+from fastapi import HTTPException
+
+import main
+from auth import FirebaseUser
+from models.legal import QueryRequest
+from services.document_parser import DocumentParser
+from services.document_store import DocumentStore, document_hash
+
+TEXT = "Mietvertrag über die Wohnung im 2. OG. Die Kaution beträgt drei Nettokaltmieten. " * 3
+
+
+def _store(tmp_path, max_bytes=10_000_000) -> DocumentStore:
+    return DocumentStore(path=str(tmp_path), max_bytes=max_bytes, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_same_bytes_are_parsed_once(tmp_path):
+    store = _store(tmp_path)
+    file_bytes = TEXT.encode("utf-8")
+
+    first = await store.get_or_parse(file_bytes, "vertrag.txt", "user-1")
+    assert not first.cached and first.document_hash == document_hash(file_bytes)
+    again = await store.get_or_parse(file_bytes, "kopie.txt", "user-2")
+    assert again.cached and again.text == first.text == TEXT.strip()
+
+    # Resolvable by hash, only for users who uploaded the file
+    assert (await store.resolve(first.document_hash, "user-2")).text == TEXT.strip()
+    assert await store.resolve(first.document_hash, "user-3") is None
+    assert await store.resolve("../../etc/passwd", "user-1") is None
+    assert await store.resolve(first.document_hash, None) is None
+
+
+@pytest.mark.asyncio
+async def test_query_references_need_the_authenticated_owner(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    stored = await store.get_or_parse(TEXT.encode("utf-8"), "vertrag.txt", "user-1")
+    monkeypatch.setattr(main, "get_document_store", lambda: store)
+    request = QueryRequest(
+        query="Wie hoch ist die Kaution?",
+        target_jurisdiction="DE",
+        user_role="TENANT",
+        user_id="user-1",  # client-supplied, not trusted
+        uploaded_documents=[{"document_id": stored.document_hash}],
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await main.uploaded_docs_for_engine(request)
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException):
+        await main.uploaded_docs_for_engine(request, FirebaseUser(uid="user-2"))
+
+    docs = await main.uploaded_docs_for_engine(request, FirebaseUser(uid="user-1"))
+    assert docs == [{"document_id": stored.document_hash, "text": TEXT.strip()}]
+
+
+def test_upload_without_token_is_parsed_but_not_owned(client, tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(main, "get_document_store", lambda: store)
+    files = {"file": ("vertrag.txt", TEXT.encode("utf-8"), "text/plain")}
+
+    response = client.post("/upload/document", files=files, data={"user_id": "demo_user"})
+    assert response.status_code == 200 and response.json()["success"]
+    key = response.json()["document"]["id"]
+    assert asyncio.run(store.get(key)).owners == []
+
+    main.app.dependency_overrides[main.get_optional_user] = lambda: FirebaseUser(uid="user-1")
+    try:
+        response = client.post("/upload/document", files=files)
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.json()["document"]["user_id"] == "user-1"
+    assert asyncio.run(store.get(key)).owners == ["user-1"]
+
+
+@pytest.mark.asyncio
+async def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = _store(tmp_path, max_bytes=1200)  # two documents
+    hashes = []
+    for i in range(3):
+        stored = await store.get_or_parse(f"{i} {TEXT}".encode(), f"{i}.txt", "user-1")
+        hashes.append(stored.document_hash)
+        mtime = time.time() - 10 + i
+        os.utime(tmp_path / f"{stored.document_hash}.json", (mtime, mtime))
+
+    files = {name[:-5] for name in os.listdir(tmp_path)}
+    assert hashes[0] not in files and hashes[2] in files
+
+
+def test_pdf_page_offsets():
+    with fitz.open() as pdf:
+        for page_text in ("Erste Seite", "Zweite Seite", "Dritte Seite"):
+            pdf.new_page().insert_text((50, 72), page_text * 10)
+        result = DocumentParser.parse_pdf(pdf.tobytes())
+
+    assert len(result.page_offsets) == 3
+    for offset, page_text in zip(result.page_offsets, ("Erste", "Zweite", "Dritte")):
+        assert result.text[offset:].startswith(page_text)
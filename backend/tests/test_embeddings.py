@@ -0,0 +1,98 @@
+"""
+Tests for the embedding service (LRU cache + micro-batching) and backends
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from rag.embedder import HashingEmbedder, fit_dimension
+from rag.embeddings import EmbeddingLRU, normalize_text
+
+
+def make_service(recording_embeddings):
+    return recording_embeddings.service(cache_size=16, batch_window_ms=5, batch_max_size=10)
+
+
+def test_normalize_text():
+    """Whitespace differences map to the same cache key."""
+    assert normalize_text("  Schimmel in\nder   Wohnung ") == "Schimmel in der Wohnung"
+
+
+def test_lru_eviction():
+    """Oldest entries are evicted when the LRU is full."""
+    lru = EmbeddingLRU(max_size=2)
+    lru.put(("a", "m", "t"), [1.0])
+    lru.put(("b", "m", "t"), [2.0])
+    lru.get(("a", "m", "t"))
+    lru.put(("c", "m", "t"), [3.0])
+    assert lru.get(("b", "m", "t")) is None
+    assert lru.get(("a", "m", "t")) == [1.0]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_embeddings_are_batched(recording_embeddings):
+    """Concurrent calls inside the batch window become one model request."""
+    service = make_service(recording_embeddings)
+    calls = recording_embeddings.calls
+
+    vectors = await asyncio.gather(
+        service.embed("Schimmel in der Wohnung"),
+        service.embed("Mieterhöhung nach § 558 BGB"),
+        service.embed("Schimmel in der Wohnung"),
+    )
+
+    assert len(calls) == 1
+    assert len(calls[0][1]) == 2  # duplicate text sent once
+    assert vectors[0] == vectors[2]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flush_is_referenced_until_done(recording_embeddings):
+    """A size-triggered flush is held by the batcher while it runs."""
+    service = make_service(recording_embeddings)
+    pending = asyncio.ensure_future(service.embed_many([f"Frage {i}" for i in range(10)]))
+    while not service._batcher._flushes:
+        await asyncio.sleep(0)
+
+    assert len(await pending) == 10
+    assert not service._batcher._flushes and len(recording_embeddings.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_embedding_served_from_cache(recording_embeddings):
+    """A repeated question does not hit the model again."""
+    service = make_service(recording_embeddings)
+
+    first = await service.embed("Schimmel in der Wohnung")
+    second = await service.embed("Schimmel  in der Wohnung")
+
+    assert first == second
+    assert len(recording_embeddings.calls) == 1
+
+
+def test_hashing_embedder_is_deterministic_and_lexical():
+    """The offline backend gives stable 768-d vectors that reflect word overlap."""
+    embedder = HashingEmbedder(dimension=768)
+    a, b, c = embedder.embed_batch(
+        [
+            "Mietminderung wegen Schimmel",
+            "Schimmel rechtfertigt Mietminderung",
+            "Grunderwerbsteuer Bayern",
+        ],
+        "retrieval_document",
+    )
+
+    assert len(a) == 768
+    assert a == embedder.embed_batch(["Mietminderung wegen Schimmel"], "retrieval_query")[0]
+    assert np.dot(a, b) > np.dot(a, c)
+
+
+def test_fit_dimension_truncates_and_pads():
+    """Vectors of other sizes are brought to the collection dimension."""
+    vectors = np.ones((2, 1024), dtype=np.float32)
+    fitted = fit_dimension(vectors, 768)
+    assert fitted.shape == (2, 768)
+    assert np.allclose(np.linalg.norm(fitted, axis=1), 1.0)
+    assert fit_dimension(np.ones((1, 384)), 768).shape == (1, 768)
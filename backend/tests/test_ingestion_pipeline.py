@@ -0,0 +1,106 @@
+"""
+Tests for the staged ingestion pipeline
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from ingestion.dedup_index import SQLiteDedupIndex, dedup_key
+from ingestion.pipeline import IngestionPipeline
+from models import LegalDocument, Jurisdiction
+
+
+class FakeQdrant:
+    def __init__(self):
+        self.upserts = []
+
+    async def upsert(self, collection_name, points):
+        self.upserts.append(points)
+
+
+class FakeProcessor:
+    """Records embedding requests and upserts instead of calling Gemini/Qdrant."""
+
+    def __init__(self, duplicates=(), irrelevant=()):
+        self.qdrant = FakeQdrant()
+        self.embed_calls = []
+        self.indexed = []
+        self.duplicates = set(duplicates)
+        self.irrelevant = set(irrelevant)
+
+    def compute_document_hash(self, content):
+        return content
+
+    def find_duplicates(self, entries):
+        return {
+            dedup_key(doc_hash, jurisdiction)
+            for doc_hash, jurisdiction in entries
+            if doc_hash in self.duplicates
+        }
+
+    def classify_relevance(self, text, jurisdiction, title=""):
+        return (False, 0.0) if text in self.irrelevant else (True, 1.0)
+
+    def chunk_text(self, text):
+        return [f"{text}-{i}" for i in range(3)]
+
+    async def generate_embeddings(self, texts, batch_size=100):
+        self.embed_calls.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    def build_points(self, document, doc_hash, chunks, embeddings, confidence):
+        return [(doc_hash, chunk) for chunk in chunks]
+
+    def mark_as_indexed(self, entries):
+        self.indexed.extend(doc_hash for doc_hash, _ in entries)
+
+
+def make_document(content):
+    return LegalDocument(
+        title=f"Dokument {content}",
+        content_original=content,
+        jurisdiction=Jurisdiction.DE,
+        publication_date=date(2024, 1, 1),
+        source_url="https://example.com",
+        document_type="statute",
+        language="de",
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_embeddings_and_upserts():
+    """Chunks and points of several documents share requests."""
+    processor = FakeProcessor(duplicates={"dup"}, irrelevant={"off-topic"})
+    pipeline = IngestionPipeline(
+        processor,
+        relevance_concurrency=2,
+        embed_concurrency=1,
+        embed_batch_size=100,
+        upsert_batch_size=1000,
+        queue_size=4,
+    )
+    documents = [make_document(f"doc{i}") for i in range(10)]
+    documents += [make_document("dup"), make_document("off-topic")]
+
+    stats = await pipeline.run(documents)
+
+    assert stats["found"] == 12
+    assert stats["processed"] == 10
+    assert stats["duplicates"] == 1
+    assert stats["irrelevant"] == 1
+    assert stats["uploaded_chunks"] == 30
+    # 30 chunks in fewer requests than documents, one grouped upsert
+    assert len(processor.embed_calls) < 10
+    assert len(processor.qdrant.upserts) == 1
+    assert sorted(processor.indexed) == sorted(f"doc{i}" for i in range(10))
+
+
+def test_sqlite_dedup_index_bulk_lookup(tmp_path):
+    """Fresh entries are duplicates, entries past the re-index age are not."""
+    index = SQLiteDedupIndex(str(tmp_path / "dedup.sqlite3"), max_age_days=90)
+    index.mark_many(["DE:new"])
+    index.mark_many(["DE:old"], indexed_at=datetime.utcnow() - timedelta(days=91))
+
+    assert index.fresh(["DE:new", "DE:old", "DE:unknown"]) == {"DE:new"}
+    assert index.prune() == 1
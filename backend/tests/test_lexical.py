@@ -0,0 +1,110 @@
+"""
+Tests for hybrid retrieval (German tokenization, BM25, RRF)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from rag.lexical import BM25Index, LexicalIndex, extract_citations, reciprocal_rank_fusion, tokenize
+
+
+def test_citations_are_single_tokens():
+    assert extract_citations("Gilt § 558 Abs. 1 BGB auch hier?") == ["§558", "§558:bgb"]
+    assert extract_citations("Palandt BGB § 535") == ["§535", "§535:bgb"]
+    assert extract_citations("§ 13 VOB/B") == ["§13", "§13:vob/b"]
+    assert extract_citations("BGH VIII ZR 185/14") == ["az:viii zr 185/14"]
+    assert extract_citations("OLG Düsseldorf I-24 U 43/18") == ["az:i-24 u 43/18"]
+
+
+def test_tokenize_folds_and_stems_german_words():
+    tokens = tokenize("Die Schönheitsreparaturen der Mieter")
+    assert "schoenheitsreparatur" in tokens
+    assert "miet" in tokens
+    assert "die" not in tokens
+
+
+def test_bm25_respects_filters_and_exact_citations():
+    index = BM25Index()
+    index.add("p1", {
+        "jurisdiction": "DE", "doc_type": "URTEIL", "gerichtsebene": "BGH",
+        "title": "BGH VIII ZR 185/14",
+        "content": "Starre Fristen für Schönheitsreparaturen sind unwirksam.",
+    })
+    index.add("p2", {
+        "jurisdiction": "DE", "doc_type": "GESETZ",
+        "content": "§ 535 BGB Schönheitsreparaturen obliegen dem Vermieter.",
+    })
+    index.add("p3", {
+        "jurisdiction": "US", "doc_type": "URTEIL",
+        "content": "Schönheitsreparaturen",
+    })
+
+    result = index.search("Schönheitsreparaturen", "DE")
+    assert {point_id for point_id, _ in result.ranked} == {"p1", "p2"}
+
+    result = index.search(
+        "Schönheitsreparaturen", "DE", source_filter=["URTEIL"], gerichtsebene_filter=["BGH"]
+    )
+    assert [point_id for point_id, _ in result.ranked] == ["p1"]
+
+    assert index.search("Was sagt VIII ZR 185/14?", "DE").exact == ["p1"]
+    assert index.search("Was regelt § 535 BGB?", "DE").exact == ["p2"]
+
+    # Re-adding a point replaces it
+    index.add("p2", {"jurisdiction": "DE", "content": "Mietminderung"})
+    assert index.search("Was regelt § 535 BGB?", "DE").exact == []
+    assert len(index) == 3
+
+    # Compaction drops the replaced version, the ranking stays the same
+    def ranking():
+        result = index.search("Mietminderung Schönheitsreparaturen", "DE")
+        return [point_id for point_id, _ in result.ranked]
+
+    before = ranking()
+    assert index.deleted == 1
+    index.compact()
+    assert index.deleted == 0 and len(index._ids) == 3
+    assert ranking() == before == ["p2", "p1"]
+    assert index.search("Was sagt VIII ZR 185/14?", "DE").exact == ["p1"]
+
+
+def point(point_id, content):
+    return SimpleNamespace(id=point_id, payload={"jurisdiction": "DE", "content": content})
+
+
+class UpsertDuringScroll:
+    """Scroll pages of a collection; another request upserts while the first page is processed."""
+
+    def __init__(self):
+        self.lexical = None
+
+    async def scroll(self, collection_name, limit, offset, with_payload, with_vectors):
+        if offset is None:
+            self.lexical.add_points([
+                point("p1", "Mietminderung wegen Schimmel"),
+                point("p3", "Eigenbedarfskündigung"),
+            ])
+            return [point("p1", "Schönheitsreparaturen")], 1
+        return [point("p2", "Mietkaution")], None
+
+
+@pytest.mark.asyncio
+async def test_build_keeps_points_upserted_during_the_scroll():
+    qdrant = UpsertDuringScroll()
+    lexical = qdrant.lexical = LexicalIndex(qdrant, "docs")
+    await lexical.build()
+
+    index = lexical.index
+    assert len(index) == 3 and index.deleted == 0
+    assert [point_id for point_id, _ in index.search("Schimmel", "DE").ranked] == ["p1"]
+    assert index.search("Schönheitsreparaturen", "DE").ranked == []
+    ranked = index.search("Eigenbedarfskündigung", "DE").ranked
+    assert [point_id for point_id, _ in ranked] == ["p3"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    order = [doc_id for doc_id, _ in fused]
+    assert order[0] == "b"
+    assert set(order) == {"a", "b", "c", "d"}
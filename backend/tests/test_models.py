@@ -12,6 +12,7 @@ from models.legal import (
     LegalDocument,
     QueryRequest,
     ConflictRequest,
+    RetrievalQuery,
 )
 
 
@@ -97,3 +98,13 @@ def test_conflict_request_validation():
     )
     assert request.party_a_label == "Vermieter"
     assert request.party_b_label == "Mieter"
+
+
+def test_retrieval_query_validation():
+    """Test RetrievalQuery defaults and limit bounds."""
+    query = RetrievalQuery(query="Kaution Mietvertrag", target_jurisdiction=Jurisdiction.DE)
+    assert query.limit == 5
+    assert query.source_filter is None
+    
+    with pytest.raises(ValidationError):
+        RetrievalQuery(query="Kaution", target_jurisdiction=Jurisdiction.DE, limit=0)
@@ -0,0 +1,58 @@
+"""
+Tests for the OCR engine (page order, budgets, content-hash cache)
+"""
+
+import time
+
+import fitz
+
+from services.ocr_engine import OCREngine, PageImage
+
+
+def fake_recognize(page: PageImage, lang: str, timeout: float) -> str:
+    # Earlier pages finish last, so the pool returns them out of order
+    time.sleep(0.05 * (3 - page.index % 4))
+    return f"Seite {page.index + 1}"
+
+
+def slow_recognize(page: PageImage, lang: str, timeout: float) -> str:
+    time.sleep(0.5)
+    return f"Seite {page.index + 1}"
+
+
+def _pdf(pages: int) -> bytes:
+    with fitz.open() as pdf:
+        for _ in range(pages):
+            pdf.new_page(width=200, height=280)
+        return pdf.tobytes()
+
+
+def test_pages_in_order_and_cached():
+    engine = OCREngine(workers=2, dpi=20, max_pages=5, recognize=fake_recognize)
+    try:
+        pdf = _pdf(7)
+        result = engine.extract_text(pdf)
+        assert result.text == "\n\n".join(f"Seite {i}" for i in range(1, 6))
+        assert (result.pages, result.page_count, result.truncated) == (5, 7, True)
+
+        again = engine.extract_text(pdf)
+        assert again.cached and again.text == result.text
+        assert not engine.extract_text(_pdf(2)).cached
+    finally:
+        engine.shutdown()
+
+
+def test_time_budget_returns_partial_text():
+    engine = OCREngine(workers=1, dpi=20, recognize=slow_recognize)
+    try:
+        engine.extract_text(_pdf(1))  # start the worker process
+        engine.timeout = 1.2
+        pdf = _pdf(6)
+        result = engine.extract_text(pdf)
+        assert result.truncated and 0 < result.pages < 6
+        assert result.text.startswith("Seite 1")
+        # Incomplete runs are not cached
+        engine.timeout = 10
+        assert not engine.extract_text(pdf).cached
+    finally:
+        engine.shutdown()
@@ -0,0 +1,57 @@
+"""
+Tests for the document parsing service (routing, worker pools, timeouts)
+"""
+
+import fitz
+import pytest
+
+from services.document_parser import DocumentType
+from services.parsing_service import INLINE, PROCESS, THREAD, ParsingService
+
+TEXT = "Der Mieter zahlt eine Kaution in Höhe von drei Nettokaltmieten gemäß § 551 BGB. " * 3
+
+
+def _pdf(text: str) -> bytes:
+    with fitz.open() as pdf:
+        page = pdf.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text)
+        return pdf.tobytes()
+
+
+def test_routing_by_format_and_size():
+    service = ParsingService(inline_max_bytes=1000, process_min_bytes=10_000)
+    assert service.route(DocumentType.TXT, 500) == INLINE
+    assert service.route(DocumentType.CSV, 5000) == THREAD
+    assert service.route(DocumentType.HTML, 5000) == THREAD
+    assert service.route(DocumentType.HTML, 20_000) == PROCESS
+    assert service.route(DocumentType.PDF, 100) == PROCESS
+    assert service.route(DocumentType.EXCEL, 100) == PROCESS
+
+
+@pytest.mark.asyncio
+async def test_parse_in_worker_pools():
+    service = ParsingService(workers=1)
+    try:
+        txt = await service.parse(TEXT.encode("utf-8"), "mietvertrag.txt")
+        assert txt.doc_type == DocumentType.TXT and txt.text == TEXT.strip()
+
+        page = f"<html><script>x()</script><p>{TEXT}</p></html>".encode()
+        html = await service.parse(page, "seite.html")
+        assert html.text == TEXT.strip()
+
+        pdf = await service.parse(_pdf(TEXT), "vertrag.pdf")
+        assert pdf.error is None and not pdf.ocr_applied
+        assert "Kaution" in pdf.text and pdf.page_count == 1
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout_returns_error_and_replaces_pool():
+    service = ParsingService(workers=1, timeout=0.001)
+    try:
+        result = await service.parse(_pdf(TEXT), "vertrag.pdf")
+        assert result.text == "" and "Zeitüberschreitung" in result.error
+        assert service._pool is None
+    finally:
+        service.shutdown()
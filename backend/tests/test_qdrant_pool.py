@@ -0,0 +1,35 @@
+"""
+Tests for the shared async Qdrant client (transport selection)
+"""
+
+import pytest
+
+import qdrant_pool
+
+
+@pytest.fixture
+def qdrant_settings(monkeypatch):
+    def configure(**values):
+        defaults = dict(qdrant_url="", qdrant_use_https=False, qdrant_prefer_grpc=None)
+        for name, value in {**defaults, **values}.items():
+            monkeypatch.setattr(qdrant_pool.settings, name, value)
+        return qdrant_pool.create_async_qdrant_client()._client
+
+    return configure
+
+
+def test_url_endpoints_use_rest(qdrant_settings):
+    remote = qdrant_settings(qdrant_url="https://cluster.eu-central.aws.cloud.qdrant.io")
+    assert not remote._prefer_grpc and remote._https
+
+    assert not qdrant_settings(qdrant_use_https=True)._prefer_grpc
+
+
+def test_host_port_uses_grpc(qdrant_settings):
+    remote = qdrant_settings()
+    assert remote._prefer_grpc and remote._grpc_port == qdrant_pool.settings.qdrant_grpc_port
+
+
+def test_explicit_transport_wins(qdrant_settings):
+    assert qdrant_settings(qdrant_url="http://qdrant:6333", qdrant_prefer_grpc=True)._prefer_grpc
+    assert not qdrant_settings(qdrant_prefer_grpc=False)._prefer_grpc
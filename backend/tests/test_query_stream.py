@@ -0,0 +1,134 @@
+"""
+Tests for streaming queries (RAGEngine.query_stream and POST /query/stream)
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app, get_answer_cache, get_rag_engine
+from models.legal import Jurisdiction, QueryResponse, UserRole
+from rag.engine import RAGEngine
+from rag.verification import PENDING
+
+CONTEXT = (
+    "**Source:** BGB § 558\n\nDer Vermieter kann die Zustimmung zu einer Mieterhöhung verlangen."
+)
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StreamingModel:
+    def __init__(self, parts):
+        self.parts = parts
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False):
+        async def chunks():
+            for part in self.parts:
+                yield Chunk(part)
+        return chunks()
+
+
+class StubStreamEngine(RAGEngine):
+    def __init__(self, parts):
+        super().__init__(None, "test")
+        self.generation_model = StreamingModel(parts)
+
+    async def _prepare_query(self, **kwargs):
+        return {
+            "sources": [],
+            "jurisdiction_warning": None,
+            "prompt": "prompt",
+            "generation_config": {},
+            "grounded": True,
+            "context": CONTEXT,
+        }
+
+    async def _critique(self, context, answer):
+        return "VERIFIED"
+
+
+class FailingEngine:
+    async def query_stream(self, **kwargs):
+        raise RuntimeError("Qdrant nicht erreichbar")
+        yield  # pragma: no cover - makes this an async generator
+
+
+def parse_events(body: str):
+    return [
+        json.loads(block.split("data: ", 1)[1])
+        for block in body.strip().split("\n\n")
+        if "data: " in block
+    ]
+
+
+async def collect(engine):
+    stream = engine.query_stream("Mieterhöhung?", Jurisdiction.DE, UserRole.TENANT)
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_query_stream_event_order():
+    engine = StubStreamEngine(["Nach § 558 BGB ", "ist das zulässig."])
+    engine.verification_async = False
+    events = await collect(engine)
+
+    types = [event["type"] for event in events]
+    assert types == ["sources", "token", "token", "verification", "done"]
+    assert events[3]["method"] == "llm" and events[3]["verdict"] == "VERIFIED"
+    assert events[-1]["response"].answer == "Nach § 558 BGB ist das zulässig."
+
+
+@pytest.mark.asyncio
+async def test_query_stream_does_not_wait_for_the_critic():
+    engine = StubStreamEngine(["Nach § 558 BGB ist das zulässig."])
+    engine.verification_async = True
+    events = await collect(engine)
+
+    verification, done = events[-2], events[-1]["response"]
+    assert verification["verdict"] == PENDING and done.verification == PENDING
+    assert done.verification_id == verification["verification_id"]
+    await asyncio.gather(*engine._verification_tasks)
+    assert (await engine.verifications.get(done.verification_id))["verdict"] == "VERIFIED"
+
+    # A citation missing from the context is decided locally, without a pending critic
+    engine = StubStreamEngine(["Nach § 573 BGB ist das zulässig."])
+    engine.verification_async = True
+    verification = (await collect(engine))[-2]
+    assert verification["method"] == "local" and verification["hallucination_detected"]
+    assert verification["verification_id"] is None
+
+
+def stream(client: TestClient, engine):
+    app.dependency_overrides[get_rag_engine] = lambda: engine
+    app.dependency_overrides[get_answer_cache] = lambda: None
+    try:
+        response = client.post("/query/stream", json={
+            "query": "Darf der Vermieter die Miete erhöhen?",
+            "target_jurisdiction": "DE",
+            "user_role": "TENANT",
+            "user_language": "de",
+        })
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+
+def test_stream_endpoint_sends_done(client: TestClient):
+    events = stream(client, StubStreamEngine(["Nach § 558 BGB ist das zulässig."]))
+    assert [event["type"] for event in events] == ["sources", "token", "verification", "done"]
+    assert QueryResponse(**events[-1]["response"]).answer == "Nach § 558 BGB ist das zulässig."
+
+
+def test_stream_endpoint_reports_retrieval_errors(client: TestClient):
+    events = stream(client, FailingEngine())
+    assert events == [
+        {"type": "error", "detail": "Error processing query: Qdrant nicht erreichbar"}
+    ]
@@ -0,0 +1,117 @@
+"""
+Tests for the buffered quota counter (in-process and Redis mode)
+"""
+
+import pytest
+
+from services import quota
+from services.quota import QuotaCounter
+
+
+class FakeDocument:
+    def __init__(self, db, user_id):
+        self.db = db
+        self.user_id = user_id
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.updates = []
+
+    def update(self, ref, data):
+        self.updates.append((ref.user_id, data))
+
+    def commit(self):
+        self.db.commits.append(self.updates)
+
+
+class FakeDB:
+    def __init__(self):
+        self.commits = []
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def collection(self, name):
+        return self
+
+    def document(self, user_id):
+        return FakeDocument(self, user_id)
+
+
+class FakeUserService:
+    def __init__(self, users):
+        self.users = users
+        self.reads = 0
+        self.db = FakeDB()
+
+    def get_user(self, user_id):
+        self.reads += 1
+        return self.users.get(user_id)
+
+
+@pytest.mark.asyncio
+async def test_check_and_increment_without_firestore_round_trips():
+    """Only the first check reads Firestore; increments are buffered."""
+    users = FakeUserService({"u1": {"queriesUsed": 1, "queriesLimit": 3}})
+    counter = QuotaCounter(user_service=users, flush_interval=60, cache_ttl=300)
+
+    assert await counter.check("u1") == (True, 1, 3)
+    assert await counter.increment("u1") == 2
+    assert await counter.increment("u1") == 3
+    assert await counter.check("u1") == (False, 3, 3)
+    assert users.reads == 1
+    assert users.db.commits == []
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_aggregated_deltas():
+    """The flusher writes one Increment per user per flush."""
+    users = FakeUserService({
+        "u1": {"queriesUsed": 0, "queriesLimit": 25},
+        "u2": {"queriesUsed": 5, "queriesLimit": 25},
+    })
+    counter = QuotaCounter(user_service=users, flush_interval=60, cache_ttl=300)
+    for _ in range(3):
+        await counter.increment("u1")
+    await counter.increment("u2")
+    await counter.increment("unknown")
+
+    assert await counter.flush() == 2
+    assert len(users.db.commits) == 1
+    written = {user_id: data["queriesUsed"].value for user_id, data in users.db.commits[0]}
+    assert written == {"u1": 3, "u2": 1}
+    assert await counter.flush() == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_counter_survives_hash_expiry(monkeypatch):
+    """An expired hash is reloaded from Firestore, never recreated without limit and TTL."""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(quota, "get_redis_client", lambda: redis)
+    users = FakeUserService({"u1": {"queriesUsed": 10, "queriesLimit": 12}})
+    counter = QuotaCounter(user_service=users, flush_interval=60, cache_ttl=300)
+    key = QuotaCounter.PREFIX + "u1"
+
+    assert await counter.increment("u1") == 11
+    # The hash expires between the check and the increment
+    state = counter._state
+    expired = []
+
+    def state_then_expire(user_id):
+        result = state(user_id)
+        if not expired:
+            expired.append(redis.delete(key))
+        return result
+
+    monkeypatch.setattr(counter, "_state", state_then_expire)
+    assert await counter.increment("u1") == 12
+    assert redis.hgetall(key) == {"used": "12", "limit": "12"} and redis.ttl(key) > 0
+
+    # Firestore still lags by both increments: the reload adds the pending deltas
+    redis.delete(key)
+    monkeypatch.setattr(counter, "_state", state)
+    assert await counter.check("u1") == (False, 12, 12)
+    assert redis.hget(QuotaCounter.PENDING_KEY, "u1") == "2"
@@ -0,0 +1,106 @@
+"""
+Tests for the rerank stage (scoring, recency prior, token budget)
+"""
+
+import importlib.util
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models.legal import Jurisdiction, LegalDocument, ScoredDocument
+from rag.engine import RAGEngine
+from rag.reranker import (
+    CrossEncoderReranker,
+    LexicalReranker,
+    Reranker,
+    recency_prior,
+    select_within_budget,
+)
+
+
+def _hit(
+    title: str, content: str, published: str = "2020-01-01", score: float = 0.5
+) -> ScoredDocument:
+    doc = LegalDocument(
+        jurisdiction=Jurisdiction.DE,
+        title=title,
+        content_original=content,
+        publication_date=published,
+        document_type="URTEIL",
+        language="de",
+    )
+    return ScoredDocument(document=doc, score=score)
+
+
+def test_lexical_reranker_prefers_matching_passages():
+    scores = LexicalReranker().score(
+        "Schönheitsreparaturen Mieter",
+        ["Kaufvertrag über ein Grundstück", "Der Mieter schuldet Schönheitsreparaturen", "Mieter"],
+    )
+    assert scores.argmax() == 1
+    assert scores.max() == pytest.approx(1.0)
+    assert scores[0] == 0.0
+
+
+def test_recency_prior_halves_per_half_life():
+    prior = recency_prior(
+        [date(2024, 1, 1), date(2014, 1, 4)], half_life_days=3650, today=date(2024, 1, 1)
+    )
+    assert prior[0] == pytest.approx(1.0)
+    assert prior[1] == pytest.approx(0.5, abs=0.01)
+
+
+def test_select_within_budget_skips_oversized_hits():
+    hits = [
+        _hit("A", "x" * 4000), _hit("B", "x" * 4000), _hit("C", "x" * 100), _hit("D", "x" * 100)
+    ]
+    # 1500-char excerpts cost ~376 tokens, short ones ~26
+    selected = select_within_budget(hits, limit=3, token_budget=450)
+    assert [hit.document.title for hit in selected] == ["A", "C", "D"]
+    assert len(select_within_budget(hits, limit=2)) == 2
+
+
+class FixedReranker(Reranker):
+    name = "fixed"
+
+    def __init__(self, scores):
+        self.scores = np.asarray(scores, dtype=np.float32)
+
+    def score(self, query, passages):
+        return self.scores[:len(passages)]
+
+
+class FailingReranker(Reranker):
+    name = "failing"
+
+    def score(self, query, passages):
+        raise RuntimeError("model not available")
+
+
+@pytest.mark.asyncio
+async def test_engine_rerank_blends_recency_and_falls_back():
+    engine = RAGEngine(None, "test")
+    engine.rerank_recency_weight = 0.2
+    hits = [
+        _hit("alt", "...", published="1990-01-01"),
+        _hit("neu", "...", published=date.today().isoformat()),
+        _hit("irrelevant", "...", published=date.today().isoformat()),
+    ]
+
+    engine.reranker = FixedReranker([0.9, 0.8, 0.0])
+    reranked = await engine.rerank("Frage", hits, limit=2)
+    assert [hit.document.title for hit in reranked] == ["neu", "alt"]
+    assert reranked[0].score == pytest.approx(0.84, abs=0.01)
+
+    engine.reranker = FailingReranker()
+    reranked = await engine.rerank("Frage", hits, limit=2)
+    assert [hit.document.title for hit in reranked] == ["alt", "neu"]
+    assert engine.reranker is not None  # transient failure, not disabled for the process
+
+
+def test_cross_encoder_without_package_fails_on_construction():
+    if importlib.util.find_spec("sentence_transformers") is not None:
+        pytest.skip("sentence-transformers installed")
+    with pytest.raises(RuntimeError, match="sentence-transformers"):
+        CrossEncoderReranker()
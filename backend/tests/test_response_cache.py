@@ -0,0 +1,85 @@
+"""
+Tests for the /query answer cache keys
+"""
+
+import pytest
+
+from models.legal import QueryRequest, QueryResponse
+from rag.response_cache import QueryResponseCache, request_key
+from rag.verification import PENDING
+
+
+class StubEngine:
+    qdrant_available = False
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+
+    async def embed_text(self, text):
+        return self.vectors[text]
+
+
+def make_request(**overrides):
+    data = {
+        "query": "Was sind meine Rechte bei Schimmel in der Wohnung?",
+        "target_jurisdiction": "DE",
+        "user_role": "TENANT",
+        "user_language": "de",
+    }
+    data.update(overrides)
+    return QueryRequest(**data)
+
+
+def test_key_ignores_whitespace_case_and_filter_order():
+    """Cosmetic differences map to the same exact key."""
+    a = make_request(source_filter=["GESETZ", "URTEIL"])
+    b = make_request(
+        query="was sind meine Rechte bei  Schimmel in der Wohnung?",
+        source_filter=["URTEIL", "GESETZ"],
+    )
+    assert request_key(a) == request_key(b)
+
+
+def test_key_is_jurisdiction_and_role_aware():
+    """Role, jurisdiction and language are part of the scope."""
+    base = request_key(make_request())
+    assert request_key(make_request(user_role="LANDLORD")) != base
+    assert request_key(make_request(target_jurisdiction="ES")) != base
+    assert request_key(make_request(user_language="en")) != base
+
+
+def test_key_ignores_user_identity():
+    """User id and tier do not change the answer."""
+    assert request_key(make_request(user_id="a")) == request_key(make_request(user_id="b"))
+
+
+@pytest.mark.asyncio
+async def test_pending_answer_is_cached_without_verification_id():
+    """Later hits must not poll the first caller's (expiring) verdict."""
+    cache = QueryResponseCache(StubEngine(), ttl=60, similarity_threshold=1.0)
+    request = make_request()
+    response = QueryResponse(answer="Antwort", verification=PENDING, verification_id="abc")
+    await cache.set(request, response)
+
+    cached = await cache.get(request)
+    assert cached.answer == "Antwort"
+    assert cached.verification is None and cached.verification_id is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit_requires_same_norms_and_numbers():
+    """Near-identical embeddings of different norms/amounts must not share answers."""
+    base = "Darf der Vermieter nach § 558 BGB die Miete nach 3 Monaten erhöhen?"
+    variants = {
+        base: [1.0, 0.0],
+        "Darf der Vermieter nach § 558 BGB die Miete nach 3 Monaten erhöhen ?": [1.0, 0.01],
+        "Darf der Vermieter nach § 559 BGB die Miete nach 3 Monaten erhöhen?": [1.0, 0.01],
+        "Darf der Vermieter nach § 558 BGB die Miete nach 6 Monaten erhöhen?": [1.0, 0.01],
+    }
+    cache = QueryResponseCache(StubEngine(variants), ttl=60, similarity_threshold=0.97)
+    await cache.set(make_request(query=base), QueryResponse(answer="Antwort zu § 558"))
+
+    paraphrase, other_norm, other_number = list(variants)[1:]
+    assert (await cache.get(make_request(query=paraphrase))).answer == "Antwort zu § 558"
+    assert await cache.get(make_request(query=other_norm)) is None
+    assert await cache.get(make_request(query=other_number)) is None
@@ -0,0 +1,107 @@
+"""
+Tests for RAGEngine.retrieve and retrieve_many against the in-memory benchmark collection
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.corpus import BenchmarkFixture
+from models.legal import Jurisdiction, RetrievalQuery
+from rag.embedder import HashingEmbedder
+
+QUERIES = [
+    RetrievalQuery(
+        query="Schönheitsreparaturen bei unrenoviert übergebener Wohnung",
+        target_jurisdiction=Jurisdiction.DE,
+    ),
+    RetrievalQuery(query="BGH VIII ZR 242/13", target_jurisdiction=Jurisdiction.DE, limit=3),
+    RetrievalQuery(
+        query="Kaution VIII ZR 242/13 Rückzahlung", target_jurisdiction=Jurisdiction.DE, limit=4
+    ),
+    RetrievalQuery(
+        query="Mietkaution", target_jurisdiction=Jurisdiction.DE, source_filter=["URTEIL"]
+    ),
+    RetrievalQuery(query="Mietkaution", target_jurisdiction=Jurisdiction.US),
+]
+
+
+class FailingEmbeddings:
+    model = "failing"
+
+    async def embed(self, text, task_type="retrieval_query"):
+        raise RuntimeError("Embedding API nicht erreichbar")
+
+    async def embed_many(self, texts, task_type="retrieval_query"):
+        raise RuntimeError("Embedding API nicht erreichbar")
+
+
+def record_lexical_tasks(engine):
+    tasks = []
+    start = engine._start_lexical_search
+
+    def recording(*args):
+        task = start(*args)
+        tasks.append(task)
+        return task
+
+    engine._start_lexical_search = recording
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_retrieve_many_matches_retrieve():
+    fixture = BenchmarkFixture(HashingEmbedder(dimension=256))
+    try:
+        await fixture.load()
+        engine = fixture.engine
+        single = [
+            await engine.retrieve(
+                q.query,
+                q.target_jurisdiction,
+                q.sub_jurisdiction,
+                q.limit,
+                q.source_filter,
+                q.gerichtsebene_filter,
+            )
+            for q in QUERIES
+        ]
+        batched = await engine.retrieve_many(QUERIES)
+    finally:
+        await fixture.close()
+
+    assert [[hit.document.id for hit in hits] for hits in batched] == [
+        [hit.document.id for hit in hits] for hits in single
+    ]
+    free_text, citation_only, mixed, judgments, foreign = batched
+    assert len(free_text) == 5
+
+    # Cited decisions come first, citation-only queries skip the vector search
+    assert fixture.ranked_sources(citation_only) == ["VIII ZR 242/13"]
+    assert fixture.ranked_sources(mixed)[0] == "VIII ZR 242/13" and len(mixed) == 4
+
+    doc_types = {document.source_id: document.payload["doc_type"] for document in fixture.documents}
+    assert judgments
+    assert {doc_types[source] for source in fixture.ranked_sources(judgments)} == {"URTEIL"}
+    assert foreign == []
+
+
+@pytest.mark.asyncio
+async def test_lexical_search_cancelled_when_embedding_fails():
+    fixture = BenchmarkFixture(HashingEmbedder(dimension=256))
+    try:
+        await fixture.load()
+        engine = fixture.engine
+        engine.embeddings = FailingEmbeddings()
+        tasks = record_lexical_tasks(engine)
+
+        with pytest.raises(RuntimeError):
+            await engine.retrieve("Schönheitsreparaturen", Jurisdiction.DE)
+        with pytest.raises(RuntimeError):
+            await engine.retrieve_many(QUERIES[:1] + QUERIES[3:])
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await fixture.close()
+
+    assert len(tasks) == 4
+    assert all(task.cancelled() for task in tasks)
@@ -0,0 +1,218 @@
+"""
+Tests for payload schema normalization, index provisioning and migration
+"""
+
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from config import get_settings
+from ingestion.processor import DocumentProcessor
+from models.legal import Jurisdiction, LegalDocument
+from rag.schema import (
+    PAYLOAD_INDEXES,
+    PAYLOAD_SCHEMA_VERSION,
+    ensure_payload_indexes,
+    migrate_collection,
+    normalize_payload,
+    quantization_config,
+    search_params,
+    to_legal_document,
+)
+from rag.engine import RAGEngine
+from rag.rebuild import rebuild_collection, resolve_alias
+
+# One payload per seed-script dialect
+CASE_LAW = {"title": "BGH VIII ZR 12/23", "content_original": "Schönheitsreparaturen ...",
+            "document_type": "URTEIL", "jurisdiction": "DE", "publication_date": "2023-05-15"}
+KOMPLETT = {"content": "§ 652 BGB ...", "jurisdiction": "DE", "source": "BGB", "topics": ["Makler"],
+            "law": "Maklerrecht", "section": "§ 652 BGB", "last_updated": "2024-11-02T10:15:00"}
+MEGA_BATCH = {"title": "BGB § 535", "content": "Durch den Mietvertrag ...", "law": "BGB",
+              "paragraph": "535"}
+
+
+def test_normalize_payload_dialects():
+    case_law = normalize_payload(CASE_LAW)
+    assert case_law["content"] == "Schönheitsreparaturen ..."
+    assert "content_original" not in case_law
+    assert case_law["doc_type"] == "URTEIL"
+    assert case_law["schema_version"] == PAYLOAD_SCHEMA_VERSION
+
+    komplett = normalize_payload(KOMPLETT)
+    assert komplett["title"] == "BGB"
+    assert komplett["keywords"] == ["Makler"]
+    assert komplett["publication_date"] == "2024-11-02"
+    assert komplett["document_type"] == "Maklerrecht"
+    assert komplett["section"] == "§ 652 BGB"
+    assert "doc_type" not in komplett
+
+    mega = normalize_payload(MEGA_BATCH, defaults={"jurisdiction": "DE", "doc_type": "GESETZ"})
+    assert mega["jurisdiction"] == "DE"
+    assert mega["doc_type"] == "GESETZ"
+    assert "publication_date" not in mega
+
+    assert normalize_payload(mega) is mega
+
+
+def test_ingested_points_are_canonical():
+    document = LegalDocument(
+        title="BGH VIII ZR 12/23",
+        content_original="Schönheitsreparaturen ...",
+        jurisdiction=Jurisdiction.DE,
+        publication_date=date(2023, 5, 15),
+        source_url="https://example.com/urteil",
+        document_type="Urteil",
+        language="de",
+    )
+    processor = DocumentProcessor(qdrant_client=object(), dedup_index=object(), embedder=object())
+    points = processor.build_points(
+        document, "abc", ["Teil 1", "Teil 2"], [[1.0, 0.0], [0.0, 1.0]], 0.9
+    )
+
+    payload = points[1].payload
+    assert payload["schema_version"] == PAYLOAD_SCHEMA_VERSION and payload["doc_type"] == "URTEIL"
+    assert payload["publication_date"] == "2023-05-15"
+    assert payload["content"] == "Teil 2" and payload["chunk_index"] == 1
+    assert payload["document_hash"] == "abc"
+    assert normalize_payload(payload) is payload
+    assert to_legal_document(points[1].id, payload).chunk_index == 1
+
+
+def test_to_legal_document_reads_legacy_and_canonical_payloads():
+    point_id = "00000000-0000-0000-0000-000000000001"
+    legacy = to_legal_document(point_id, CASE_LAW)
+    canonical = to_legal_document(point_id, normalize_payload(CASE_LAW))
+    timestamps = {"created_at", "updated_at"}
+    assert legacy.model_dump(exclude=timestamps) == canonical.model_dump(exclude=timestamps)
+    assert canonical.content_original == "Schönheitsreparaturen ..."
+    assert canonical.publication_date.isoformat() == "2023-05-15"
+
+    # law_texts uses integer point ids
+    assert to_legal_document(7, normalize_payload(MEGA_BATCH)).id.int == 7
+
+
+@pytest.mark.asyncio
+async def test_migration_is_idempotent():
+    qdrant = AsyncQdrantClient(location=":memory:")
+    await qdrant.create_collection(
+        "law_texts", vectors_config=VectorParams(size=2, distance=Distance.COSINE)
+    )
+    await qdrant.upsert("law_texts", points=[
+        PointStruct(id=i, vector=[1.0, float(i)], payload=payload)
+        for i, payload in enumerate([CASE_LAW, KOMPLETT, MEGA_BATCH])
+    ])
+
+    dry = await migrate_collection(qdrant, "law_texts", batch_size=2, dry_run=True)
+    assert (dry.scanned, dry.migrated) == (3, 3)
+
+    stats = await migrate_collection(qdrant, "law_texts", batch_size=2)
+    assert (stats.scanned, stats.migrated) == (3, 3)
+    records = await qdrant.retrieve("law_texts", ids=[0, 1, 2])
+    assert all(record.payload["schema_version"] == PAYLOAD_SCHEMA_VERSION for record in records)
+    assert {record.payload["doc_type"] for record in records} == {"URTEIL", "GESETZ"}
+
+    again = await migrate_collection(qdrant, "law_texts")
+    assert again.migrated == 0
+    assert await ensure_payload_indexes(qdrant, "law_texts") == []
+    await qdrant.close()
+
+
+class RecordingQdrant:
+    """Collection that already has the jurisdiction index."""
+
+    def __init__(self):
+        self.created = []
+
+    async def get_collection(self, collection_name):
+        class Info:
+            payload_schema = {"jurisdiction": object()}
+        return Info()
+
+    async def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        self.created.append((field_name, field_schema))
+
+
+@pytest.mark.asyncio
+async def test_ensure_payload_indexes_creates_only_missing():
+    qdrant = RecordingQdrant()
+    created = await ensure_payload_indexes(qdrant, "legal_documents")
+    assert "jurisdiction" not in created
+    assert set(created) == set(PAYLOAD_INDEXES) - {"jurisdiction"}
+    assert dict(qdrant.created)["publication_date"] == PAYLOAD_INDEXES["publication_date"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_switches_alias():
+    qdrant = AsyncQdrantClient(location=":memory:")
+    vectors = VectorParams(size=2, distance=Distance.COSINE)
+    await qdrant.create_collection("legal_documents", vectors_config=vectors)
+    await qdrant.upsert("legal_documents", points=[
+        PointStruct(id=i, vector=[1.0, float(i)], payload=normalize_payload(MEGA_BATCH))
+        for i in range(5)
+    ])
+
+    # The serving alias can't take the name of a collection, the first cutover needs a source
+    with pytest.raises(ValueError):
+        await rebuild_collection(qdrant, "legal_documents")
+    with pytest.raises(ValueError):
+        await rebuild_collection(qdrant, "legal_documents_live")
+
+    # First cutover: one alias operation, the legacy collection keeps serving until switched
+    first = await rebuild_collection(
+        qdrant, "legal_documents_live", batch_size=2,
+        target="legal_documents_v1", source="legal_documents",
+    )
+    assert first.points == 5 and not first.dropped_old
+    assert await resolve_alias(qdrant, "legal_documents_live") == "legal_documents_v1"
+    assert (await qdrant.count("legal_documents_live")).count == 5
+    assert (await qdrant.count("legal_documents")).count == 5
+
+    # Later rebuilds swap the alias and keep the old collection for rollback
+    second = await rebuild_collection(qdrant, "legal_documents_live", target="legal_documents_v2")
+    assert second.source == "legal_documents_v1"
+    assert await resolve_alias(qdrant, "legal_documents_live") == "legal_documents_v2"
+    assert await qdrant.collection_exists("legal_documents_v1")
+    hits = await qdrant.search(
+        "legal_documents_live", query_vector=[1.0, 4.0], limit=1, search_params=search_params()
+    )
+    assert hits[0].id == 4
+    await qdrant.close()
+
+
+@pytest.mark.asyncio
+async def test_engine_never_creates_the_serving_alias(monkeypatch):
+    monkeypatch.setattr(get_settings(), "qdrant_collection_alias", "legal_documents_live")
+    qdrant = AsyncQdrantClient(location=":memory:")
+
+    engine = RAGEngine(qdrant, "test", collection_name="legal_documents_live", vector_size=2)
+    await engine._ensure_collection()
+    assert not await qdrant.collection_exists("legal_documents_live")
+    assert not engine._collection_ensured
+
+    engine = RAGEngine(qdrant, "test", collection_name="legal_documents", vector_size=2)
+    await engine._ensure_collection()
+    assert await qdrant.collection_exists("legal_documents")
+    await qdrant.close()
+
+
+def test_vector_storage_settings():
+    settings = SimpleNamespace(
+        qdrant_quantization="binary",
+        qdrant_rescore=True,
+        qdrant_oversampling=3.0,
+        qdrant_hnsw_ef=64,
+    )
+    assert quantization_config(settings).binary.always_ram
+    params = search_params(settings)
+    assert (params.hnsw_ef, params.quantization.oversampling) == (64, 3.0)
+
+    settings.qdrant_quantization = "none"
+    assert quantization_config(settings) is None
+    assert search_params(settings).quantization is None
+
+    settings.qdrant_quantization = "pq"
+    with pytest.raises(ValueError):
+        quantization_config(settings)
@@ -0,0 +1,109 @@
+"""
+Tests for the per-upload index (relevant passages of long uploads)
+"""
+
+import asyncio
+
+import pytest
+
+from models.legal import Jurisdiction, UserRole
+from rag.engine import RAGEngine
+from rag.upload_index import UploadRetriever
+
+CLAUSES = [
+    "§ 1 Mietgegenstand. Vermietet wird die Wohnung im zweiten Obergeschoss mit Keller.",
+    "§ 2 Mietzeit. Das Mietverhältnis beginnt am 1. März und läuft auf unbestimmte Zeit.",
+    "§ 3 Miete. Die monatliche Nettokaltmiete beträgt 950 Euro zuzüglich Betriebskosten.",
+    "§ 4 Kaution. Der Mieter leistet eine Kaution von drei Nettokaltmieten auf ein Kautionskonto.",
+    "§ 5 Schönheitsreparaturen. Der Mieter übernimmt Schönheitsreparaturen nach Bedarf.",
+    "§ 6 Tierhaltung. Kleintiere sind erlaubt, Hunde und Katzen nur mit Zustimmung.",
+]
+# Long contract: every clause followed by filler paragraphs
+CONTRACT = "\n\n".join(
+    clause + "\n\n" + "\n\n".join(
+        f"Anlage {i}.{j}: Hausordnung Punkt {j} gilt entsprechend." for j in range(30)
+    )
+    for i, clause in enumerate(CLAUSES)
+)
+
+
+def make_retriever(recording_embeddings):
+    return UploadRetriever(recording_embeddings.service(), chunk_tokens=64, top_k=2)
+
+
+@pytest.mark.asyncio
+async def test_long_upload_returns_relevant_passages(recording_embeddings):
+    retriever = make_retriever(recording_embeddings)
+
+    passages = await retriever.passages("Wie hoch ist die Kaution?", CONTRACT, max_tokens=300)
+    assert "Kaution von drei Nettokaltmieten" in passages
+    assert "Tierhaltung" not in passages
+    assert len(passages) < len(CONTRACT) // 4
+
+    # Short uploads are sent whole, without embedding
+    assert await retriever.passages("Kaution?", CLAUSES[3], max_tokens=300) == CLAUSES[3]
+
+
+@pytest.mark.asyncio
+async def test_upload_is_indexed_once(recording_embeddings):
+    retriever = make_retriever(recording_embeddings)
+    await asyncio.gather(*(
+        retriever.passages(f"Frage {i} zur Miete", CONTRACT, 300) for i in range(3)
+    ))
+    await retriever.passages("Darf ich einen Hund halten?", CONTRACT, 300)
+
+    chunks = (await retriever.index(CONTRACT)).chunks
+    assert len(retriever) == 1 and recording_embeddings.embedded() == len(chunks)
+
+
+@pytest.mark.asyncio
+async def test_engine_falls_back_to_uploads_on_failure():
+    engine = RAGEngine(None, "test")
+
+    class Failing:
+        async def passages(self, *args):
+            raise RuntimeError("embedding backend down")
+
+    engine.upload_retriever = Failing()
+    uploads = [{"document_id": "d1", "text": CONTRACT}]
+    assert await engine.upload_passages("Kaution?", uploads) == uploads
+
+
+@pytest.mark.asyncio
+async def test_upload_is_embedded_in_bounded_batches_past_the_caches(recording_embeddings):
+    service = recording_embeddings.service(batch_max_size=4)
+    retriever = UploadRetriever(service, chunk_tokens=64, top_k=2, max_chunks=10)
+
+    index = await retriever.index(CONTRACT)
+    assert len(index.chunks) == 10 and index.chunks[0].startswith("§ 1 Mietgegenstand")
+    assert [len(texts) for _, texts in recording_embeddings.calls] == [4, 4, 2]
+    assert len(service._lru) == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_indexing_cancelled_when_retrieval_fails(monkeypatch):
+    engine = RAGEngine(None, "test")
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow_passages(query, uploaded_documents):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing_search(**kwargs):
+        await started.wait()
+        raise RuntimeError("Qdrant nicht erreichbar")
+
+    monkeypatch.setattr(engine, "reranker", None)
+    monkeypatch.setattr(engine, "upload_passages", slow_passages)
+    monkeypatch.setattr(engine, "search", failing_search)
+    with pytest.raises(RuntimeError):
+        await engine._prepare_query(
+            "Kaution?", Jurisdiction.DE, UserRole.TENANT, "de", None, None, None, None,
+            [{"document_id": "d1", "text": CONTRACT}],
+        )
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
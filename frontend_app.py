@@ -10,6 +10,7 @@ Architecture:
 """
 
 import os
+import json
 import time
 import streamlit as st
 import requests
@@ -261,9 +262,21 @@ def query_backend(
             "user_language": language,
             "sub_jurisdiction": sub_jurisdiction,
         }
-        response = requests.post(f"{API_BASE_URL}/query", json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        # Streaming endpoint: the read timeout applies between events, not to the whole answer
+        with requests.post(
+            f"{API_BASE_URL}/query/stream", json=payload, stream=True, timeout=(5, 60)
+        ) as response:
+            response.raise_for_status()
+            event_type = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event_type = line[len("event: "):]
+                elif line.startswith("data: ") and event_type in ("done", "error"):
+                    data = json.loads(line[len("data: "):])
+                    if event_type == "error":
+                        raise RuntimeError(data.get("detail", "Streaming error"))
+                    return data["response"]
+        raise RuntimeError("Stream ended without answer")
     except Exception as e:
         return {
             "error": f"API Error: {str(e)}",